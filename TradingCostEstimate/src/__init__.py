@@ -10,7 +10,13 @@ from .backtest_integration import (
     apply_transaction_costs_to_backtest,
     calculate_strategy_cost_metrics,
     estimate_annual_cost_drag,
-    generate_cost_report
+    generate_cost_report,
+    PortfolioCostModel
+)
+from .cost_sensitivity import (
+    cost_sensitivity_surface,
+    decompose_costs,
+    rank_scenarios
 )
 
 __all__ = [
@@ -19,7 +25,11 @@ __all__ = [
     'apply_transaction_costs_to_backtest',
     'calculate_strategy_cost_metrics',
     'estimate_annual_cost_drag',
-    'generate_cost_report'
+    'generate_cost_report',
+    'PortfolioCostModel',
+    'cost_sensitivity_surface',
+    'decompose_costs',
+    'rank_scenarios'
 ]
 
 __version__ = '1.0.0'
@@ -7,18 +7,28 @@ This module provides utilities for integrating transaction cost estimation
 into backtesting frameworks.
 """
 
+import numpy as np
 import pandas as pd
 from typing import Optional
 from .transaction_cost_estimator import TransactionCostEstimator
 from .symbol_data_repository import SymbolDataRepository
 
+# Per-symbol inputs of the spread and market impact models
+SYMBOL_COST_FIELDS = (
+    'avg_relative_spread',
+    'avg_daily_dollar_volume',
+    'daily_volatility',
+    'impact_coefficient'
+)
+
 
 def apply_transaction_costs_to_backtest(
     trades_df: pd.DataFrame,
     estimator: TransactionCostEstimator,
     symbol_repo: SymbolDataRepository,
     removes_liquidity: bool = True,
-    impact_model: str = 'square_root'
+    impact_model: str = 'square_root',
+    date_col: Optional[str] = 'date'
 ) -> pd.DataFrame:
     """
     Apply transaction costs to a backtest trade log.
@@ -35,29 +45,31 @@ def apply_transaction_costs_to_backtest(
         Whether orders remove liquidity (default: True)
     impact_model : str
         Market impact model to use (default: 'square_root')
+    date_col : str, optional
+        Trade date column; when present the tiered monthly volume resets at
+        each month change (trades are costed in log order)
         
     Returns:
     --------
     pd.DataFrame : Trade log with cost columns added
     """
-    cost_results = []
+    # Symbol parameters are looked up once per unique symbol, then gathered per trade
+    symbol_ids, symbols = pd.factorize(trades_df['symbol'])
+    symbol_params = symbol_repo.take(symbol_repo.get_ids(symbols), SYMBOL_COST_FIELDS)
     
-    for _, trade in trades_df.iterrows():
-        symbol_data = symbol_repo.get_symbol_data(trade['symbol'])
-        
-        cost = estimator.calculate_total_cost(
-            shares=abs(trade['shares']),
-            price=trade['price'],
-            direction='buy' if trade['shares'] > 0 else 'sell',
-            symbol_data=symbol_data,
-            removes_liquidity=removes_liquidity,
-            impact_model=impact_model
-        )
-        
-        cost_results.append(cost)
+    signed_shares = trades_df['shares'].to_numpy(dtype=np.float64)
+    cost_df = estimator.calculate_total_cost_batch(
+        shares=np.abs(signed_shares),
+        prices=trades_df['price'].to_numpy(dtype=np.float64),
+        directions=np.where(signed_shares > 0, 'buy', 'sell'),
+        symbol_ids=symbol_ids,
+        symbol_params=symbol_params,
+        removes_liquidity=removes_liquidity,
+        impact_model=impact_model,
+        timestamps=trades_df[date_col] if date_col in trades_df.columns else None
+    )
     
     # Add cost columns to original dataframe
-    cost_df = pd.DataFrame(cost_results)
     result_df = pd.concat([trades_df.reset_index(drop=True), cost_df], axis=1)
     
     return result_df
@@ -205,3 +217,106 @@ def generate_cost_report(
     report.append("=" * 80)
     
     return "\n".join(report)
+
+
+class PortfolioCostModel:
+    """
+    Entry and exit costs for a portfolio simulation's candidate trades.
+    
+    Everything that depends only on the candidate (symbol parameters, fill
+    prices and months, fee rates) is prepared in one batch when the model
+    is built; the simulator then charges each admitted trade with its
+    equity-dependent share count. Both legs share one estimator, so the
+    tiered commission follows the monthly volume actually traded.
+    
+    Parameters:
+    -----------
+    symbols : array-like
+        Symbol of each candidate trade
+    entry_prices, exit_prices : array-like
+        Entry and exit fill prices per candidate
+    direction : int
+        1 for long trades (buy, then sell), -1 for short trades
+    entry_times, exit_times : array-like, optional
+        Fill times for the monthly volume resets
+    estimator : TransactionCostEstimator, optional
+        Fee schedule (default: IBKR tiered); its monthly volume is reset
+    symbol_repo : SymbolDataRepository, optional
+        Symbol data repository (default: repository defaults)
+    removes_liquidity : bool
+        Whether orders remove liquidity (default: True)
+    impact_model : str
+        Market impact model to use (default: 'square_root')
+    """
+    
+    def __init__(
+        self,
+        symbols,
+        entry_prices,
+        exit_prices,
+        direction: int,
+        entry_times=None,
+        exit_times=None,
+        estimator: Optional[TransactionCostEstimator] = None,
+        symbol_repo: Optional[SymbolDataRepository] = None,
+        removes_liquidity: bool = True,
+        impact_model: str = 'square_root'
+    ):
+        self.estimator = estimator if estimator is not None else TransactionCostEstimator()
+        self.estimator.reset_monthly_volume()
+        self.estimator.volume_month = None
+        symbol_repo = symbol_repo if symbol_repo is not None else SymbolDataRepository()
+        
+        symbol_ids, unique_symbols = pd.factorize(np.asarray(symbols))
+        symbol_params = symbol_repo.take(symbol_repo.get_ids(unique_symbols), SYMBOL_COST_FIELDS)
+        n_trades = len(symbol_ids)
+        self._sizing_inputs = (np.asarray(entry_prices, dtype=np.float64), symbol_ids, symbol_params, direction,
+                               removes_liquidity, impact_model)
+        
+        self._entry_cost = self.estimator.fill_cost_function(
+            entry_prices, np.full(n_trades, direction), symbol_ids, symbol_params,
+            removes_liquidity, impact_model, entry_times
+        )
+        self._exit_cost = self.estimator.fill_cost_function(
+            exit_prices, np.full(n_trades, -direction), symbol_ids, symbol_params,
+            removes_liquidity, impact_model, exit_times
+        )
+    
+    def entry_cost(self, i: int, shares: float) -> float:
+        """Cost of opening candidate i with the given shares."""
+        return self._entry_cost(i, shares)
+    
+    def exit_cost(self, i: int, shares: float) -> float:
+        """Cost of closing candidate i with the given shares."""
+        return self._exit_cost(i, shares)
+    
+    def position_share_cap(
+        self,
+        max_impact_bps: Optional[float] = None,
+        expected_edge: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Largest share count per candidate from TransactionCostEstimator.size_positions.
+        
+        The caps do not depend on equity, so they are solved once for all
+        candidates; the simulator sizes each admitted trade as the smaller of
+        its equity-based share count and the cap.
+        
+        Parameters:
+        -----------
+        max_impact_bps : float, optional
+            Cap on entry impact in bps of position value
+        expected_edge : np.ndarray, optional
+            Expected gross return per candidate; sizes at most to the
+            net-P&L-maximizing value (0 where costs exceed the edge)
+            
+        Returns:
+        --------
+        np.ndarray : Share cap per candidate (inf = uncapped)
+        """
+        prices, symbol_ids, symbol_params, direction, removes_liquidity, impact_model = self._sizing_inputs
+        sizing = self.estimator.size_positions(
+            prices, symbol_ids, symbol_params, expected_edge, direction, max_impact_bps,
+            removes_liquidity=removes_liquidity, impact_model=impact_model
+        )
+        return np.where(sizing['binding'] == 'none', np.inf, sizing['shares'])
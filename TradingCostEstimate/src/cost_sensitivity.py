@@ -0,0 +1,186 @@
+"""
+Cost Sensitivity Surface
+Author: Alex Bernal, Senior Quantitative Analyst, QGSI
+Date: January 16, 2026
+
+This module re-prices trade logs under many spread and market impact
+assumptions at once. Per-trade costs are decomposed into the parts each
+assumption scales:
+
+    cost = fixed + k × spread + c × Σ_legs impact_base × participation^α
+
+- fixed: commission, exchange, clearing, regulatory and pass-through fees
+- spread: half-spread cost at the repository spread (k = spread multiplier)
+- impact_base: volatility × trade value per leg (c = impact coefficient,
+  α = impact exponent; α = 0.5 is the square-root model)
+
+Net P&L for a whole (k, c, α) grid is then broadcasting over the cached
+components, one (trades × scenarios) matrix per exponent. Rank shifts are
+measured against BASELINE_SCENARIO, the estimator's own assumptions
+(repository spread, default impact coefficient, square-root impact).
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence, Tuple
+from .symbol_data_repository import DEFAULT_SYMBOL_DATA
+
+DEFAULT_SPREAD_MULTIPLIERS = (0.5, 1.0, 1.5, 2.0, 3.0)
+DEFAULT_IMPACT_COEFFICIENTS = (0.0, 0.35, 0.7, 1.0, 1.5)
+DEFAULT_IMPACT_EXPONENTS = (0.4, 0.5, 0.6, 1.0)
+SCENARIO_COLUMNS = ['SpreadMultiplier', 'ImpactCoefficient', 'ImpactExponent']
+BASELINE_SCENARIO = (1.0, DEFAULT_SYMBOL_DATA['impact_coefficient'], 0.5)
+
+
+def decompose_costs(*legs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Combine the cost components of each leg of a trade (e.g. entry and exit).
+
+    Parameters:
+    -----------
+    *legs : dict
+        Outputs of TransactionCostEstimator.calculate_cost_components,
+        aligned trade by trade
+
+    Returns:
+    --------
+    dict : 'fixed' and 'spread' per trade, 'impact_base' and 'participation'
+           as (trades × legs) arrays
+    """
+    return {
+        'fixed': sum(leg['total_brokerage'] for leg in legs),
+        'spread': sum(leg['spread_cost'] for leg in legs),
+        'impact_base': np.column_stack([leg['impact_base'] for leg in legs]),
+        'participation': np.column_stack([leg['participation_rate'] for leg in legs]),
+    }
+
+
+def cost_sensitivity_surface(
+    gross_pnl: np.ndarray,
+    components: Dict[str, np.ndarray],
+    spread_multipliers: Sequence[float] = DEFAULT_SPREAD_MULTIPLIERS,
+    impact_coefficients: Sequence[float] = DEFAULT_IMPACT_COEFFICIENTS,
+    impact_exponents: Sequence[float] = DEFAULT_IMPACT_EXPONENTS,
+    groups: Optional[np.ndarray] = None,
+    baseline: Tuple[float, float, float] = BASELINE_SCENARIO
+) -> pd.DataFrame:
+    """
+    Net performance of each group of trades under every cost scenario.
+
+    Parameters:
+    -----------
+    gross_pnl : np.ndarray
+        P&L per trade before costs
+    components : dict
+        Cost decomposition from decompose_costs
+    spread_multipliers : list
+        Multipliers on the repository spread
+    impact_coefficients : list
+        Impact coefficients (replace the per-symbol coefficient)
+    impact_exponents : list
+        Participation exponents α
+    groups : np.ndarray, optional
+        Strategy / configuration label per trade (default: one group)
+    baseline : tuple
+        (spread multiplier, impact coefficient, exponent) ranks are compared
+        against with several groups; must be in the grid
+
+    Returns:
+    --------
+    pd.DataFrame : One row per (group, scenario) with TotalTrades,
+                   GrossProfit, FixedCost, SpreadCost, ImpactCost, TotalCost,
+                   NetProfit, ProfitFactor, WinRate, SystemScore and, with
+                   several groups, Rank (by SystemScore within the scenario),
+                   BaselineRank and RankShift
+    """
+    gross_pnl = np.asarray(gross_pnl, dtype=np.float64)
+    if groups is None:
+        codes, labels = np.zeros(len(gross_pnl), dtype=np.int64), np.array(['All'], dtype=object)
+    else:
+        codes, labels = pd.factorize(np.asarray(groups))
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(order) else order
+    present = sorted_codes[starts]
+
+    def group_sum(values):
+        return np.add.reduceat(values[order], starts, axis=0)
+
+    base = gross_pnl - components['fixed']
+    spread = components['spread']
+    impact_base = np.atleast_2d(components['impact_base'].T).T
+    with np.errstate(divide='ignore'):
+        log_participation = np.log(np.atleast_2d(components['participation'].T).T)
+
+    # (k, c) grid flattened; α handled one matrix at a time
+    k_grid, c_grid = (g.ravel() for g in np.meshgrid(np.asarray(spread_multipliers, dtype=np.float64),
+                                                     np.asarray(impact_coefficients, dtype=np.float64),
+                                                     indexing='ij'))
+    n_trades = np.diff(np.r_[starts, len(order)])
+    gross_total = group_sum(gross_pnl)
+    fixed_total = group_sum(components['fixed'])
+    spread_total = group_sum(spread)
+
+    frames = []
+    for alpha in impact_exponents:
+        impact_unit = (impact_base * np.exp(alpha * log_participation)).sum(axis=1)
+        net = base[:, None] - spread[:, None] * k_grid[None, :] - impact_unit[:, None] * c_grid[None, :]
+
+        net_total = group_sum(net)
+        profit = group_sum(np.maximum(net, 0.0))
+        loss = -group_sum(np.minimum(net, 0.0))
+        wins = group_sum((net > 0).astype(np.int64))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_factor = np.where(loss > 0, profit / loss, np.where(profit > 0, 10.0, 0.0))
+            win_rate = wins / n_trades[:, None]
+
+        n_groups, n_scenarios = net_total.shape
+        spread_cost = spread_total[:, None] * k_grid[None, :]
+        impact_cost = group_sum(impact_unit)[:, None] * c_grid[None, :]
+        frames.append(pd.DataFrame({
+            'Group': np.repeat(labels[present], n_scenarios),
+            'SpreadMultiplier': np.tile(k_grid, n_groups),
+            'ImpactCoefficient': np.tile(c_grid, n_groups),
+            'ImpactExponent': alpha,
+            'TotalTrades': np.repeat(n_trades, n_scenarios),
+            'GrossProfit': np.repeat(gross_total, n_scenarios),
+            'FixedCost': np.repeat(fixed_total, n_scenarios),
+            'SpreadCost': spread_cost.ravel(),
+            'ImpactCost': impact_cost.ravel(),
+            'TotalCost': (fixed_total[:, None] + spread_cost + impact_cost).ravel(),
+            'NetProfit': net_total.ravel(),
+            'ProfitFactor': profit_factor.ravel(),
+            'WinRate': win_rate.ravel(),
+            'SystemScore': (net_total * profit_factor).ravel(),
+        }))
+
+    surface = pd.concat(frames, ignore_index=True)
+    if len(labels) > 1:
+        surface = rank_scenarios(surface, baseline=baseline)
+    return surface
+
+
+def rank_scenarios(
+    surface: pd.DataFrame,
+    score_col: str = 'SystemScore',
+    baseline: Tuple[float, float, float] = BASELINE_SCENARIO
+) -> pd.DataFrame:
+    """
+    Rank groups within each scenario (1 = best score).
+
+    Also adds BaselineRank (rank in the baseline scenario, by default the
+    estimator's own assumptions) and RankShift = Rank - BaselineRank.
+    Raises ValueError when the baseline scenario is not in the surface.
+    """
+    surface = surface.copy()
+    surface['Rank'] = surface.groupby(SCENARIO_COLUMNS)[score_col].rank(
+        ascending=False, method='first').astype(int)
+
+    in_baseline = np.logical_and.reduce([np.isclose(surface[col], value)
+                                         for col, value in zip(SCENARIO_COLUMNS, baseline)])
+    if not in_baseline.any():
+        raise ValueError(f"Baseline scenario {dict(zip(SCENARIO_COLUMNS, baseline))} is not in the grid")
+    baseline_rank = surface.loc[in_baseline].set_index('Group')['Rank']
+    surface['BaselineRank'] = surface['Group'].map(baseline_rank).to_numpy()
+    surface['RankShift'] = surface['Rank'] - surface['BaselineRank']
+    return surface
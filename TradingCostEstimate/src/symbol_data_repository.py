@@ -7,17 +7,73 @@ This module provides a repository for storing and retrieving symbol-specific
 trading cost parameters such as spreads, volatility, and average daily volume.
 """
 
+import numpy as np
 import pandas as pd
-from typing import Dict, Optional
+from typing import Dict, Optional, Sequence
+
+# Numeric per-symbol parameters, each stored as one contiguous float64 array
+NUMERIC_FIELDS = (
+    'avg_daily_dollar_volume',
+    'avg_relative_spread',
+    'daily_volatility',
+    'impact_coefficient'
+)
+FIELDS = NUMERIC_FIELDS + ('liquidity_tier',)
+OPTIONAL_FIELDS = ('impact_coefficient', 'liquidity_tier')
+
+# Conservative defaults for unknown symbols
+DEFAULT_SYMBOL_DATA = {
+    'avg_daily_dollar_volume': 100_000_000,  # $100M
+    'avg_relative_spread': 0.0005,  # 5 bps
+    'daily_volatility': 0.020,  # 2%
+    'impact_coefficient': 0.7,
+    'liquidity_tier': 'unknown'
+}
+
+_INITIAL_CAPACITY = 64
 
 
 class SymbolDataRepository:
     """
     Repository for symbol-specific trading cost parameters.
+    
+    Storage is columnar: each symbol gets an integer id (its row), and every
+    parameter lives in one contiguous array indexed by id. Resolve symbols
+    to ids once with get_ids, then gather parameters for any number of
+    trades with take. Unknown symbols get id -1, which take fills with
+    DEFAULT_SYMBOL_DATA.
     """
     
     def __init__(self):
-        self.data = {}
+        self.symbol_ids: Dict[str, int] = {}
+        self._symbols = np.empty(_INITIAL_CAPACITY, dtype=object)
+        self._columns = {field: np.empty(_INITIAL_CAPACITY) for field in NUMERIC_FIELDS}
+        self._columns['liquidity_tier'] = np.empty(_INITIAL_CAPACITY, dtype=object)
+        self._size = 0
+        self._index = None  # pd.Index over symbols, rebuilt lazily for get_ids
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.symbol_ids
+    
+    def _reserve(self, n_new: int):
+        """Grow the arrays (doubling) so n_new more symbols fit."""
+        needed = self._size + n_new
+        capacity = len(self._symbols)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        
+        def grown(values):
+            out = np.empty(capacity, dtype=values.dtype)
+            out[:self._size] = values[:self._size]
+            return out
+        
+        self._symbols = grown(self._symbols)
+        self._columns = {field: grown(values) for field, values in self._columns.items()}
     
     def add_symbol(
         self,
@@ -29,7 +85,7 @@ class SymbolDataRepository:
         liquidity_tier: str = 'unknown'
     ):
         """
-        Add symbol-specific parameters.
+        Add symbol-specific parameters (replaces the symbol's values if present).
         
         Parameters:
         -----------
@@ -46,31 +102,86 @@ class SymbolDataRepository:
         liquidity_tier : str
             'mega_cap', 'large_cap', 'mid_cap', etc.
         """
-        self.data[symbol] = {
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            self._reserve(1)
+            symbol_id = self._size
+            self._symbols[symbol_id] = symbol
+            self.symbol_ids[symbol] = symbol_id
+            self._size += 1
+            self._index = None
+        
+        values = {
             'avg_daily_dollar_volume': avg_daily_dollar_volume,
             'avg_relative_spread': avg_relative_spread,
             'daily_volatility': daily_volatility,
             'impact_coefficient': impact_coefficient,
             'liquidity_tier': liquidity_tier
         }
+        for field, value in values.items():
+            self._columns[field][symbol_id] = value
+    
+    def get_ids(self, symbols: Sequence[str]) -> np.ndarray:
+        """
+        Integer id of each symbol, -1 for symbols not in the repository.
+        
+        Parameters:
+        -----------
+        symbols : array-like
+            Ticker symbols (e.g. a trade log's symbol column)
+            
+        Returns:
+        --------
+        np.ndarray : int64 ids, same length as symbols
+        """
+        if self._index is None:
+            self._index = pd.Index(self._symbols[:self._size])
+        return self._index.get_indexer(pd.Index(symbols)).astype(np.int64)
+    
+    def take(self, ids: np.ndarray, fields: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Gather parameters for an array of symbol ids.
+        
+        Parameters:
+        -----------
+        ids : np.ndarray
+            Symbol ids from get_ids; -1 gathers the defaults
+        fields : list, optional
+            Parameters to gather (default: all of FIELDS)
+            
+        Returns:
+        --------
+        dict : One array per field, aligned with ids
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        known = ids >= 0
+        safe_ids = np.where(known, ids, 0)
+        gathered = {}
+        for field in (FIELDS if fields is None else fields):
+            values = self._columns[field][:self._size]
+            if self._size:
+                column = values[safe_ids]
+                gathered[field] = np.where(known, column, DEFAULT_SYMBOL_DATA[field]).astype(values.dtype)
+            else:
+                gathered[field] = np.full(len(ids), DEFAULT_SYMBOL_DATA[field], dtype=values.dtype)
+        return gathered
     
     def get_symbol_data(self, symbol: str) -> Dict:
         """Retrieve symbol data, with defaults if not found."""
-        if symbol in self.data:
-            return self.data[symbol]
-        else:
-            # Return conservative defaults for unknown symbols
-            return {
-                'avg_daily_dollar_volume': 100_000_000,  # $100M
-                'avg_relative_spread': 0.0005,  # 5 bps
-                'daily_volatility': 0.020,  # 2%
-                'impact_coefficient': 0.7,
-                'liquidity_tier': 'unknown'
-            }
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            return dict(DEFAULT_SYMBOL_DATA)
+        
+        data = {field: float(self._columns[field][symbol_id]) for field in NUMERIC_FIELDS}
+        data['liquidity_tier'] = self._columns['liquidity_tier'][symbol_id]
+        return data
     
     def load_from_dataframe(self, df: pd.DataFrame):
         """
-        Load symbol data from a pandas DataFrame.
+        Load symbol data from a pandas DataFrame in one bulk assignment.
+        
+        Existing symbols are overwritten; for repeated symbols the last row
+        wins.
         
         Expected columns:
         - symbol
@@ -80,15 +191,30 @@ class SymbolDataRepository:
         - impact_coefficient (optional)
         - liquidity_tier (optional)
         """
-        for _, row in df.iterrows():
-            self.add_symbol(
-                symbol=row['symbol'],
-                avg_daily_dollar_volume=row['avg_daily_dollar_volume'],
-                avg_relative_spread=row['avg_relative_spread'],
-                daily_volatility=row['daily_volatility'],
-                impact_coefficient=row.get('impact_coefficient', 0.7),
-                liquidity_tier=row.get('liquidity_tier', 'unknown')
-            )
+        df = df.drop_duplicates('symbol', keep='last')
+        symbols = df['symbol'].to_numpy(dtype=object)
+        ids = self.get_ids(symbols)
+        
+        new = ids < 0
+        n_new = int(new.sum())
+        if n_new:
+            self._reserve(n_new)
+            ids[new] = np.arange(self._size, self._size + n_new)
+            self._symbols[ids[new]] = symbols[new]
+            self.symbol_ids.update(zip(symbols[new], ids[new].tolist()))
+            self._size += n_new
+            self._index = None
+        
+        for field in FIELDS:
+            if field in df.columns or field not in OPTIONAL_FIELDS:
+                values = df[field].to_numpy()
+            else:
+                values = DEFAULT_SYMBOL_DATA[field]
+            self._columns[field][ids] = values
+    
+    def load_from_parquet(self, path: str):
+        """Load symbol data from a parquet file (columns as in load_from_dataframe)."""
+        self.load_from_dataframe(pd.read_parquet(path))
     
     def to_dataframe(self) -> pd.DataFrame:
         """
@@ -98,22 +224,28 @@ class SymbolDataRepository:
         --------
         pd.DataFrame : DataFrame with all symbol data
         """
-        records = []
-        for symbol, data in self.data.items():
-            record = {'symbol': symbol}
-            record.update(data)
-            records.append(record)
-        
-        return pd.DataFrame(records)
+        data = {'symbol': self._symbols[:self._size]}
+        data.update({field: self._columns[field][:self._size] for field in FIELDS})
+        return pd.DataFrame(data)
     
     def get_all_symbols(self) -> list:
         """Return list of all symbols in the repository."""
-        return list(self.data.keys())
+        return self._symbols[:self._size].tolist()
     
     def remove_symbol(self, symbol: str):
-        """Remove a symbol from the repository."""
-        if symbol in self.data:
-            del self.data[symbol]
+        """Remove a symbol from the repository (ids of later symbols shift down by one)."""
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            return
+        
+        keep = np.arange(self._size) != symbol_id
+        n = self._size - 1
+        self._symbols[:n] = self._symbols[:self._size][keep]
+        for values in self._columns.values():
+            values[:n] = values[:self._size][keep]
+        self._size = n
+        self.symbol_ids = {s: i for i, s in enumerate(self._symbols[:n])}
+        self._index = None
     
     def update_symbol(self, symbol: str, **kwargs):
         """
@@ -126,11 +258,11 @@ class SymbolDataRepository:
         **kwargs : dict
             Parameters to update (e.g., avg_daily_dollar_volume=500000000)
         """
-        if symbol not in self.data:
+        if symbol not in self.symbol_ids:
             raise ValueError(f"Symbol {symbol} not found in repository")
         
         for key, value in kwargs.items():
-            if key in self.data[symbol]:
-                self.data[symbol][key] = value
+            if key in self._columns:
+                self._columns[key][self.symbol_ids[symbol]] = value
             else:
                 raise ValueError(f"Invalid parameter: {key}")
@@ -33,6 +33,7 @@ class TransactionCostEstimator:
         """
         self.broker = broker
         self.monthly_volume = 0  # Track cumulative monthly volume for tiering
+        self.volume_month = None  # Month of monthly_volume when trades carry timestamps
         
         # IBKR Pro Tiered commission schedule
         self.ibkr_tiered_schedule = [
@@ -268,7 +269,8 @@ class TransactionCostEstimator:
         direction: Literal['buy', 'sell'],
         symbol_data: Dict,
         removes_liquidity: bool = True,
-        impact_model: str = 'square_root'
+        impact_model: str = 'square_root',
+        timestamp: Optional[pd.Timestamp] = None
     ) -> Dict[str, float]:
         """
         Calculate total transaction cost for a trade.
@@ -287,11 +289,19 @@ class TransactionCostEstimator:
             Whether order removes liquidity
         impact_model : str
             Market impact model to use
+        timestamp : pd.Timestamp, optional
+            Trade time; the monthly volume resets when the month changes
             
         Returns:
         --------
         dict : Complete cost breakdown
         """
+        if timestamp is not None:
+            month = pd.Timestamp(timestamp).to_period('M').ordinal
+            if month != self.volume_month:
+                self.reset_monthly_volume()
+                self.volume_month = month
+        
         trade_value = shares * price
         
         # Calculate each component
@@ -340,6 +350,641 @@ class TransactionCostEstimator:
             'monthly_volume': self.monthly_volume
         }
     
+    def _starting_volume(
+        self,
+        shares: np.ndarray,
+        timestamps: Optional[np.ndarray] = None
+    ) -> tuple:
+        """
+        Monthly volume before each trade, with resets at month changes.
+        
+        Trades are taken in array order. Each run of consecutive trades in
+        the same month is one cumsum group; only the first run can continue
+        self.monthly_volume (if it is in self.volume_month, or if no
+        timestamps are given), exactly as calculate_total_cost would.
+        
+        Returns:
+        --------
+        tuple : (starting volume per trade, month ordinal of the last trade or None)
+        """
+        def running_total(carried, run):
+            # Cumsum seeded with the carried volume adds in the same order as
+            # `self.monthly_volume += shares`, so the totals match bit for bit
+            return np.cumsum(np.r_[float(carried), run[:-1]]) if len(run) else run
+        
+        if timestamps is None:
+            return running_total(self.monthly_volume, shares), None
+        
+        months = pd.DatetimeIndex(timestamps).to_period('M').asi8
+        starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]]) if len(months) else months
+        ends = np.r_[starts[1:], len(months)].astype(np.int64)
+        
+        start_volume = np.empty(len(shares))
+        for a, b in zip(starts, ends):
+            carried = self.monthly_volume if a == 0 and months[a] == self.volume_month else 0
+            start_volume[a:b] = running_total(carried, shares[a:b])
+        return start_volume, (int(months[-1]) if len(months) else None)
+    
+    def _tiered_commission_from_volume(self, start_volume: np.ndarray, shares: np.ndarray) -> np.ndarray:
+        """
+        Integrate the marginal tier rate over [start, start + shares) for each trade.
+        
+        searchsorted finds the tier each trade starts in. Trades that fit in
+        the room left in that tier (nearly all) cost shares × rate in closed
+        form; the few that cross a boundary walk the remaining tiers
+        together, with the same arithmetic as calculate_tiered_commission.
+        """
+        limits = np.array([limit for limit, _ in self.ibkr_tiered_schedule])
+        rates = np.array([rate for _, rate in self.ibkr_tiered_schedule])
+        
+        first = np.searchsorted(limits, start_volume, side='right')
+        room = limits[first] - start_volume
+        commission = shares * rates[first]
+        
+        crossing = np.flatnonzero(shares > room)
+        if len(crossing):
+            tier = first[crossing]
+            partial = room[crossing] * rates[tier]
+            remaining = shares[crossing] - room[crossing]
+            current = start_volume[crossing] + room[crossing]
+            for _ in range(len(limits) - 1):
+                tier = np.minimum(tier + 1, len(limits) - 1)
+                active = remaining > 0
+                in_tier = np.where(active, np.minimum(remaining, limits[tier] - current), 0.0)
+                partial += np.where(active, in_tier * rates[tier], 0.0)
+                remaining -= in_tier
+                current += in_tier
+            commission[crossing] = partial
+        
+        return commission
+    
+    def calculate_tiered_commission_batch(
+        self,
+        shares: np.ndarray,
+        timestamps: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Calculate IBKR Pro Tiered commission for a sequence of trades at once.
+        
+        Each trade's starting monthly volume comes from a per-month grouped
+        cumsum, so the result matches calling calculate_tiered_commission
+        trade by trade (with month resets). Does not update
+        self.monthly_volume.
+        
+        Parameters:
+        -----------
+        shares : np.ndarray
+            Shares per trade, in execution order
+        timestamps : array-like, optional
+            Trade times; the monthly volume resets whenever the month changes
+            
+        Returns:
+        --------
+        np.ndarray : Commission per trade in dollars
+        """
+        shares = np.asarray(shares, dtype=np.float64)
+        start_volume, _ = self._starting_volume(shares, timestamps)
+        return self._tiered_commission_from_volume(start_volume, shares)
+    
+    def calculate_cost_components(
+        self,
+        shares: np.ndarray,
+        prices: np.ndarray,
+        directions: np.ndarray,
+        symbol_ids: Optional[np.ndarray],
+        symbol_params: Dict[str, np.ndarray],
+        removes_liquidity: bool = True,
+        impact_model: str = 'square_root',
+        commission: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Per-trade cost components as arrays, without updating monthly volume.
+        
+        The array core of calculate_total_cost_batch, for callers that cost
+        many hypothetical fills (e.g. parameter sweeps) and only need sums.
+        
+        Parameters:
+        -----------
+        shares : np.ndarray
+            Shares per trade (absolute)
+        prices : np.ndarray
+            Execution price per trade
+        directions : np.ndarray
+            'buy'/'sell' labels, or signed numbers (negative = sell)
+        symbol_ids : np.ndarray or None
+            Integer index of each trade's symbol into symbol_params; None if
+            symbol_params are already aligned with the trades
+        symbol_params : dict
+            Per-symbol arrays: 'avg_relative_spread', 'avg_daily_dollar_volume',
+            'daily_volatility', 'impact_coefficient' (e.g. SymbolDataRepository.take)
+        removes_liquidity : bool
+            Whether orders remove liquidity
+        impact_model : str
+            Market impact model to use
+        commission : np.ndarray, optional
+            Base commission per trade before the $0.35 minimum and 1% cap.
+            Default: the marginal tier rate at self.monthly_volume
+            (ibkr_tiered) or $0.005/share (ibkr_fixed)
+            
+        Returns:
+        --------
+        dict : Arrays trade_value, commission, exchange_fee, clearing_fee,
+               regulatory_fees, passthrough_fees, total_brokerage, spread_cost,
+               impact_cost, total_cost, participation_rate and impact_base
+               (volatility × trade value, so impact_cost = impact_coefficient
+               × impact_base × participation_rate ** exponent)
+        """
+        shares = np.asarray(shares, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        directions = np.asarray(directions)
+        if directions.dtype.kind in 'UOS':
+            is_sell = directions == 'sell'
+        else:
+            is_sell = directions < 0
+        trade_value = shares * prices
+        
+        def param(key):
+            values = np.asarray(symbol_params[key], dtype=np.float64)
+            return values if symbol_ids is None else values[symbol_ids]
+        
+        # 1. Base commission
+        if commission is None:
+            if self.broker == 'ibkr_tiered':
+                tier = next(rate for limit, rate in self.ibkr_tiered_schedule if self.monthly_volume < limit)
+                commission = shares * tier
+            elif self.broker == 'ibkr_fixed':
+                commission = shares * 0.005
+            else:
+                raise ValueError(f"Unknown broker: {self.broker}")
+        commission = np.minimum(np.maximum(commission, 0.35), trade_value * 0.01)
+        
+        # 2-5. Exchange, clearing, regulatory (sells only) and pass-through fees
+        exchange_rate = self.exchange_fee_remove if removes_liquidity else self.exchange_fee_add
+        exchange_fee = shares * exchange_rate
+        clearing_fee = shares * self.clearing_fee
+        sec_fee = np.where(is_sell, trade_value * self.sec_fee_rate, 0.0)
+        finra_taf = np.where(is_sell, shares * self.finra_taf, 0.0)
+        nyse_passthrough = commission * self.nyse_passthrough_rate
+        finra_passthrough = commission * self.finra_passthrough_rate
+        total_brokerage = (
+            commission +
+            exchange_fee +
+            clearing_fee +
+            sec_fee +
+            finra_taf +
+            nyse_passthrough +
+            finra_passthrough
+        )
+        
+        # Spread: half the relative spread (one-way crossing)
+        spread_cost = 0.5 * param('avg_relative_spread') * trade_value
+        
+        # Market impact
+        participation_rate = trade_value / param('avg_daily_dollar_volume')
+        volatility = param('daily_volatility')
+        impact_coeff = param('impact_coefficient')
+        if impact_model == 'square_root':
+            impact_pct = (participation_rate ** 0.5) * volatility * impact_coeff
+        elif impact_model == 'linear':
+            impact_pct = participation_rate * volatility * impact_coeff
+        elif impact_model == 'power_law':
+            impact_pct = (participation_rate ** 0.6) * volatility * impact_coeff
+        else:
+            raise ValueError(f"Unknown model: {impact_model}")
+        impact_cost = impact_pct * trade_value
+        
+        return {
+            'trade_value': trade_value,
+            'commission': commission,
+            'exchange_fee': exchange_fee,
+            'clearing_fee': clearing_fee,
+            'regulatory_fees': sec_fee + finra_taf,
+            'passthrough_fees': nyse_passthrough + finra_passthrough,
+            'total_brokerage': total_brokerage,
+            'spread_cost': spread_cost,
+            'impact_cost': impact_cost,
+            'total_cost': total_brokerage + spread_cost + impact_cost,
+            'participation_rate': participation_rate,
+            'impact_base': volatility * trade_value
+        }
+    
+    def order_cost_function(
+        self,
+        shares: np.ndarray,
+        directions: np.ndarray,
+        symbol_ids: Optional[np.ndarray],
+        symbol_params: Dict[str, np.ndarray],
+        removes_liquidity: bool = True,
+        impact_model: str = 'square_root'
+    ):
+        """
+        Total cost of fixed orders as a function of their execution prices.
+        
+        Same model as calculate_cost_components, with every price-independent
+        term (share-based fees, the base commission, per-symbol spread and
+        impact factors) computed once. Each call at new prices then takes a
+        few array operations, for sweeps that fill the same orders at many
+        candidate prices. Results agree with calculate_cost_components to
+        floating-point rounding.
+        
+        Parameters:
+        -----------
+        shares, directions, symbol_ids, symbol_params, removes_liquidity, impact_model :
+            As in calculate_cost_components
+            
+        Returns:
+        --------
+        callable : prices (np.ndarray) -> total cost per order
+        """
+        shares = np.asarray(shares, dtype=np.float64)
+        directions = np.asarray(directions)
+        if directions.dtype.kind in 'UOS':
+            is_sell = directions == 'sell'
+        else:
+            is_sell = directions < 0
+        
+        def param(key):
+            values = np.asarray(symbol_params[key], dtype=np.float64)
+            return values if symbol_ids is None else values[symbol_ids]
+        
+        if self.broker == 'ibkr_tiered':
+            tier = next(rate for limit, rate in self.ibkr_tiered_schedule if self.monthly_volume < limit)
+            commission = np.maximum(shares * tier, 0.35)
+        elif self.broker == 'ibkr_fixed':
+            commission = np.maximum(shares * 0.005, 0.35)
+        else:
+            raise ValueError(f"Unknown broker: {self.broker}")
+        
+        exchange_rate = self.exchange_fee_remove if removes_liquidity else self.exchange_fee_add
+        share_fees = shares * exchange_rate + shares * self.clearing_fee + np.where(is_sell, shares * self.finra_taf, 0.0)
+        passthrough_factor = 1.0 + self.nyse_passthrough_rate + self.finra_passthrough_rate
+        value_rate = np.where(is_sell, self.sec_fee_rate, 0.0) + 0.5 * param('avg_relative_spread')
+        
+        # impact_cost = (value / adv) ** e * volatility * coefficient * value
+        exponent = {'square_root': 0.5, 'linear': 1.0, 'power_law': 0.6}.get(impact_model)
+        if exponent is None:
+            raise ValueError(f"Unknown model: {impact_model}")
+        impact_scale = param('daily_volatility') * param('impact_coefficient') / param('avg_daily_dollar_volume') ** exponent
+        
+        def total_cost(prices):
+            trade_value = shares * prices
+            if exponent == 0.5:
+                impact = impact_scale * trade_value * np.sqrt(trade_value)
+            else:
+                impact = impact_scale * trade_value ** (1.0 + exponent)
+            capped = np.minimum(commission, trade_value * 0.01)
+            return share_fees + capped * passthrough_factor + value_rate * trade_value + impact
+        
+        return total_cost
+    
+    def fill_cost_function(
+        self,
+        prices: np.ndarray,
+        directions: np.ndarray,
+        symbol_ids: Optional[np.ndarray],
+        symbol_params: Dict[str, np.ndarray],
+        removes_liquidity: bool = True,
+        impact_model: str = 'square_root',
+        timestamps: Optional[np.ndarray] = None
+    ):
+        """
+        Total cost of candidate fills whose size is only known when they execute.
+        
+        The counterpart of order_cost_function for simulations that size
+        positions from running equity: every share-independent term (fee
+        rates, per-symbol spread and impact factors, fill months) is computed
+        once for all candidates, and each call prices one fill with scalar
+        arithmetic. Calls update self.monthly_volume, so the tiered
+        commission follows the volume actually traded. The monthly volume
+        resets when a fill falls in a later month than self.volume_month;
+        fills booked late from an earlier month count towards the current one.
+        
+        Parameters:
+        -----------
+        prices, directions, symbol_ids, symbol_params, removes_liquidity, impact_model :
+            As in calculate_cost_components, one entry per candidate fill
+        timestamps : array-like, optional
+            Fill times for the monthly volume resets
+        
+        Returns:
+        --------
+        callable : (candidate index, shares) -> total cost in dollars
+        """
+        directions = np.asarray(directions)
+        if directions.dtype.kind in 'UOS':
+            is_sell = directions == 'sell'
+        else:
+            is_sell = directions < 0
+        
+        def param(key):
+            values = np.asarray(symbol_params[key], dtype=np.float64)
+            return values if symbol_ids is None else values[symbol_ids]
+        
+        if self.broker not in ('ibkr_tiered', 'ibkr_fixed'):
+            raise ValueError(f"Unknown broker: {self.broker}")
+        exponent = {'square_root': 0.5, 'linear': 1.0, 'power_law': 0.6}.get(impact_model)
+        if exponent is None:
+            raise ValueError(f"Unknown model: {impact_model}")
+        
+        exchange_rate = self.exchange_fee_remove if removes_liquidity else self.exchange_fee_add
+        share_rate = (exchange_rate + self.clearing_fee + np.where(is_sell, self.finra_taf, 0.0)).tolist()
+        value_rate = (np.where(is_sell, self.sec_fee_rate, 0.0) + 0.5 * param('avg_relative_spread')).tolist()
+        impact_scale = (param('daily_volatility') * param('impact_coefficient') /
+                        param('avg_daily_dollar_volume') ** exponent).tolist()
+        prices = np.asarray(prices, dtype=np.float64).tolist()
+        months = None if timestamps is None else pd.DatetimeIndex(timestamps).to_period('M').asi8.tolist()
+        passthrough_factor = 1.0 + self.nyse_passthrough_rate + self.finra_passthrough_rate
+        
+        def total_cost(i, shares):
+            if months is not None and (self.volume_month is None or months[i] > self.volume_month):
+                self.reset_monthly_volume()
+                self.volume_month = months[i]
+        
+            trade_value = shares * prices[i]
+            if self.broker == 'ibkr_tiered':
+                commission = self.calculate_tiered_commission(shares)
+            else:
+                commission = shares * 0.005
+            commission = min(max(commission, 0.35), trade_value * 0.01)
+            if exponent == 0.5:
+                impact = impact_scale[i] * trade_value * trade_value ** 0.5
+            else:
+                impact = impact_scale[i] * trade_value ** (1.0 + exponent)
+        
+            self.monthly_volume += shares
+            return share_rate[i] * shares + commission * passthrough_factor + value_rate[i] * trade_value + impact
+        
+        return total_cost
+
+    def calculate_total_cost_batch(
+        self,
+        shares: np.ndarray,
+        prices: np.ndarray,
+        directions: np.ndarray,
+        symbol_ids: np.ndarray,
+        symbol_params: Dict[str, np.ndarray],
+        removes_liquidity: bool = True,
+        impact_model: str = 'square_root',
+        timestamps: Optional[np.ndarray] = None
+    ) -> pd.DataFrame:
+        """
+        Calculate transaction costs for many trades at once.
+        
+        Same cost model and output columns as calculate_total_cost, with
+        every component computed by NumPy broadcasting (the impact power
+        terms may differ from the scalar path by one ulp). Trades are costed
+        in array order for the tiered commission, and self.monthly_volume
+        ends where it would after calling calculate_total_cost for each
+        trade.
+        
+        Parameters:
+        -----------
+        shares : np.ndarray
+            Shares per trade (absolute)
+        prices : np.ndarray
+            Execution price per trade
+        directions : np.ndarray
+            'buy'/'sell' labels, or signed numbers (negative = sell)
+        symbol_ids : np.ndarray
+            Integer index of each trade's symbol into symbol_params
+        symbol_params : dict
+            Per-symbol arrays: 'avg_relative_spread', 'avg_daily_dollar_volume',
+            'daily_volatility', 'impact_coefficient' (e.g. SymbolDataRepository.take)
+        removes_liquidity : bool
+            Whether orders remove liquidity
+        impact_model : str
+            Market impact model to use
+        timestamps : array-like, optional
+            Trade times; the monthly volume resets whenever the month changes
+            
+        Returns:
+        --------
+        pd.DataFrame : One row per trade, columns as in calculate_total_cost
+        """
+        shares = np.asarray(shares, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        directions = np.asarray(directions)
+        start_volume, last_month = self._starting_volume(shares, timestamps)
+        monthly_volume = start_volume + shares
+        
+        # Base commission walks the tiers with each trade's monthly volume
+        if self.broker == 'ibkr_tiered':
+            commission = self._tiered_commission_from_volume(start_volume, shares)
+        elif self.broker == 'ibkr_fixed':
+            commission = shares * 0.005
+        else:
+            raise ValueError(f"Unknown broker: {self.broker}")
+        costs = self.calculate_cost_components(
+            shares, prices, directions, np.asarray(symbol_ids, dtype=np.intp), symbol_params,
+            removes_liquidity, impact_model, commission
+        )
+        is_sell = directions == 'sell' if directions.dtype.kind in 'UOS' else directions < 0
+        trade_value = costs['trade_value']
+        
+        if len(shares):
+            self.monthly_volume = monthly_volume[-1]
+            if last_month is not None:
+                self.volume_month = last_month
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return pd.DataFrame({
+                'trade_value': trade_value,
+                'shares': shares,
+                'price': prices,
+                'direction': np.where(is_sell, 'sell', 'buy'),
+                
+                # Brokerage breakdown
+                'commission': costs['commission'],
+                'exchange_fee': costs['exchange_fee'],
+                'clearing_fee': costs['clearing_fee'],
+                'regulatory_fees': costs['regulatory_fees'],
+                'total_brokerage': costs['total_brokerage'],
+                'total_brokerage_bps': (costs['total_brokerage'] / trade_value) * 10000,
+                
+                # Implicit costs
+                'spread_cost': costs['spread_cost'],
+                'spread_cost_bps': (costs['spread_cost'] / trade_value) * 10000,
+                'impact_cost': costs['impact_cost'],
+                'impact_cost_bps': (costs['impact_cost'] / trade_value) * 10000,
+                
+                # Total
+                'total_cost': costs['total_cost'],
+                'total_cost_bps': (costs['total_cost'] / trade_value) * 10000,
+                
+                # Metadata
+                'participation_rate': costs['participation_rate'],
+                'monthly_volume': monthly_volume
+            })
+    
+    def size_positions(
+        self,
+        prices: np.ndarray,
+        symbol_ids: Optional[np.ndarray],
+        symbol_params: Dict[str, np.ndarray],
+        expected_edge: Optional[np.ndarray] = None,
+        direction: int = 1,
+        max_impact_bps: Optional[float] = None,
+        max_value: Optional[np.ndarray] = None,
+        removes_liquidity: bool = True,
+        impact_model: str = 'square_root',
+        round_trip: bool = True
+    ) -> Dict[str, np.ndarray]:
+        """
+        Impact-aware position size for many candidate trades at once.
+        
+        With V the position value, per-share fees, the marginal commission
+        rate and the half-spread are linear in V and impact is
+        k·V^(1+α) per leg (k = volatility × coefficient / ADV^α), so the
+        expected net P&L of m legs
+        
+            N(V) = (edge - linear cost rate)·V - m·k·V^(1+α)
+        
+        is concave and peaks in closed form at
+        
+            V* = ((edge - linear cost rate) / (m·k·(1+α)))^(1/α)
+        
+        A one-leg impact cap of max_impact_bps bounds V by
+        (max_impact_bps / 10000 / k)^(1/α). The smallest of V*, the impact
+        cap and max_value is rounded down to whole shares and re-costed
+        exactly with calculate_cost_components (minimum commission
+        included); trades whose expected net P&L is not positive get zero
+        shares.
+        
+        Parameters:
+        -----------
+        prices : np.ndarray
+            Entry price per candidate (exit assumed at the same price)
+        symbol_ids, symbol_params :
+            As in calculate_cost_components
+        expected_edge : np.ndarray, optional
+            Expected gross return per candidate as a fraction of position
+            value (e.g. 0.004 = 40 bps); None sizes on the caps alone
+        direction : int
+            1 = long (buy, then sell), -1 = short
+        max_impact_bps : float, optional
+            Cap on the impact cost of one leg in bps of position value
+        max_value : np.ndarray, optional
+            Cap on position value (e.g. capital or participation limits)
+        removes_liquidity, impact_model :
+            As in calculate_cost_components
+        round_trip : bool
+            Cost entry and exit (True) or the entry leg only
+        
+        Returns:
+        --------
+        dict : Arrays shares, trade_value, impact_bps (one leg),
+               expected_cost, expected_net_pnl (nan without an edge) and
+               binding ('edge', 'impact', 'max_value', 'no_edge', 'none')
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        n = len(prices)
+        if expected_edge is None and max_impact_bps is None and max_value is None:
+            raise ValueError("Need an expected_edge, max_impact_bps or max_value to size positions")
+        
+        def param(key):
+            values = np.asarray(symbol_params[key], dtype=np.float64)
+            return values if symbol_ids is None else values[symbol_ids]
+        
+        exponent = {'square_root': 0.5, 'linear': 1.0, 'power_law': 0.6}.get(impact_model)
+        if exponent is None:
+            raise ValueError(f"Unknown model: {impact_model}")
+        impact_scale = param('daily_volatility') * param('impact_coefficient') / param('avg_daily_dollar_volume') ** exponent
+        legs = 2 if round_trip else 1
+        
+        caps = {}
+        if max_impact_bps is not None:
+            with np.errstate(divide='ignore'):
+                caps['impact'] = (max_impact_bps / 10000 / impact_scale) ** (1.0 / exponent)
+        if max_value is not None:
+            caps['max_value'] = np.broadcast_to(np.asarray(max_value, dtype=np.float64), (n,))
+        cap = np.min(np.vstack(list(caps.values())), axis=0) if caps else np.full(n, np.inf)
+        directions = np.full(n, direction)
+        
+        def evaluate(value):
+            # Exact cost of the rounded size, minimum commission included
+            shares = np.floor(np.where(np.isfinite(value), value, 0.0) / prices)
+            cost = self.calculate_cost_components(
+                shares, prices, directions, symbol_ids, symbol_params, removes_liquidity, impact_model)
+            total = cost['total_cost']
+            if round_trip:
+                total = total + self.calculate_cost_components(
+                    shares, prices, -directions, symbol_ids, symbol_params, removes_liquidity, impact_model)['total_cost']
+            return shares, cost['trade_value'], total
+        
+        if expected_edge is None:
+            value = cap
+            shares, trade_value, expected_cost = evaluate(value)
+            expected_net_pnl = np.full(n, np.nan)
+        else:
+            # Linear costs per dollar: share-based fees, SEC fee on the sell
+            # leg and half-spread per leg, plus the commission at the current
+            # marginal tier. Below the $0.35 minimum the commission is a
+            # fixed charge instead, so that regime has its own optimum
+            # (capped at the size where the minimum stops binding); the
+            # better of the two after exact re-costing is kept.
+            if self.broker == 'ibkr_tiered':
+                rate = next(rate for limit, rate in self.ibkr_tiered_schedule if self.monthly_volume < limit)
+            elif self.broker == 'ibkr_fixed':
+                rate = 0.005
+            else:
+                raise ValueError(f"Unknown broker: {self.broker}")
+            exchange_rate = self.exchange_fee_remove if removes_liquidity else self.exchange_fee_add
+            passthrough_factor = 1.0 + self.nyse_passthrough_rate + self.finra_passthrough_rate
+            sells = 1 if round_trip or direction == -1 else 0
+            edge = np.asarray(expected_edge, dtype=np.float64)
+            fee_rate = ((legs * (exchange_rate + self.clearing_fee) + sells * self.finra_taf) / prices +
+                        sells * self.sec_fee_rate + legs * 0.5 * param('avg_relative_spread'))
+        
+            def optimum(margin):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    return np.where(
+                        margin > 0,
+                        np.where(impact_scale > 0,
+                                 (margin / (legs * impact_scale * (1.0 + exponent))) ** (1.0 / exponent), np.inf),
+                        0.0
+                    )
+        
+            marginal_value = optimum(edge - fee_rate - legs * rate * passthrough_factor / prices)
+            minimum_value = np.minimum(optimum(edge - fee_rate), 0.35 / rate * prices)
+            best = None
+            for edge_value in (marginal_value, minimum_value):
+                value = np.minimum(edge_value, cap)
+                shares, trade_value, expected_cost = evaluate(value)
+                net = edge * trade_value - expected_cost
+                if best is None:
+                    best = [edge_value, value, shares, trade_value, expected_cost, net]
+                else:
+                    better = net > best[-1]
+                    best = [np.where(better, new, old) for new, old in
+                            zip((edge_value, value, shares, trade_value, expected_cost, net), best)]
+            edge_value, value, shares, trade_value, expected_cost, expected_net_pnl = best
+            caps = {'edge': edge_value, **caps}
+        
+        names = list(caps)
+        stacked = np.vstack([np.broadcast_to(caps[name], (n,)) for name in names])
+        binding = np.array(names, dtype=object)[np.argmin(stacked, axis=0)]
+        binding[~np.isfinite(value)] = 'none'
+        
+        if expected_edge is not None:
+            unprofitable = (expected_net_pnl <= 0) | (shares == 0)
+            binding[unprofitable] = 'no_edge'
+            shares = np.where(unprofitable, 0.0, shares)
+            trade_value = np.where(unprofitable, 0.0, trade_value)
+            expected_cost = np.where(unprofitable, 0.0, expected_cost)
+            expected_net_pnl = np.where(unprofitable, 0.0, expected_net_pnl)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            impact_bps = np.where(trade_value > 0, impact_scale * trade_value ** exponent * 10000, 0.0)
+        
+        return {
+            'shares': shares,
+            'trade_value': trade_value,
+            'impact_bps': impact_bps,
+            'expected_cost': expected_cost,
+            'expected_net_pnl': expected_net_pnl,
+            'binding': binding
+        }
+    
     def reset_monthly_volume(self):
         """Reset monthly volume tracker (call at start of each month)."""
         self.monthly_volume = 0
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3.11
+"""
+Local Bar Store and Signal Index
+Columnar, memory-mapped copy of QGSI_AllSymbols_3Signals.parquet for
+vectorized multi-symbol engines
+
+Layout (one .npy file per column, all symbols concatenated):
+- Rows sorted by (Symbol, BarDateTime); symbol s occupies rows
+  offsets[s]:offsets[s+1]
+- timestamps (int64 ns), open/high/low/close (float64), signal (int8),
+  signal_count (int16), symbols (str), offsets (int64)
+- signal_index.parquet: one row per signal bar, sorted by (SymbolId, BarIndex)
+- sessions.npy: global start row of every (symbol, trading day) session plus
+  a final end sentinel; session_offsets.npy: index of each symbol's first
+  session, length n_symbols + 1 (symbol s owns sessions
+  session_offsets[s]:session_offsets[s+1])
+
+Build once:
+    python3.11 bar_store.py
+"""
+
+import json
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from pathlib import Path
+
+DATA_PATH = '/home/ubuntu/upload/QGSI_AllSymbols_3Signals.parquet'
+BAR_STORE_DIR = '/home/ubuntu/bar_store'
+TIMESTAMP_COLUMN = 'BarDateTime'
+BATCH_SIZE = 50  # symbols per read when building
+NS_PER_DAY = 86_400_000_000_000  # sessions split at calendar days of BarDateTime (exchange time)
+
+PRICE_COLUMNS = {'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close'}
+ARRAY_DTYPES = {
+    'timestamps': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'signal': np.int8,
+    'signal_count': np.int16,
+}
+
+
+class BarStore:
+    """
+    Memory-mapped bar store.
+
+    Attributes:
+    -----------
+    symbols : np.ndarray
+        Sorted symbol names; the position of a symbol is its integer SymbolId
+    offsets : np.ndarray
+        Row offsets, length n_symbols + 1
+    timestamps, open, high, low, close, signal, signal_count : np.ndarray
+        Column arrays over all rows
+    sessions, session_offsets : np.ndarray
+        Session index (see build_session_index); loaded from the store, or
+        computed on first use for stores built before it existed
+    """
+
+    def __init__(self, store_dir=BAR_STORE_DIR, mmap_mode='r'):
+        self.store_dir = Path(store_dir)
+        self.symbols = np.load(self.store_dir / 'symbols.npy', allow_pickle=False)
+        self.offsets = np.load(self.store_dir / 'offsets.npy')
+        for name in ARRAY_DTYPES:
+            setattr(self, name, np.load(self.store_dir / f'{name}.npy', mmap_mode=mmap_mode))
+        self.symbol_ids = {sym: i for i, sym in enumerate(self.symbols)}
+        self._sessions = None
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def n_symbols(self):
+        return len(self.symbols)
+
+    def symbol_slice(self, symbol):
+        """Row slice for a symbol name or SymbolId."""
+        sid = self.symbol_ids[symbol] if isinstance(symbol, str) else int(symbol)
+        return slice(int(self.offsets[sid]), int(self.offsets[sid + 1]))
+
+    def symbol_arrays(self, symbol, columns=('timestamps', 'high', 'low', 'close')):
+        """Dict of column arrays (views into the memory map) for one symbol."""
+        sl = self.symbol_slice(symbol)
+        return {col: getattr(self, col)[sl] for col in columns}
+
+    def _load_sessions(self):
+        if self._sessions is None:
+            if (self.store_dir / 'sessions.npy').exists():
+                self._sessions = (np.load(self.store_dir / 'sessions.npy'),
+                                  np.load(self.store_dir / 'session_offsets.npy'))
+            else:
+                self._sessions = build_session_index(self)
+        return self._sessions
+
+    @property
+    def sessions(self):
+        return self._load_sessions()[0]
+
+    @property
+    def session_offsets(self):
+        return self._load_sessions()[1]
+
+    def session_bounds(self, rows):
+        """(first row, last row) of the session containing each global row."""
+        sessions = self.sessions
+        k = np.searchsorted(sessions, rows, side='right') - 1
+        return sessions[k], sessions[k + 1] - 1
+
+    def load_signal_index(self):
+        """Signal index built alongside the store (see build_signal_index)."""
+        return pd.read_parquet(self.store_dir / 'signal_index.parquet')
+
+
+def build_signal_index(store):
+    """
+    One row per signal bar, aligned with the bar store.
+
+    Returns:
+    --------
+    pd.DataFrame
+        SignalId, SymbolId, Symbol, BarIndex (global row), SignalIndex (row
+        within the symbol, same numbering as the Stage 2 trajectory files),
+        Direction (1 = Long, -1 = Short), SignalType, SignalCount, Timestamp
+    """
+    signal = np.asarray(store.signal)
+    bar_index = np.flatnonzero(np.isin(signal, (1, -1)))
+    symbol_id = np.searchsorted(store.offsets, bar_index, side='right') - 1
+    direction = signal[bar_index].astype(np.int8)
+
+    index = pd.DataFrame({
+        'SignalId': np.arange(len(bar_index), dtype=np.int64),
+        'SymbolId': symbol_id.astype(np.int32),
+        'Symbol': store.symbols[symbol_id],
+        'BarIndex': bar_index.astype(np.int64),
+        'SignalIndex': (bar_index - store.offsets[symbol_id]).astype(np.int64),
+        'Direction': direction,
+        'SignalType': np.where(direction == 1, 'Long', 'Short'),
+        'SignalCount': np.asarray(store.signal_count)[bar_index],
+        'Timestamp': pd.to_datetime(np.asarray(store.timestamps)[bar_index]),
+    })
+    return index
+
+
+def build_session_index(store):
+    """
+    Session boundaries of every symbol, one session per trading day.
+
+    A session starts wherever the calendar day of the timestamp or the
+    symbol changes, so a forward window can be clipped at the session's
+    last bar instead of running into the next day's open.
+
+    Returns:
+    --------
+    tuple
+        (sessions, session_offsets): global start row of each session with a
+        final sentinel = number of rows, and each symbol's first session
+        index (length n_symbols + 1)
+    """
+    day = np.asarray(store.timestamps) // NS_PER_DAY
+    new_session = np.r_[True, day[1:] != day[:-1]] if len(day) else np.zeros(0, dtype=bool)
+    new_session[store.offsets[:-1][store.offsets[:-1] < len(day)]] = True
+    sessions = np.r_[np.flatnonzero(new_session), len(day)].astype(np.int64)
+    session_offsets = np.searchsorted(sessions, store.offsets, side='left').astype(np.int64)
+    return sessions, session_offsets
+
+
+def build_bar_store(data_path=DATA_PATH, store_dir=BAR_STORE_DIR, batch_size=BATCH_SIZE):
+    """
+    Convert the source parquet into the columnar store.
+
+    Reads batch_size symbols at a time and writes straight into preallocated
+    .npy memory maps, so peak memory is one batch of bars.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    parquet_file = pq.ParquetFile(data_path)
+    n_rows = parquet_file.metadata.num_rows
+    symbols = np.array(sorted(pd.read_parquet(data_path, columns=['Symbol'])['Symbol'].unique()))
+    print(f"  {n_rows:,} bars, {len(symbols)} symbols")
+
+    arrays = {
+        name: np.lib.format.open_memmap(store_dir / f'{name}.npy', mode='w+', dtype=dtype, shape=(n_rows,))
+        for name, dtype in ARRAY_DTYPES.items()
+    }
+    offsets = np.zeros(len(symbols) + 1, dtype=np.int64)
+
+    row = 0
+    for start in range(0, len(symbols), batch_size):
+        batch_symbols = list(symbols[start:start + batch_size])
+        df = pd.read_parquet(data_path, filters=[('Symbol', 'in', batch_symbols)])
+        df = df.sort_values(['Symbol', TIMESTAMP_COLUMN], kind='mergesort')
+        n = len(df)
+
+        arrays['timestamps'][row:row + n] = pd.to_datetime(df[TIMESTAMP_COLUMN]).to_numpy('datetime64[ns]').view(np.int64)
+        for col, name in PRICE_COLUMNS.items():
+            arrays[name][row:row + n] = df[col].to_numpy(dtype=np.float64)
+        arrays['signal'][row:row + n] = df['Signal'].fillna(0).to_numpy(dtype=np.int8)
+        arrays['signal_count'][row:row + n] = df['SignalCount'].fillna(0).to_numpy(dtype=np.int16)
+
+        counts = df.groupby('Symbol', sort=True).size().reindex(batch_symbols, fill_value=0).to_numpy()
+        offsets[start + 1:start + 1 + len(batch_symbols)] = row + np.cumsum(counts)
+        row += n
+        print(f"  Batch {start // batch_size + 1}: {len(batch_symbols)} symbols, {n:,} bars")
+
+    for arr in arrays.values():
+        arr.flush()
+    np.save(store_dir / 'symbols.npy', symbols.astype(str))
+    np.save(store_dir / 'offsets.npy', offsets)
+    with open(store_dir / 'metadata.json', 'w') as f:
+        json.dump({'source': str(data_path), 'n_rows': int(n_rows), 'n_symbols': int(len(symbols))}, f, indent=2)
+
+    store = BarStore(store_dir)
+    sessions, session_offsets = build_session_index(store)
+    np.save(store_dir / 'sessions.npy', sessions)
+    np.save(store_dir / 'session_offsets.npy', session_offsets)
+    print(f"  {len(sessions) - 1:,} symbol sessions indexed")
+
+    signal_index = build_signal_index(store)
+    signal_index.to_parquet(store_dir / 'signal_index.parquet', index=False)
+    print(f"  {len(signal_index):,} signals indexed")
+    return store
+
+
+def load_bar_store(store_dir=BAR_STORE_DIR):
+    """Open an existing store (memory-mapped, read-only)."""
+    return BarStore(store_dir)
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("BUILDING LOCAL BAR STORE")
+    print("="*80)
+    build_bar_store()
+    print(f"\n✓ Bar store written to {BAR_STORE_DIR}")
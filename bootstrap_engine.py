@@ -0,0 +1,202 @@
+#!/usr/bin/env python3.11
+"""
+Bootstrap Resampling Engine
+Vectorized, chunked and parallel bootstrap of return series
+
+Resamples are drawn as (chunk × length) index matrices and every statistic
+is computed for the whole chunk with NumPy reductions along the time axis.
+Chunks are spread across worker processes; each chunk gets its own child
+of one np.random.SeedSequence, so results depend only on the seed and
+chunk size, not on the number of workers.
+
+Methods:
+- iid:        Draws with replacement (no serial dependence)
+- circular:   Circular block bootstrap, fixed blocks of block_length
+- stationary: Stationary bootstrap (Politis & Romano), geometric block
+              lengths with mean block_length
+
+Statistics are named after the columns of extended_metrics
+calculate_batch_metrics (same units). 'Cumulative Return', 'CAGR', 'Sharpe',
+'Sortino', 'Volatility (ann.)' and 'Max Drawdown' have direct fast paths;
+any other column name runs calculate_batch_metrics on the chunk, and a
+callable receives the (length × chunk) resample matrix and returns one
+value per resample.
+"""
+
+import numpy as np
+import pandas as pd
+from multiprocessing import Pool
+
+from extended_metrics import calculate_batch_metrics
+
+BOOTSTRAP_METHODS = ('iid', 'circular', 'stationary')
+CHUNK_SIZE = 20_000
+N_WORKERS = 8
+PERIODS_PER_YEAR = 252
+
+
+def bootstrap_indices(rng, n_obs, n_samples, length, method='iid', block_length=5):
+    """
+    Resample index matrix.
+
+    Returns:
+    --------
+    np.ndarray
+        (n_samples, length) int64 indices into the original series
+    """
+    if method == 'iid':
+        return rng.integers(0, n_obs, size=(n_samples, length))
+
+    if method == 'circular':
+        n_blocks = -(-length // block_length)
+        starts = rng.integers(0, n_obs, size=(n_samples, n_blocks))
+        idx = (starts[:, :, None] + np.arange(block_length)) % n_obs
+        return idx.reshape(n_samples, -1)[:, :length]
+
+    if method == 'stationary':
+        # A new block starts at each position with probability 1 / block_length
+        new_block = rng.random((n_samples, length)) < 1.0 / block_length
+        new_block[:, 0] = True
+        starts = rng.integers(0, n_obs, size=(n_samples, length))
+        positions = np.arange(length)
+        block_start = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+        offset = positions - block_start
+        return (np.take_along_axis(starts, block_start, axis=1) + offset) % n_obs
+
+    raise ValueError(f"Unknown bootstrap method '{method}', expected one of {BOOTSTRAP_METHODS}")
+
+
+def _cumulative_return(r, ppy):
+    return (np.prod(1 + r, axis=0) - 1) * 100
+
+
+def _cagr(r, ppy):
+    return ((np.prod(1 + r, axis=0)) ** (ppy / r.shape[0]) - 1) * 100
+
+
+def _sharpe(r, ppy):
+    std = r.std(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(std != 0, r.mean(axis=0) / std * np.sqrt(ppy), 0.0)
+
+
+def _sortino(r, ppy):
+    down = r < 0
+    n_down = down.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        down_std = np.sqrt(np.where(down, r * r, 0.0).sum(axis=0) / n_down) * np.sqrt(ppy)
+        return np.where((n_down > 0) & (down_std != 0), r.mean(axis=0) * ppy / down_std, 0.0)
+
+
+def _volatility(r, ppy):
+    return r.std(axis=0, ddof=1) * np.sqrt(ppy) * 100
+
+
+def _max_drawdown(r, ppy):
+    wealth = np.cumprod(1 + r, axis=0)
+    return (wealth / np.maximum.accumulate(wealth, axis=0) - 1).min(axis=0) * 100
+
+
+FAST_STATISTICS = {
+    'Cumulative Return': _cumulative_return,
+    'CAGR': _cagr,
+    'Sharpe': _sharpe,
+    'Sortino': _sortino,
+    'Volatility (ann.)': _volatility,
+    'Max Drawdown': _max_drawdown,
+}
+
+
+def _chunk_statistics(args):
+    """Worker: draw one chunk of resamples and evaluate all statistics."""
+    returns, statistics, n_samples, length, method, block_length, seed_seq, ppy = args
+    rng = np.random.default_rng(seed_seq)
+    idx = bootstrap_indices(rng, len(returns), n_samples, length, method, block_length)
+    sample = returns[idx.T]  # (length, n_samples): time along axis 0
+
+    out = {}
+    batch = None
+    for stat in statistics:
+        if callable(stat):
+            out[getattr(stat, '__name__', str(stat))] = np.asarray(stat(sample))
+        elif stat in FAST_STATISTICS:
+            out[stat] = FAST_STATISTICS[stat](sample, ppy)
+        else:
+            if batch is None:
+                batch = calculate_batch_metrics(sample, periods_per_year=ppy)
+            out[stat] = batch[stat].to_numpy()
+    return out
+
+
+def bootstrap(returns, statistics=('Cumulative Return',), n_samples=10_000, length=None,
+              method='iid', block_length=5, seed=42, chunk_size=CHUNK_SIZE,
+              n_workers=N_WORKERS, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Bootstrap distribution of one or more statistics.
+
+    Parameters:
+    -----------
+    returns : array-like
+        Period returns (NaNs are dropped)
+    statistics : list
+        Metric names (calculate_batch_metrics columns) and/or callables
+    n_samples : int
+        Number of resamples
+    length : int, optional
+        Periods per resample (default: len(returns))
+    method : str
+        'iid', 'circular' or 'stationary'
+    block_length : int
+        Block length (circular) or mean block length (stationary)
+    seed : int
+        Root seed; chunk k uses SeedSequence(seed).spawn(...)[k]
+    chunk_size : int
+        Resamples per chunk (bounds memory at chunk_size × length values)
+    n_workers : int
+        Worker processes (1 = run in-process)
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per resample, one column per statistic
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"Unknown bootstrap method '{method}', expected one of {BOOTSTRAP_METHODS}")
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns[~np.isnan(returns)]
+    length = len(returns) if length is None else length
+    statistics = [statistics] if isinstance(statistics, str) or callable(statistics) else list(statistics)
+
+    sizes = [min(chunk_size, n_samples - start) for start in range(0, n_samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(returns, statistics, size, length, method, block_length, seed_seq, periods_per_year)
+             for size, seed_seq in zip(sizes, seeds)]
+
+    if n_workers > 1 and len(tasks) > 1:
+        with Pool(min(n_workers, len(tasks))) as pool:
+            results = pool.map(_chunk_statistics, tasks)
+    else:
+        results = [_chunk_statistics(task) for task in tasks]
+
+    return pd.DataFrame({name: np.concatenate([r[name] for r in results]) for name in results[0]})
+
+
+def confidence_intervals(distribution, levels=(0.68, 0.95)):
+    """
+    Mean, median, std and two-sided percentile intervals per statistic.
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per statistic
+    """
+    rows = {}
+    for name, values in distribution.items():
+        values = values.to_numpy()
+        row = {'Mean': values.mean(), 'Median': np.median(values), 'Std': values.std()}
+        for level in levels:
+            tail = (1 - level) / 2 * 100
+            row[f'{level:.0%} CI Lower'] = np.percentile(values, tail)
+            row[f'{level:.0%} CI Upper'] = np.percentile(values, 100 - tail)
+        rows[name] = row
+    return pd.DataFrame.from_dict(rows, orient='index')
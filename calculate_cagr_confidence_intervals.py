@@ -8,6 +8,8 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from bootstrap_engine import bootstrap
+
 print("="*80)
 print("1-YEAR CAGR ESTIMATION WITH CONFIDENCE INTERVALS")
 print("="*80)
@@ -50,24 +52,18 @@ print("\n" + "="*80)
 print("BOOTSTRAP RESAMPLING (10,000 SIMULATIONS)")
 print("="*80)
 
-np.random.seed(42)
 n_simulations = 10000
 trading_days_per_year = 252
-
-bootstrap_cagrs = []
-
-for i in range(n_simulations):
-    # Resample daily returns with replacement
-    sampled_returns = np.random.choice(daily_returns, size=trading_days_per_year, replace=True)
-    
-    # Calculate CAGR for this sample
-    cumulative_return = np.prod(1 + sampled_returns) - 1
-    bootstrap_cagrs.append(cumulative_return * 100)  # Convert to percentage
-    
-    if (i + 1) % 2000 == 0:
-        print(f"Progress: {i+1:,} / {n_simulations:,} simulations complete")
-
-bootstrap_cagrs = np.array(bootstrap_cagrs)
+BOOTSTRAP_METHOD = 'iid'  # 'circular' / 'stationary' keep serial dependence
+BLOCK_LENGTH = 5          # (mean) block length in trading days for block methods
+
+# Resample one year of daily returns with replacement; the 252-day cumulative
+# return of each resample is its 1-year CAGR (in %)
+distribution = bootstrap(daily_returns, ['Cumulative Return'], n_samples=n_simulations,
+                         length=trading_days_per_year, method=BOOTSTRAP_METHOD,
+                         block_length=BLOCK_LENGTH, seed=42)
+bootstrap_cagrs = distribution['Cumulative Return'].to_numpy()
+print(f"Completed {n_simulations:,} simulations ({BOOTSTRAP_METHOD} bootstrap)")
 
 print("\n" + "="*80)
 print("STATISTICAL RESULTS")
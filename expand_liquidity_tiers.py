@@ -6,40 +6,19 @@ Based on user's examples: Very High, High, Medium-High, Medium, Medium-Low, Low,
 import pandas as pd
 import numpy as np
 
+from stock_characteristics import assign_liquidity_tier_7, LIQUIDITY_TIER_7_ORDER
+
 print("Expanding liquidity tiers analysis...")
 
 # Load stock performance data
 long_stock_perf = pd.read_csv('part3_b2_long_stock_characteristics.csv')
 short_stock_perf = pd.read_csv('part3_b2_short_stock_characteristics.csv')
 
-def calculate_liquidity_score(row):
-    """Calculate liquidity score based on existing score"""
-    return row['Liquidity_Score']
-
-def assign_liquidity_tier(score):
-    """Assign liquidity tier based on score (7 tiers)"""
-    if score >= 1_000_000_000:  # $1B+ daily volume
-        return 'Very High'
-    elif score >= 100_000_000:  # $100M-$1B
-        return 'High'
-    elif score >= 50_000_000:   # $50M-$100M
-        return 'Medium-High'
-    elif score >= 10_000_000:   # $10M-$50M
-        return 'Medium'
-    elif score >= 5_000_000:    # $5M-$10M
-        return 'Medium-Low'
-    elif score >= 1_000_000:    # $1M-$5M
-        return 'Low'
-    else:                        # <$1M
-        return 'Very Low'
-
-# Calculate liquidity scores and tiers for LONG
-long_stock_perf['Liquidity_Score'] = long_stock_perf.apply(calculate_liquidity_score, axis=1)
-long_stock_perf['Liquidity_Tier'] = long_stock_perf['Liquidity_Score'].apply(assign_liquidity_tier)
-
-# Calculate liquidity scores and tiers for SHORT
-short_stock_perf['Liquidity_Score'] = short_stock_perf.apply(calculate_liquidity_score, axis=1)
-short_stock_perf['Liquidity_Tier'] = short_stock_perf['Liquidity_Score'].apply(assign_liquidity_tier)
+# Tiers on the existing liquidity score (stock_characteristics.LIQUIDITY_TIERS_7):
+# Very High $1B+, High $100M-$1B, Medium-High $50M-$100M, Medium $10M-$50M,
+# Medium-Low $5M-$10M, Low $1M-$5M, Very Low <$1M
+long_stock_perf['Liquidity_Tier'] = assign_liquidity_tier_7(long_stock_perf['Liquidity_Score'])
+short_stock_perf['Liquidity_Tier'] = assign_liquidity_tier_7(short_stock_perf['Liquidity_Score'])
 
 # Aggregate by liquidity tier for LONG
 long_by_liquidity = long_stock_perf.groupby('Liquidity_Tier').agg({
@@ -66,9 +45,9 @@ short_by_liquidity.columns = ['Liquidity_Tier', 'Stock_Count', 'Total_PnL', 'Tra
                                 'Avg_PnL_Per_Stock', 'Avg_Volatility', 'Avg_Liquidity_Score']
 
 # Sort by tier order
-tier_order = ['Very High', 'High', 'Medium-High', 'Medium', 'Medium-Low', 'Low', 'Very Low']
-long_by_liquidity['Tier_Order'] = long_by_liquidity['Liquidity_Tier'].apply(lambda x: tier_order.index(x) if x in tier_order else 99)
-short_by_liquidity['Tier_Order'] = short_by_liquidity['Liquidity_Tier'].apply(lambda x: tier_order.index(x) if x in tier_order else 99)
+tier_order = pd.Series(range(len(LIQUIDITY_TIER_7_ORDER)), index=LIQUIDITY_TIER_7_ORDER)
+long_by_liquidity['Tier_Order'] = long_by_liquidity['Liquidity_Tier'].map(tier_order).fillna(99).astype(int)
+short_by_liquidity['Tier_Order'] = short_by_liquidity['Liquidity_Tier'].map(tier_order).fillna(99).astype(int)
 
 long_by_liquidity = long_by_liquidity.sort_values('Tier_Order')
 short_by_liquidity = short_by_liquidity.sort_values('Tier_Order')
@@ -27,17 +27,93 @@ def max_drawdown(ret):
     dd = cum / cum.cummax() - 1
     return dd.min()
 
+EPISODE_DTYPE = np.dtype([
+    ('start', np.int64),      # first underwater position
+    ('trough', np.int64),     # position of the deepest point
+    ('end', np.int64),        # last underwater position
+    ('recovery', np.int64),   # first position back at the peak (-1 = not recovered)
+    ('length', np.int64),     # underwater periods
+    ('depth', np.float64),    # minimum drawdown (fraction, <= 0)
+    ('dd_sum', np.float64),   # sum of drawdowns over the episode (for averages)
+])
+
+def drawdown_episodes(equity, drawdown=None):
+    """
+    Drawdown episodes of an equity curve in one linear pass
+    
+    Parameters:
+    -----------
+    equity : array-like
+        Equity / wealth curve (any length, e.g. minute mark-to-market)
+    drawdown : array-like, optional
+        Precomputed drawdown series; default equity / running peak - 1
+    
+    Returns:
+    --------
+    np.ndarray : EPISODE_DTYPE structured array, one row per episode in time order
+    """
+    if drawdown is None:
+        equity = np.asarray(equity, dtype=np.float64)
+        drawdown = equity / np.maximum.accumulate(equity) - 1 if len(equity) else equity
+    dd = np.asarray(drawdown, dtype=np.float64)
+    n = len(dd)
+    in_dd = dd < 0
+    if not in_dd.any():
+        return np.empty(0, dtype=EPISODE_DTYPE)
+
+    # Episode boundaries from mask transitions
+    edges = np.diff(in_dd.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+
+    # Per-episode reductions over [start, end]
+    bounds = np.ravel(np.column_stack([starts, ends + 1]))
+    padded = np.append(dd, 0.0)
+    depth = np.minimum.reduceat(padded, bounds)[::2]
+    dd_sum = np.add.reduceat(padded, bounds)[::2]
+
+    # Trough: first position in each episode that reaches the episode minimum
+    episode = np.cumsum(edges[:-1] == 1) - 1
+    at_min = np.flatnonzero(in_dd & (dd == depth[np.maximum(episode, 0)]))
+    first = np.unique(episode[at_min], return_index=True)[1]
+
+    episodes = np.empty(len(starts), dtype=EPISODE_DTYPE)
+    episodes['start'] = starts
+    episodes['trough'] = at_min[first]
+    episodes['end'] = ends
+    episodes['recovery'] = np.where(ends + 1 < n, ends + 1, -1)
+    episodes['length'] = ends - starts + 1
+    episodes['depth'] = depth
+    episodes['dd_sum'] = dd_sum
+    return episodes
+
+def _state_runs(episodes, n):
+    """Lengths of the above-water runs between (and around) drawdown episodes."""
+    gaps = np.diff(np.concatenate([[-1], np.ravel(np.column_stack([episodes['start'], episodes['end']])), [n]]))
+    return gaps[::2] - 1
+
+def _longest_run(episodes, n):
+    """Longest run of either state (underwater or not), as drawdown_duration reports."""
+    if len(episodes) == 0:
+        return 0
+    return max(episodes['length'].max(), _state_runs(episodes, n).max())
+
+def _avg_episode_days(episodes, n):
+    """Underwater periods / number of runs of either state, as avg_dd_days reports."""
+    runs = len(episodes) + np.count_nonzero(_state_runs(episodes, n))
+    return episodes['length'].sum() / runs if runs > 0 else 0
+
+def _avg_episode_drawdown(episodes):
+    """Mean over episodes of the mean drawdown within the episode."""
+    return (episodes['dd_sum'] / episodes['length']).mean() if len(episodes) else 0
+
 def drawdown_duration(ret):
     """Longest drawdown duration in days"""
     if len(ret) == 0:
         return 0
-    cum = cum_returns(ret) + 1
-    peak = cum.cummax()
-    dd = cum / peak - 1
-    in_dd = dd < 0
-    dd_groups = (in_dd != in_dd.shift()).cumsum()
-    dd_durations = in_dd.groupby(dd_groups).cumcount() + 1
-    return dd_durations.max() if in_dd.any() else 0
+    cum = (cum_returns(ret) + 1).to_numpy()
+    dd = cum / np.maximum.accumulate(cum) - 1
+    return _longest_run(drawdown_episodes(cum, dd), len(dd))
 
 def volatility(ret, periods_per_year=252):
     """Annualized volatility"""
@@ -186,23 +262,17 @@ def avg_drawdown(ret):
     """Average drawdown"""
     if len(ret) == 0:
         return 0
-    cum = cum_returns(ret) + 1
-    dd = (cum - cum.cummax()) / cum.cummax()
-    in_dd = dd < 0
-    dd_groups = (in_dd != in_dd.shift()).cumsum()
-    avg_dd = dd[in_dd].groupby(dd_groups).mean().mean() if in_dd.any() else 0
-    return avg_dd
+    cum = (cum_returns(ret) + 1).to_numpy()
+    peak = np.maximum.accumulate(cum)
+    return _avg_episode_drawdown(drawdown_episodes(cum, (cum - peak) / peak))
 
 def avg_dd_days(ret):
     """Average drawdown days"""
     if len(ret) == 0:
         return 0
-    cum = cum_returns(ret) + 1
-    dd = (cum - cum.cummax()) / cum.cummax()
-    in_dd = dd < 0
-    dd_groups = (in_dd != in_dd.shift()).cumsum()
-    dd_lengths = in_dd.groupby(dd_groups).sum()
-    return dd_lengths.mean() if not dd_lengths.empty else 0
+    cum = (cum_returns(ret) + 1).to_numpy()
+    peak = np.maximum.accumulate(cum)
+    return _avg_episode_days(drawdown_episodes(cum, (cum - peak) / peak), len(cum))
 
 def win_rate(ret, period='D'):
     """Win rate by period"""
@@ -211,6 +281,112 @@ def win_rate(ret, period='D'):
     resampled = ret.resample(period).sum()
     return (resampled > 0).mean() * 100 if len(resampled) > 0 else 0
 
+class MetricIntermediates:
+    """
+    Shared intermediates for one daily return series, computed once
+
+    The equity curve and drawdown series are built exactly as in the
+    individual metric functions (cum_returns() + 1, both drawdown forms), so
+    every metric derived from them matches the standalone functions.
+    """
+
+    def __init__(self, returns, rf=0.0, periods_per_year=252):
+        self.returns = returns
+        self.rf = rf
+        self.ppy = periods_per_year
+        self.n = len(returns)
+
+        # Equity curve and drawdowns
+        self.cum = cum_returns(returns)
+        self.wealth = self.cum + 1
+        self.peak = self.wealth.cummax()
+        self.dd = self.wealth / self.peak - 1                    # max_drawdown / drawdown_duration
+        self.dd_rel = (self.wealth - self.peak) / self.peak      # ulcer_index / avg_drawdown / avg_dd_days
+        self.episodes = drawdown_episodes(self.wealth, self.dd.to_numpy())
+        self.episodes_rel = drawdown_episodes(self.wealth, self.dd_rel.to_numpy())
+
+        # Sign masks and moments
+        self.win_mask = returns > 0
+        self.loss_mask = returns < 0
+        self.wins = returns[self.win_mask]
+        self.losses = returns[self.loss_mask]
+        self.has_losses = bool(self.loss_mask.any())
+        self.mean = returns.mean()
+        self.std = returns.std()
+        self.excess = returns - rf / periods_per_year
+        self.excess_mean = self.excess.mean()
+        self.excess_std = self.excess.std()
+        self.excess_down = self.excess[self.excess < 0]
+
+        # Tail quantiles
+        self.q05 = returns.quantile(0.05) if self.n > 1 else 0
+        self.q95 = returns.quantile(0.95) if self.n > 1 else 0
+
+        # Calendar aggregates
+        self.daily = returns.resample('D').sum()
+        self.monthly = returns.resample('M').sum()
+        self.quarterly = returns.resample('Q').sum()
+        self.yearly = returns.resample('Y').sum()
+
+    @property
+    def total_return(self):
+        return self.cum.iloc[-1] if self.n > 0 else 0
+
+    @property
+    def cagr(self):
+        if self.n == 0:
+            return 0
+        years = self.n / self.ppy
+        return (1 + self.cum.iloc[-1]) ** (1 / years) - 1 if years > 0 else 0
+
+    @property
+    def max_drawdown(self):
+        return self.dd.min() if self.n > 0 else 0
+
+    @property
+    def sharpe(self):
+        if self.n == 0:
+            return 0
+        return self.excess_mean / self.excess_std * np.sqrt(self.ppy) if self.excess_std != 0 else 0
+
+    @property
+    def sortino(self):
+        if self.n == 0:
+            return 0
+        down = self.excess_down
+        down_std = np.sqrt((down ** 2).mean()) * np.sqrt(self.ppy) if len(down) > 0 else 0
+        return self.excess_mean * self.ppy / down_std if down_std != 0 else 0
+
+    @property
+    def ulcer_index(self):
+        return np.sqrt((self.dd_rel ** 2).mean()) if self.n > 0 else 0
+
+    @property
+    def profit_factor(self):
+        if self.n == 0 or not self.has_losses:
+            return np.inf
+        return self.wins.sum() / abs(self.losses.sum())
+
+    @property
+    def payoff_ratio(self):
+        if self.n == 0 or not self.has_losses:
+            return np.inf
+        return self.wins.mean() / abs(self.losses.mean())
+
+    @property
+    def tail_ratio(self):
+        if self.n < 2:
+            return np.inf
+        return self.q95 / abs(self.q05) if self.q05 != 0 else np.inf
+
+    def trailing_sum(self, days):
+        """Sum of returns over the last `days` calendar days."""
+        returns = self.returns
+        return returns[returns.index >= returns.index[-1] - pd.Timedelta(days, 'D')].sum()
+
+def _win_pct(resampled):
+    return (resampled > 0).mean() * 100 if len(resampled) > 0 else 0
+
 def calculate_all_metrics(returns, rf=0.0):
     """
     Calculate comprehensive performance metrics
@@ -226,88 +402,137 @@ def calculate_all_metrics(returns, rf=0.0):
     --------
     dict : Dictionary of all metrics
     """
+    m = MetricIntermediates(returns, rf)
+    ret = returns
+    n = m.n
     metrics = {}
     
     # Basic metrics
+    md = m.max_drawdown
+    cagr_value = m.cagr
+    sortino_value = m.sortino
     metrics['Risk-Free Rate'] = rf * 100
-    metrics['Time in Market'] = (returns != 0).mean() * 100 if len(returns) > 0 else 0
-    metrics['Cumulative Return'] = cum_returns(returns).iloc[-1] * 100 if len(returns) > 0 else 0
-    metrics['CAGR'] = cagr(returns) * 100
-    metrics['Sharpe'] = sharpe(returns, rf)
-    metrics['Sortino'] = sortino(returns, rf)
-    metrics['Sortino/√2'] = metrics['Sortino'] / np.sqrt(2) if 'Sortino' in metrics else 0
-    metrics['Omega'] = omega(returns, rf)
-    metrics['Max Drawdown'] = max_drawdown(returns) * 100
-    metrics['Longest DD Days'] = drawdown_duration(returns)
-    metrics['Volatility (ann.)'] = volatility(returns) * 100
-    metrics['Calmar'] = calmar(returns)
-    metrics['Skew'] = returns.skew() if len(returns) > 2 else 0
-    metrics['Kurtosis'] = returns.kurt() if len(returns) > 3 else 0
+    metrics['Time in Market'] = (ret != 0).mean() * 100 if n > 0 else 0
+    metrics['Cumulative Return'] = m.total_return * 100
+    metrics['CAGR'] = cagr_value * 100
+    metrics['Sharpe'] = m.sharpe
+    metrics['Sortino'] = sortino_value
+    metrics['Sortino/√2'] = sortino_value / np.sqrt(2)
+    if n == 0:
+        metrics['Omega'] = np.inf
+    else:
+        threshold = rf / 252
+        above = m.wins if threshold == 0 else ret[ret > threshold]
+        below = m.losses if threshold == 0 else ret[ret < threshold]
+        pos = (above - threshold).sum()
+        neg = abs((below - threshold).sum())
+        metrics['Omega'] = pos / neg if neg != 0 else np.inf
+    metrics['Max Drawdown'] = md * 100
+    metrics['Longest DD Days'] = _longest_run(m.episodes, n)
+    metrics['Volatility (ann.)'] = (m.std * np.sqrt(252) if n > 0 else 0) * 100
+    if n == 0:
+        metrics['Calmar'] = 0
+    else:
+        metrics['Calmar'] = cagr_value / abs(md) if md != 0 else np.inf
+    metrics['Skew'] = ret.skew() if n > 2 else 0
+    metrics['Kurtosis'] = ret.kurt() if n > 3 else 0
     
     # Expected returns
-    metrics['Expected Daily'] = returns.mean() * 100 if len(returns) > 0 else 0
-    metrics['Expected Monthly'] = returns.resample('M').sum().mean() * 100 if len(returns) > 0 else 0
-    metrics['Expected Yearly'] = returns.resample('Y').sum().mean() * 100 if len(returns) > 0 else 0
+    metrics['Expected Daily'] = m.mean * 100 if n > 0 else 0
+    metrics['Expected Monthly'] = m.monthly.mean() * 100 if n > 0 else 0
+    metrics['Expected Yearly'] = m.yearly.mean() * 100 if n > 0 else 0
     
     # Risk metrics
-    metrics['Kelly Criterion'] = kelly_criterion(returns) * 100
-    metrics['Daily Value-at-Risk'] = value_at_risk(returns) * 100
-    metrics['Expected Shortfall (cVaR)'] = conditional_var(returns) * 100
+    if n == 0:
+        metrics['Kelly Criterion'] = 0
+        metrics['Daily Value-at-Risk'] = 0
+        metrics['Expected Shortfall (cVaR)'] = 0
+    else:
+        win_prob = m.win_mask.mean()
+        win_loss_ratio = m.wins.mean() / abs(m.losses.mean()) if m.has_losses else np.inf
+        kelly = win_prob - (1 - win_prob) / win_loss_ratio if win_loss_ratio != 0 else 0
+        tail = ret[ret <= m.q05]
+        metrics['Kelly Criterion'] = kelly * 100
+        metrics['Daily Value-at-Risk'] = m.q05 * 100
+        metrics['Expected Shortfall (cVaR)'] = (tail.mean() if not tail.empty else 0) * 100
     
     # Gain/Pain metrics
-    metrics['Gain/Pain Ratio'] = gain_pain_ratio(returns)
-    metrics['Gain/Pain (1M)'] = gain_pain_ratio(returns.resample('M').sum())
-    metrics['Payoff Ratio'] = payoff_ratio(returns)
-    metrics['Profit Factor'] = profit_factor(returns)
-    metrics['Common Sense Ratio'] = common_sense_ratio(returns)
-    metrics['CPC Index'] = cpc_index(returns)
-    metrics['Tail Ratio'] = tail_ratio(returns)
-    metrics['Outlier Win Ratio'] = outlier_win_ratio(returns)
-    metrics['Outlier Loss Ratio'] = outlier_loss_ratio(returns)
+    pf = m.profit_factor
+    payoff = m.payoff_ratio
+    tr = m.tail_ratio
+    metrics['Gain/Pain Ratio'] = m.mean / abs(m.losses.mean()) if n > 0 and m.has_losses else np.inf
+    metrics['Gain/Pain (1M)'] = gain_pain_ratio(m.monthly)
+    metrics['Payoff Ratio'] = payoff
+    metrics['Profit Factor'] = pf
+    metrics['Common Sense Ratio'] = pf * tr if tr != np.inf else np.inf
+    metrics['CPC Index'] = payoff * pf * m.win_mask.mean()
+    metrics['Tail Ratio'] = tr
+    upper = m.mean + 3 * m.std
+    lower = m.mean - 3 * m.std
+    outliers = ret[(ret > upper) | (ret < lower)]
+    if n == 0 or not m.win_mask.any():
+        metrics['Outlier Win Ratio'] = 0
+    else:
+        win_out = outliers[outliers > 0]
+        metrics['Outlier Win Ratio'] = win_out.mean() / m.wins.mean() if not win_out.empty else 0
+    if n == 0 or not m.has_losses:
+        metrics['Outlier Loss Ratio'] = 0
+    else:
+        loss_out = outliers[outliers < 0]
+        metrics['Outlier Loss Ratio'] = abs(loss_out.mean()) / abs(m.losses.mean()) if not loss_out.empty else 0
     
     # Time-based returns
-    metrics['MTD'] = returns[returns.index >= returns.index[-1] - pd.Timedelta(30, 'D')].sum() * 100 if len(returns) > 0 else 0
-    metrics['3M'] = returns[returns.index >= returns.index[-1] - pd.Timedelta(90, 'D')].sum() * 100 if len(returns) > 0 else 0
-    metrics['6M'] = returns[returns.index >= returns.index[-1] - pd.Timedelta(180, 'D')].sum() * 100 if len(returns) > 0 else 0
-    metrics['YTD'] = returns[returns.index.year == returns.index[-1].year].sum() * 100 if len(returns) > 0 else 0
-    metrics['1Y'] = returns[returns.index >= returns.index[-1] - pd.Timedelta(365, 'D')].sum() * 100 if len(returns) > 0 else 0
-    metrics['All-time (ann.)'] = cagr(returns) * 100
+    metrics['MTD'] = m.trailing_sum(30) * 100 if n > 0 else 0
+    metrics['3M'] = m.trailing_sum(90) * 100 if n > 0 else 0
+    metrics['6M'] = m.trailing_sum(180) * 100 if n > 0 else 0
+    metrics['YTD'] = ret[ret.index.year == ret.index[-1].year].sum() * 100 if n > 0 else 0
+    metrics['1Y'] = m.trailing_sum(365) * 100 if n > 0 else 0
+    metrics['All-time (ann.)'] = cagr_value * 100
     
     # Best/Worst
-    metrics['Best Day'] = returns.max() * 100 if len(returns) > 0 else 0
-    metrics['Worst Day'] = returns.min() * 100 if len(returns) > 0 else 0
-    metrics['Best Month'] = returns.resample('M').sum().max() * 100 if len(returns) > 0 else 0
-    metrics['Worst Month'] = returns.resample('M').sum().min() * 100 if len(returns) > 0 else 0
-    metrics['Best Year'] = returns.resample('Y').sum().max() * 100 if len(returns) > 0 else 0
-    metrics['Worst Year'] = returns.resample('Y').sum().min() * 100 if len(returns) > 0 else 0
+    metrics['Best Day'] = ret.max() * 100 if n > 0 else 0
+    metrics['Worst Day'] = ret.min() * 100 if n > 0 else 0
+    metrics['Best Month'] = m.monthly.max() * 100 if n > 0 else 0
+    metrics['Worst Month'] = m.monthly.min() * 100 if n > 0 else 0
+    metrics['Best Year'] = m.yearly.max() * 100 if n > 0 else 0
+    metrics['Worst Year'] = m.yearly.min() * 100 if n > 0 else 0
     
     # Drawdown metrics
-    metrics['Avg. Drawdown'] = avg_drawdown(returns) * 100
-    metrics['Avg. Drawdown Days'] = avg_dd_days(returns)
-    metrics['Recovery Factor'] = recovery_factor(returns)
-    metrics['Ulcer Index'] = ulcer_index(returns)
-    metrics['Serenity Index'] = serenity_index(returns, rf)
+    ui = m.ulcer_index
+    if n == 0:
+        metrics['Avg. Drawdown'] = 0
+        metrics['Avg. Drawdown Days'] = 0
+        metrics['Recovery Factor'] = np.inf
+        metrics['Ulcer Index'] = 0
+        metrics['Serenity Index'] = np.inf
+    else:
+        metrics['Avg. Drawdown'] = _avg_episode_drawdown(m.episodes_rel) * 100
+        metrics['Avg. Drawdown Days'] = _avg_episode_days(m.episodes_rel, n)
+        metrics['Recovery Factor'] = m.total_return / abs(md) if md != 0 else np.inf
+        metrics['Ulcer Index'] = ui
+        metrics['Serenity Index'] = (cagr_value - rf) / (ui ** 2) if ui != 0 else np.inf
     
     # Monthly metrics
-    metrics['Avg. Up Month'] = returns.resample('M').sum()[returns.resample('M').sum() > 0].mean() * 100 if len(returns.resample('M').sum()[returns.resample('M').sum() > 0]) > 0 else 0
-    metrics['Avg. Down Month'] = returns.resample('M').sum()[returns.resample('M').sum() < 0].mean() * 100 if len(returns.resample('M').sum()[returns.resample('M').sum() < 0]) > 0 else 0
+    up_months = m.monthly[m.monthly > 0]
+    down_months = m.monthly[m.monthly < 0]
+    metrics['Avg. Up Month'] = up_months.mean() * 100 if len(up_months) > 0 else 0
+    metrics['Avg. Down Month'] = down_months.mean() * 100 if len(down_months) > 0 else 0
     
     # Win rates
-    metrics['Win Days %'] = win_rate(returns, 'D')
-    metrics['Win Month %'] = win_rate(returns, 'M')
-    metrics['Win Quarter %'] = win_rate(returns, 'Q')
-    metrics['Win Year %'] = win_rate(returns, 'Y')
+    metrics['Win Days %'] = _win_pct(m.daily) if n > 0 else 0
+    metrics['Win Month %'] = _win_pct(m.monthly) if n > 0 else 0
+    metrics['Win Quarter %'] = _win_pct(m.quarterly) if n > 0 else 0
+    metrics['Win Year %'] = _win_pct(m.yearly) if n > 0 else 0
     
     # Advanced metrics
-    if len(returns) > 1:
-        n = len(returns)
-        sr = sharpe(returns, rf)
+    if n > 1:
+        sr = metrics['Sharpe']
         metrics['Prob. Sharpe Ratio'] = (1 / (1 + np.exp(-sr * np.sqrt(n)))) * 100
-        autocorr = returns.autocorr(lag=1)
-        adj_std = returns.std() * np.sqrt((1 + 2 * autocorr) / (1 - autocorr)) if autocorr != 1 else returns.std()
-        metrics['Smart Sharpe'] = (returns.mean() - rf/252) / adj_std * np.sqrt(252) if adj_std != 0 else 0
-        metrics['Smart Sortino'] = sortino(returns, rf) / np.sqrt(1 + 2 * autocorr) if 1 + 2 * autocorr > 0 else sortino(returns, rf)
-        metrics['Smart Sortino/√2'] = metrics['Smart Sortino'] / np.sqrt(2) if 'Smart Sortino' in metrics else 0
+        autocorr = ret.autocorr(lag=1)
+        adj_std = m.std * np.sqrt((1 + 2 * autocorr) / (1 - autocorr)) if autocorr != 1 else m.std
+        metrics['Smart Sharpe'] = (m.mean - rf/252) / adj_std * np.sqrt(252) if adj_std != 0 else 0
+        metrics['Smart Sortino'] = sortino_value / np.sqrt(1 + 2 * autocorr) if 1 + 2 * autocorr > 0 else sortino_value
+        metrics['Smart Sortino/√2'] = metrics['Smart Sortino'] / np.sqrt(2)
     else:
         metrics['Prob. Sharpe Ratio'] = 0
         metrics['Smart Sharpe'] = 0
@@ -316,24 +541,228 @@ def calculate_all_metrics(returns, rf=0.0):
     
     return metrics
 
+def _as_2d(returns):
+    """(values, column labels) for a DataFrame / 2-D array / Series of returns."""
+    if isinstance(returns, pd.Series):
+        returns = returns.to_frame()
+    if isinstance(returns, pd.DataFrame):
+        return returns.to_numpy(dtype=np.float64), returns.columns
+    values = np.asarray(returns, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    return values, pd.RangeIndex(values.shape[1])
+
+def _masked_sum(values, mask):
+    return np.where(mask, values, 0.0).sum(axis=0)
+
+def _masked_mean(values, mask):
+    count = mask.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, _masked_sum(values, mask) / count, np.nan)
+
+def _sorted_quantile(values, n, q):
+    """Per-column linear quantile (as pd.Series.quantile) of NaN-padded columns."""
+    if values.shape[0] == 0:
+        return np.full(values.shape[1], np.nan)
+    ordered = np.sort(values, axis=0)
+    h = q * np.maximum(n - 1, 0)
+    lo = np.floor(h).astype(np.int64)
+    hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+    cols = np.arange(values.shape[1])
+    a, b = ordered[lo, cols], ordered[hi, cols]
+    return np.where(n > 0, a + (h - lo) * (b - a), np.nan)
+
+def calculate_batch_metrics(returns, rf=0.0, periods_per_year=252):
+    """
+    Calculate metrics for many return series at once
+    
+    Every metric is a NumPy reduction along the time axis, so hundreds of
+    symbols / strategy variants are handled in one call. Ragged series are
+    NaN-padded; NaN entries are skipped (they do not move the equity curve).
+    Definitions and units follow calculate_all_metrics; calendar-based
+    metrics (monthly / yearly tables, trailing windows) need a datetime index
+    and stay in calculate_all_metrics.
+    
+    Parameters:
+    -----------
+    returns : pd.DataFrame or np.ndarray
+        Returns, time × series (one column per series)
+    rf : float
+        Risk-free rate (annualized)
+    periods_per_year : int
+        Periods per year for annualization
+    
+    Returns:
+    --------
+    pd.DataFrame : One row per series, one column per metric
+    """
+    r, labels = _as_2d(returns)
+    valid = ~np.isnan(r)
+    n = valid.sum(axis=0)
+    r0 = np.where(valid, r, 0.0)
+    ann = np.sqrt(periods_per_year)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Moments
+        mean = _masked_mean(r, valid)
+        dev = np.where(valid, r - mean, 0.0)
+        m2 = (dev ** 2).sum(axis=0)
+        std = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+        m3 = (dev ** 3).sum(axis=0)
+        m4 = (dev ** 4).sum(axis=0)
+        skew = np.where(m2 > 0, np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5, 0.0)
+        kurt = np.where(m2 > 0, n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+                        - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)), 0.0)
+
+        # Excess returns
+        excess = r - rf / periods_per_year
+        excess_mean = mean - rf / periods_per_year
+        sharpe_ratio = np.where(std != 0, excess_mean / std * ann, 0.0)
+        down = valid & (excess < 0)
+        down_std = np.sqrt(_masked_mean(excess ** 2, down)) * ann
+        sortino_ratio = np.where(down.any(axis=0) & (down_std != 0),
+                                 excess_mean * periods_per_year / down_std, 0.0)
+
+        # Equity curve and drawdowns
+        wealth = np.cumprod(1 + r0, axis=0)
+        peak = np.maximum.accumulate(wealth, axis=0)
+        dd = wealth / peak - 1
+        total = wealth[-1] - 1 if len(wealth) else np.zeros(r.shape[1])
+        years = n / periods_per_year
+        cagr_value = np.where(years > 0, (1 + total) ** (1 / years) - 1, 0.0)
+        max_dd = np.where(n > 0, dd.min(axis=0, initial=0.0), 0.0)
+        calmar_ratio = np.where(n == 0, 0.0, np.where(max_dd != 0, cagr_value / np.abs(max_dd), np.inf))
+        recovery = np.where(max_dd != 0, total / np.abs(max_dd), np.inf)
+        ulcer = np.sqrt(_masked_mean(dd ** 2, valid))
+
+        # Sign masks
+        wins = valid & (r > 0)
+        losses = valid & (r < 0)
+        n_wins = wins.sum(axis=0)
+        n_losses = losses.sum(axis=0)
+        sum_wins = _masked_sum(r, wins)
+        sum_losses = _masked_sum(r, losses)
+        avg_win = _masked_mean(r, wins)
+        avg_loss = _masked_mean(r, losses)
+        has_losses = n_losses > 0
+        win_prob = n_wins / n
+        payoff = np.where(has_losses, avg_win / np.abs(avg_loss), np.inf)
+        pf = np.where(has_losses, sum_wins / np.abs(sum_losses), np.inf)
+        gain_pain = np.where(has_losses, mean / np.abs(avg_loss), np.inf)
+        kelly = np.where(payoff != 0, win_prob - (1 - win_prob) / payoff, 0.0)
+
+        threshold = rf / periods_per_year
+        above = _masked_sum(r - threshold, valid & (r > threshold))
+        below = np.abs(_masked_sum(r - threshold, valid & (r < threshold)))
+        omega_ratio = np.where(below != 0, above / below, np.inf)
+
+        # Tails (linear-interpolated quantiles from the sorted columns, NaN last)
+        q05 = _sorted_quantile(r, n, 0.05)
+        q95 = _sorted_quantile(r, n, 0.95)
+        var = np.where(n > 1, q05, 0.0)
+        tail = valid & (r <= var)
+        cvar = np.where(tail.any(axis=0), _masked_mean(r, tail), 0.0)
+        tail_ratio_value = np.where((n >= 2) & (q05 != 0), q95 / np.abs(q05), np.inf)
+        csr = np.where(tail_ratio_value != np.inf, pf * tail_ratio_value, np.inf)
+
+        upper = mean + 3 * std
+        lower = mean - 3 * std
+        outliers = valid & ((r > upper) | (r < lower))
+        win_out = outliers & wins
+        loss_out = outliers & losses
+        outlier_win = np.where(win_out.any(axis=0), _masked_mean(r, win_out) / avg_win, 0.0)
+        outlier_loss = np.where(loss_out.any(axis=0), np.abs(_masked_mean(r, loss_out)) / np.abs(avg_loss), 0.0)
+
+        metrics = pd.DataFrame({
+            'Observations': n,
+            'Time in Market': _masked_mean((r != 0).astype(np.float64), valid) * 100,
+            'Cumulative Return': total * 100,
+            'CAGR': cagr_value * 100,
+            'Sharpe': sharpe_ratio,
+            'Sortino': sortino_ratio,
+            'Sortino/√2': sortino_ratio / np.sqrt(2),
+            'Omega': omega_ratio,
+            'Max Drawdown': max_dd * 100,
+            'Volatility (ann.)': std * ann * 100,
+            'Calmar': calmar_ratio,
+            'Skew': np.where(n > 2, skew, 0.0),
+            'Kurtosis': np.where(n > 3, kurt, 0.0),
+            'Expected Daily': mean * 100,
+            'Kelly Criterion': kelly * 100,
+            'Daily Value-at-Risk': var * 100,
+            'Expected Shortfall (cVaR)': cvar * 100,
+            'Gain/Pain Ratio': gain_pain,
+            'Payoff Ratio': payoff,
+            'Profit Factor': pf,
+            'Common Sense Ratio': csr,
+            'CPC Index': payoff * pf * win_prob,
+            'Tail Ratio': tail_ratio_value,
+            'Outlier Win Ratio': np.where(n_wins > 0, outlier_win, 0.0),
+            'Outlier Loss Ratio': np.where(has_losses, outlier_loss, 0.0),
+            'Best Day': np.where(n > 0, np.where(valid, r, -np.inf).max(axis=0, initial=-np.inf), 0.0) * 100,
+            'Worst Day': np.where(n > 0, np.where(valid, r, np.inf).min(axis=0, initial=np.inf), 0.0) * 100,
+            'Recovery Factor': recovery,
+            'Ulcer Index': np.where(n > 0, ulcer, 0.0),
+            'Serenity Index': np.where(ulcer > 0, (cagr_value - rf) / ulcer ** 2, np.inf),
+            'Win Rate %': win_prob * 100,
+        }, index=labels)
+    return metrics
+
+def calculate_grouped_metrics(df, group_cols, return_col='Return', order_col=None, rf=0.0,
+                              periods_per_year=252):
+    """
+    Batch metrics for a long-format frame (one row per period per series)
+    
+    Each group (e.g. Symbol, or Symbol × strategy variant) becomes one
+    NaN-padded column, aligned by its position within the group.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Long-format returns
+    group_cols : str or list
+        Column(s) identifying a series
+    return_col : str
+        Column holding the returns
+    order_col : str, optional
+        Sort each group by this column first (e.g. 'Date', 'ExitDate')
+    
+    Returns:
+    --------
+    pd.DataFrame : One row per group (indexed by group_cols), one column per metric
+    """
+    group_cols = [group_cols] if isinstance(group_cols, str) else list(group_cols)
+    if order_col is not None:
+        df = df.sort_values(group_cols + [order_col], kind='mergesort')
+    grouper = df.groupby(group_cols, sort=True)
+    col = grouper.ngroup().to_numpy()
+    pos = grouper.cumcount().to_numpy()
+    keys = grouper.size().index
+
+    values = np.full((pos.max() + 1 if len(pos) else 0, len(keys)), np.nan)
+    values[pos, col] = df[return_col].to_numpy(dtype=np.float64)
+    return calculate_batch_metrics(pd.DataFrame(values, columns=keys), rf, periods_per_year)
+
+
+def episodes_frame(episodes, index):
+    """Started / Recovered / Drawdown / Days table for closed episodes"""
+    closed = episodes[episodes['recovery'] >= 0]
+    started = index[closed['start']]
+    recovered = index[closed['end']]
+    return pd.DataFrame({
+        'Started': started,
+        'Recovered': recovered,
+        'Drawdown': closed['depth'] * 100,
+        'Days': (recovered - started).days,
+    })
+
 def get_drawdowns(returns):
     """Get detailed drawdown periods"""
     if len(returns) == 0:
         return pd.DataFrame()
-    cum = (1 + returns).cumprod()
-    peak = cum.cummax()
-    dd = (cum / peak - 1) * 100
-    in_dd = dd < 0
-    dd_starts = dd[(dd.shift(1) >= 0) & (dd < 0)].index
-    dd_ends = dd[(dd.shift(-1) >= 0) & (dd < 0)].index
-    drawdowns = []
-    for start, end in zip(dd_starts, dd_ends):
-        period_dd = dd[start:end]
-        min_dd = period_dd.min()
-        days = (end - start).days
-        drawdowns.append({'Started': start, 'Recovered': end, 'Drawdown': min_dd, 'Days': days})
-    df_dd = pd.DataFrame(drawdowns).sort_values('Drawdown').reset_index(drop=True)
-    return df_dd
+    cum = (1 + returns).to_numpy().cumprod()
+    df_dd = episodes_frame(drawdown_episodes(cum), returns.index)
+    return df_dd.sort_values('Drawdown').reset_index(drop=True)
 
 def get_monthly_table(returns):
     """Get monthly performance grid"""
@@ -10,6 +10,8 @@ import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from pathlib import Path
 
+from symbol_equity_engine import build_symbol_equity, symbol_curves, STARTING_BALANCE
+
 print("=" * 80)
 print("GENERATING EQUITY CURVES FOR ALL SYMBOLS - SHORT STRATEGY")
 print("=" * 80)
@@ -24,40 +26,10 @@ print(f"✓ Loaded {len(trades):,} trades")
 symbols = sorted(trades['Symbol'].unique())
 print(f"✓ Found {len(symbols)} symbols")
 
-# Calculate equity curves
+# Calculate equity curves and per-symbol statistics in one pass
 print(f"\n[2/5] Calculating equity curves...")
-STARTING_BALANCE = 100000.0
-
-equity_curves = []
-
-for symbol in symbols:
-    # Get symbol trades sorted by entry date
-    symbol_trades = trades[trades['Symbol'] == symbol].sort_values('EntryDate').reset_index(drop=True)
-    
-    if len(symbol_trades) == 0:
-        continue
-    
-    # Calculate cumulative equity
-    symbol_trades['CumulativeProfit'] = symbol_trades['NetProfit'].cumsum()
-    symbol_trades['Equity'] = STARTING_BALANCE + symbol_trades['CumulativeProfit']
-    symbol_trades['EquityPctGain'] = ((symbol_trades['Equity'] - STARTING_BALANCE) / STARTING_BALANCE) * 100
-    symbol_trades['TradeNumber'] = range(1, len(symbol_trades) + 1)
-    
-    # Store equity curve data
-    for idx, row in symbol_trades.iterrows():
-        equity_curves.append({
-            'Symbol': symbol,
-            'TradeNumber': row['TradeNumber'],
-            'EntryDate': row['EntryDate'],
-            'ExitDate': row['ExitDate'],
-            'NetProfit': row['NetProfit'],
-            'CumulativeProfit': row['CumulativeProfit'],
-            'Equity': row['Equity'],
-            'EquityPctGain': row['EquityPctGain']
-        })
-
-# Convert to DataFrame
-equity_df = pd.DataFrame(equity_curves)
+equity_df, stats_df = build_symbol_equity(trades, STARTING_BALANCE)
+curves_by_symbol = symbol_curves(equity_df, stats_df)
 print(f"✓ Calculated {len(equity_df):,} equity curve points")
 
 # Save to CSV
@@ -71,36 +43,8 @@ parquet_path = '/home/ubuntu/stage4_optimization/Best_Short_Strategy_Equity_Curv
 equity_df.to_parquet(parquet_path, index=False)
 print(f"✓ Saved to: {parquet_path}")
 
-# Calculate summary statistics per symbol
-print(f"\n[4/5] Calculating summary statistics...")
-symbol_stats = []
-
-for symbol in symbols:
-    symbol_equity = equity_df[equity_df['Symbol'] == symbol]
-    
-    if len(symbol_equity) == 0:
-        continue
-    
-    final_equity = symbol_equity['Equity'].iloc[-1]
-    final_pct_gain = symbol_equity['EquityPctGain'].iloc[-1]
-    total_trades = len(symbol_equity)
-    max_equity = symbol_equity['Equity'].max()
-    min_equity = symbol_equity['Equity'].min()
-    max_drawdown_pct = ((min_equity - max_equity) / max_equity) * 100 if max_equity > 0 else 0
-    
-    symbol_stats.append({
-        'Symbol': symbol,
-        'TotalTrades': total_trades,
-        'StartingEquity': STARTING_BALANCE,
-        'FinalEquity': final_equity,
-        'TotalProfit': final_equity - STARTING_BALANCE,
-        'PctGain': final_pct_gain,
-        'MaxEquity': max_equity,
-        'MinEquity': min_equity,
-        'MaxDrawdownPct': max_drawdown_pct
-    })
-
-stats_df = pd.DataFrame(symbol_stats)
+# Save summary statistics per symbol
+print(f"\n[4/5] Saving summary statistics...")
 stats_path = '/home/ubuntu/stage4_optimization/Best_Short_Strategy_Symbol_Stats.csv'
 stats_df.to_csv(stats_path, index=False)
 print(f"✓ Symbol statistics saved to: {stats_path}")
@@ -119,11 +63,9 @@ print(f"\n[5/5] Creating visualizations...")
 # Figure 1: All equity curves together
 fig1, ax1 = plt.subplots(figsize=(16, 10))
 
-for symbol in symbols:
-    symbol_equity = equity_df[equity_df['Symbol'] == symbol]
-    if len(symbol_equity) > 0:
-        ax1.plot(symbol_equity['TradeNumber'], symbol_equity['EquityPctGain'], 
-                alpha=0.3, linewidth=0.5)
+for symbol_equity in curves_by_symbol.values():
+    ax1.plot(symbol_equity['TradeNumber'], symbol_equity['EquityPctGain'], 
+             alpha=0.3, linewidth=0.5)
 
 ax1.axhline(y=0, color='red', linestyle='--', linewidth=1, alpha=0.7, label='Breakeven')
 ax1.set_xlabel('Trade Number', fontsize=12, fontweight='bold')
@@ -148,7 +90,7 @@ ax_top = fig2.add_subplot(gs[0])
 top_20 = stats_df.nlargest(20, 'PctGain')
 
 for symbol in top_20['Symbol']:
-    symbol_equity = equity_df[equity_df['Symbol'] == symbol]
+    symbol_equity = curves_by_symbol[symbol]
     final_pct = symbol_equity['EquityPctGain'].iloc[-1]
     ax_top.plot(symbol_equity['TradeNumber'], symbol_equity['EquityPctGain'], 
                linewidth=1.5, alpha=0.7, label=f'{symbol} ({final_pct:.1f}%)')
@@ -165,7 +107,7 @@ ax_bottom = fig2.add_subplot(gs[1])
 bottom_20 = stats_df.nsmallest(20, 'PctGain')
 
 for symbol in bottom_20['Symbol']:
-    symbol_equity = equity_df[equity_df['Symbol'] == symbol]
+    symbol_equity = curves_by_symbol[symbol]
     final_pct = symbol_equity['EquityPctGain'].iloc[-1]
     ax_bottom.plot(symbol_equity['TradeNumber'], symbol_equity['EquityPctGain'], 
                   linewidth=1.5, alpha=0.7, label=f'{symbol} ({final_pct:.1f}%)')
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3.11
+"""
+Online Performance Metrics Module
+Incremental accumulators for live equity monitoring
+
+Every accumulator updates in O(1) per new observation and, except for the
+rolling window, can be merged with another accumulator of the same type
+(e.g. built in a different worker process). Definitions follow
+extended_metrics.py:
+- Sharpe:  mean / std (ddof=1) * sqrt(periods_per_year)
+- Sortino: mean * periods_per_year / (sqrt(mean of squared negative returns) * sqrt(periods_per_year))
+- Drawdown: equity / running peak - 1
+"""
+
+import numpy as np
+import pandas as pd
+from collections import deque
+
+PERIODS_PER_YEAR = 252
+ROLLING_WINDOW = 63  # trading days (one quarter)
+
+
+class RunningMoments:
+    """Count, mean and variance (Welford); merge uses Chan et al.'s pairwise update."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+class DownsideDeviation:
+    """Squared shortfalls below a threshold (the Sortino denominator)."""
+
+    def __init__(self, threshold=0.0):
+        self.threshold = threshold
+        self.n_down = 0
+        self.sum_sq = 0.0
+
+    def update(self, x):
+        shortfall = x - self.threshold
+        if shortfall < 0:
+            self.n_down += 1
+            self.sum_sq += shortfall * shortfall
+
+    def merge(self, other):
+        self.n_down += other.n_down
+        self.sum_sq += other.sum_sq
+        return self
+
+    def value(self, periods_per_year=PERIODS_PER_YEAR):
+        """Annualized downside deviation (0 when there are no shortfalls)."""
+        if self.n_down == 0:
+            return 0
+        return np.sqrt(self.sum_sq / self.n_down) * np.sqrt(periods_per_year)
+
+
+class DrawdownTracker:
+    """
+    Running peak and drawdown of a compounded return stream.
+
+    Wealth starts at 1.0. merge(other) appends a later segment: the merged
+    maximum drawdown is exact, because the deepest point of the later segment
+    relative to the earlier peak is reached at its minimum wealth. Merged
+    underwater durations are exact unless the later segment sets a new peak,
+    in which case the run spanning the boundary counts only the earlier part.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.wealth = 1.0
+        self.peak = 1.0
+        self.min_wealth = 1.0
+        self.max_drawdown = 0.0
+        self.duration = 0
+        self.longest_duration = 0
+
+    def update(self, ret):
+        self.n += 1
+        self.wealth *= 1 + ret
+        self.min_wealth = min(self.min_wealth, self.wealth)
+        if self.wealth >= self.peak:
+            self.peak = self.wealth
+            self.duration = 0
+        else:
+            self.duration += 1
+            self.longest_duration = max(self.longest_duration, self.duration)
+            self.max_drawdown = min(self.max_drawdown, self.wealth / self.peak - 1)
+
+    def merge(self, other):
+        scale = self.wealth
+        self.max_drawdown = min(self.max_drawdown, other.max_drawdown,
+                                scale * other.min_wealth / self.peak - 1)
+        self.min_wealth = min(self.min_wealth, scale * other.min_wealth)
+        if scale * other.peak >= self.peak:
+            self.peak = scale * other.peak
+            self.duration = other.duration
+        else:
+            self.duration += other.n
+        self.n += other.n
+        self.wealth = scale * other.wealth
+        self.longest_duration = max(self.longest_duration, other.longest_duration, self.duration)
+        return self
+
+    @property
+    def drawdown(self):
+        return self.wealth / self.peak - 1
+
+
+class TradeStats:
+    """Win/loss counts and gross profit/loss of closed trades."""
+
+    def __init__(self):
+        self.wins = 0
+        self.losses = 0
+        self.flat = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.largest_win = 0.0
+        self.largest_loss = 0.0
+
+    def update(self, pnl):
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+            self.largest_win = max(self.largest_win, pnl)
+        elif pnl < 0:
+            self.losses += 1
+            self.gross_loss += -pnl
+            self.largest_loss = min(self.largest_loss, pnl)
+        else:
+            self.flat += 1
+
+    def merge(self, other):
+        self.wins += other.wins
+        self.losses += other.losses
+        self.flat += other.flat
+        self.gross_profit += other.gross_profit
+        self.gross_loss += other.gross_loss
+        self.largest_win = max(self.largest_win, other.largest_win)
+        self.largest_loss = min(self.largest_loss, other.largest_loss)
+        return self
+
+    @property
+    def n(self):
+        return self.wins + self.losses + self.flat
+
+    @property
+    def profit_factor(self):
+        return self.gross_profit / self.gross_loss if self.gross_loss > 0 else np.inf
+
+    @property
+    def win_rate(self):
+        return self.wins / self.n * 100 if self.n > 0 else 0
+
+    @property
+    def payoff_ratio(self):
+        if self.losses == 0:
+            return np.inf
+        avg_win = self.gross_profit / self.wins if self.wins > 0 else 0
+        return avg_win / (self.gross_loss / self.losses)
+
+
+class RollingWindow:
+    """
+    Rolling Sharpe, Sortino and profit factor over the last `window` returns.
+
+    Running sums are updated by adding the new return and subtracting the
+    evicted one; they are re-summed from the buffer once per `window` updates
+    so floating-point drift cannot accumulate.
+    """
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self.buffer = deque(maxlen=window)
+        self._since_resum = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.down_sq = 0.0
+        self.n_down = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+
+    def _add(self, x, sign):
+        self.sum += sign * x
+        self.sum_sq += sign * x * x
+        if x < 0:
+            self.down_sq += sign * x * x
+            self.n_down += sign
+            self.gross_loss += sign * -x
+        elif x > 0:
+            self.gross_profit += sign * x
+
+    def update(self, x):
+        if len(self.buffer) == self.window:
+            self._add(self.buffer[0], -1)
+        self.buffer.append(x)
+        self._add(x, 1)
+
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self._reset_sums()
+            for value in self.buffer:
+                self._add(value, 1)
+            self._since_resum = 0
+
+    @property
+    def n(self):
+        return len(self.buffer)
+
+    @property
+    def full(self):
+        return len(self.buffer) == self.window
+
+    def sharpe(self, periods_per_year=PERIODS_PER_YEAR):
+        n = self.n
+        if n < 2:
+            return 0
+        mean = self.sum / n
+        var = max(self.sum_sq - n * mean * mean, 0.0) / (n - 1)
+        return mean / np.sqrt(var) * np.sqrt(periods_per_year) if var > 0 else 0
+
+    def sortino(self, periods_per_year=PERIODS_PER_YEAR):
+        if self.n == 0 or self.n_down == 0 or self.down_sq <= 0:
+            return 0
+        down_std = np.sqrt(self.down_sq / self.n_down) * np.sqrt(periods_per_year)
+        return self.sum / self.n * periods_per_year / down_std
+
+    def profit_factor(self):
+        return self.gross_profit / self.gross_loss if self.gross_loss > 0 else np.inf
+
+
+class LiveMetrics:
+    """
+    Live metrics for a running backtest or portfolio.
+
+    Feed period returns with update(), or equity marks with update_equity()
+    (returns are formed on day boundaries, matching
+    equity.resample('D').last().pct_change()). Closed trades go to
+    record_trade().
+    """
+
+    def __init__(self, rolling_window=ROLLING_WINDOW, periods_per_year=PERIODS_PER_YEAR, rf=0.0):
+        self.periods_per_year = periods_per_year
+        self.rf = rf
+        self.moments = RunningMoments()
+        self.downside = DownsideDeviation()
+        self.drawdown = DrawdownTracker()
+        self.rolling = RollingWindow(rolling_window)
+        self.trades = TradeStats()
+
+        self._day = None
+        self._day_equity = None
+        self._prev_equity = None
+
+    def update(self, ret):
+        """Add one period return."""
+        excess = ret - self.rf / self.periods_per_year
+        self.moments.update(excess)
+        self.downside.update(excess)
+        self.drawdown.update(ret)
+        self.rolling.update(excess)
+
+    def update_equity(self, timestamp, equity):
+        """Add an equity mark; emits one return per completed day."""
+        day = pd.Timestamp(timestamp).normalize()
+        if self._day is not None and day != self._day:
+            if self._prev_equity is not None and self._prev_equity != 0:
+                self.update(self._day_equity / self._prev_equity - 1)
+            self._prev_equity = self._day_equity
+        self._day = day
+        self._day_equity = equity
+
+    def record_trade(self, pnl):
+        self.trades.update(pnl)
+
+    def merge(self, other):
+        """Pool another LiveMetrics (a later segment of the same stream for drawdowns)."""
+        self.moments.merge(other.moments)
+        self.downside.merge(other.downside)
+        self.drawdown.merge(other.drawdown)
+        self.trades.merge(other.trades)
+        return self
+
+    @property
+    def sharpe(self):
+        std = self.moments.std
+        if self.moments.n == 0 or not std > 0:
+            return 0
+        return self.moments.mean / std * np.sqrt(self.periods_per_year)
+
+    @property
+    def sortino(self):
+        down = self.downside.value(self.periods_per_year)
+        return self.moments.mean * self.periods_per_year / down if down != 0 else 0
+
+    def snapshot(self):
+        """Current metrics as a dict (percentages where extended_metrics uses them)."""
+        return {
+            'Periods': self.moments.n,
+            'Cumulative Return': (self.drawdown.wealth - 1) * 100,
+            'Sharpe': self.sharpe,
+            'Sortino': self.sortino,
+            'Volatility (ann.)': self.moments.std * np.sqrt(self.periods_per_year) * 100 if self.moments.n > 1 else 0,
+            'Max Drawdown': self.drawdown.max_drawdown * 100,
+            'Current Drawdown': self.drawdown.drawdown * 100,
+            'Longest DD Periods': self.drawdown.longest_duration,
+            'Rolling Sharpe': self.rolling.sharpe(self.periods_per_year),
+            'Rolling Sortino': self.rolling.sortino(self.periods_per_year),
+            'Rolling Profit Factor': self.rolling.profit_factor(),
+            'Trades': self.trades.n,
+            'Trade Win Rate': self.trades.win_rate,
+            'Trade Profit Factor': self.trades.profit_factor,
+        }
+
+    def summary_line(self):
+        """One-line progress string for simulator logs."""
+        s = self.snapshot()
+        return (f"Sharpe {s['Sharpe']:.2f} | Rolling Sharpe {s['Rolling Sharpe']:.2f} | "
+                f"MaxDD {s['Max Drawdown']:.2f}% | DD {s['Current Drawdown']:.2f}% | "
+                f"PF {s['Trade Profit Factor']:.2f}")
@@ -13,6 +13,9 @@ from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from portfolio_allocation import PortfolioAllocator, ALLOCATION_METHODS
+from rolling_covariance import rolling_correlation
+
 print("="*80)
 print("PART III - SECTION A: STRATEGY COMPARISON ANALYSIS")
 print("="*80)
@@ -232,8 +235,11 @@ merged_daily['Short_Returns'] = merged_daily['Equity_short'].pct_change()
 # Overall correlation
 correlation = merged_daily[['Long_Returns', 'Short_Returns']].corr().iloc[0, 1]
 
-# Rolling 30-day correlation
-merged_daily['Rolling_Corr'] = merged_daily['Long_Returns'].rolling(30).corr(merged_daily['Short_Returns'])
+# Rolling 30-day correlation, diversification ratio and correlation regimes (incremental engine)
+rolling = rolling_correlation(merged_daily.set_index('Date')[['Long_Returns', 'Short_Returns']], window=30)
+merged_daily['Rolling_Corr'] = rolling['correlation'][:, 0, 1]
+merged_daily['Diversification_Ratio'] = rolling['summary']['Diversification_Ratio'].to_numpy()
+correlation_regimes = rolling['regimes']
 
 # Drawdown correlation
 long_cummax = merged_daily['Equity_long'].cummax()
@@ -252,9 +258,13 @@ correlation_summary = {
     'Short Avg DD': merged_daily['Short_DD'].mean(),
 }
 
+correlation_summary['Avg Diversification Ratio (50/50)'] = merged_daily['Diversification_Ratio'].mean()
+correlation_summary['Correlation Regimes'] = len(correlation_regimes)
+
 correlation_df = pd.DataFrame([correlation_summary])
 correlation_df.to_csv('/home/ubuntu/stage4_optimization/part3_a3_correlation_summary.csv', index=False)
 merged_daily.to_csv('/home/ubuntu/stage4_optimization/part3_a3_daily_returns_correlation.csv', index=False)
+correlation_regimes.to_csv('/home/ubuntu/stage4_optimization/part3_a3_correlation_regimes.csv', index=False)
 
 print(f"✓ Correlation: {correlation:.4f}")
 print(f"  Drawdown overlap: {dd_overlap_pct:.1f}% of days")
@@ -350,102 +360,55 @@ print(f"  Total symbols: {symbol_summary['Total Unique Symbols']}, Overlap: {len
 # ============================================================================
 print("\n[7/8] Calculating risk contribution...")
 
-# Calculate individual volatilities
-long_vol = daily_returns.std() * np.sqrt(252) if 'daily_returns' in dir() else long_metrics.loc['Volatility (ann.)', 'Value']
-short_vol = short_metrics.loc['Volatility (ann.)', 'Value']
-
-# For 50/50 portfolio
-weight_long = 0.5
-weight_short = 0.5
-
-# Portfolio volatility (accounting for correlation)
-portfolio_vol = np.sqrt(
-    (weight_long**2 * (long_vol/100)**2) + 
-    (weight_short**2 * (short_vol/100)**2) + 
-    (2 * weight_long * weight_short * (long_vol/100) * (short_vol/100) * correlation)
-) * 100
-
-# Marginal risk contribution
-long_marginal = (weight_long * (long_vol/100)**2 + weight_short * (long_vol/100) * (short_vol/100) * correlation) / (portfolio_vol/100)
-short_marginal = (weight_short * (short_vol/100)**2 + weight_long * (long_vol/100) * (short_vol/100) * correlation) / (portfolio_vol/100)
-
-# Risk contribution (%)
-long_risk_contrib = (long_marginal * weight_long) / (portfolio_vol/100) * 100
-short_risk_contrib = (short_marginal * weight_short) / (portfolio_vol/100) * 100
-
-# Diversification benefit
-weighted_avg_vol = weight_long * long_vol + weight_short * short_vol
-diversification_benefit = weighted_avg_vol - portfolio_vol
-
-risk_contrib = {
-    'LONG Volatility (%)': long_vol,
-    'SHORT Volatility (%)': short_vol,
-    'Portfolio Volatility (50/50) (%)': portfolio_vol,
-    'LONG Risk Contribution (%)': long_risk_contrib,
-    'SHORT Risk Contribution (%)': short_risk_contrib,
-    'Diversification Benefit (%)': diversification_benefit,
-    'Correlation': correlation
-}
-
-risk_contrib_df = pd.DataFrame([risk_contrib])
+# Daily return matrix (days × strategies); any number of strategies can be added as columns
+strategy_returns = merged_daily[['Long_Returns', 'Short_Returns']].rename(
+    columns={'Long_Returns': 'LONG', 'Short_Returns': 'SHORT'})
+allocator = PortfolioAllocator(strategy_returns)
+n_strategies = allocator.n_assets
+
+# Equal-weight portfolio (50/50 for two strategies)
+equal_weights = np.full(n_strategies, 1.0 / n_strategies)
+equal_label = '/'.join(f'{w * 100:.0f}' for w in equal_weights)
+risk_contrib_df = allocator.risk_contribution_table(equal_weights).rename(
+    columns={'Portfolio Volatility (%)': f'Portfolio Volatility ({equal_label}) (%)'})
+risk_contrib_df['Correlation'] = correlation
 risk_contrib_df.to_csv('/home/ubuntu/stage4_optimization/part3_a6_risk_contribution.csv', index=False)
 
+long_risk_contrib = risk_contrib_df['LONG Risk Contribution (%)'].iloc[0]
+short_risk_contrib = risk_contrib_df['SHORT Risk Contribution (%)'].iloc[0]
+diversification_benefit = risk_contrib_df['Diversification Benefit (%)'].iloc[0]
+
 print(f"✓ Risk contribution: LONG {long_risk_contrib:.1f}%, SHORT {short_risk_contrib:.1f}%")
 print(f"  Diversification benefit: {diversification_benefit:.2f}%")
+print(f"  Covariance shrinkage (Ledoit-Wolf): {allocator.shrinkage:.3f}")
 
 # ============================================================================
 # A.7: OPTIMAL ALLOCATION ANALYSIS
 # ============================================================================
 print("\n[8/8] Finding optimal allocation...")
 
-# Test allocations from 0/100 to 100/0
-allocations = []
+# Optimized allocations (SLSQP on the shrunk covariance / realized daily path)
+optimal_weights, optimized_df = allocator.optimize_all()
+optimized_df.to_csv('/home/ubuntu/stage4_optimization/part3_a7_optimized_allocations.csv')
 
-for long_weight in np.arange(0, 1.05, 0.05):
-    short_weight = 1 - long_weight
-    
-    # Expected return (weighted)
-    long_return = long_metrics.loc['CAGR', 'Value'] / 100
-    short_return = short_metrics.loc['CAGR', 'Value'] / 100
-    portfolio_return = long_weight * long_return + short_weight * short_return
-    
-    # Portfolio volatility
-    port_vol = np.sqrt(
-        (long_weight**2 * (long_vol/100)**2) + 
-        (short_weight**2 * (short_vol/100)**2) + 
-        (2 * long_weight * short_weight * (long_vol/100) * (short_vol/100) * correlation)
-    )
-    
-    # Sharpe ratio
-    sharpe_ratio = portfolio_return / port_vol if port_vol > 0 else 0
-    
-    # Max drawdown (weighted approximation)
-    long_dd = abs(long_metrics.loc['Max Drawdown', 'Value'])
-    short_dd = abs(short_metrics.loc['Max Drawdown', 'Value'])
-    portfolio_dd = -(long_weight * long_dd + short_weight * short_dd)
-    
-    # Calmar ratio
-    calmar_ratio = (portfolio_return * 100) / abs(portfolio_dd) if portfolio_dd != 0 else 0
-    
-    allocations.append({
-        'LONG Weight (%)': long_weight * 100,
-        'SHORT Weight (%)': short_weight * 100,
-        'Expected Return (%)': portfolio_return * 100,
-        'Volatility (%)': port_vol * 100,
-        'Sharpe Ratio': sharpe_ratio,
-        'Max Drawdown (%)': portfolio_dd,
-        'Calmar Ratio': calmar_ratio
-    })
+# Risk contribution of every optimized allocation
+allocator.risk_contribution_table(optimal_weights, labels=list(ALLOCATION_METHODS)).to_csv(
+    '/home/ubuntu/stage4_optimization/part3_a6_risk_contribution_by_allocation.csv')
 
-allocation_df = pd.DataFrame(allocations)
+# Frontier of LONG/SHORT mixes in 5% steps for the allocation charts (one vectorized evaluation)
+long_grid = np.round(np.arange(0, 1.05, 0.05), 2)
+allocation_df = allocator.evaluate(np.column_stack([long_grid, 1 - long_grid]))
 allocation_df.to_csv('/home/ubuntu/stage4_optimization/part3_a7_optimal_allocation.csv', index=False)
 
-# Find optimal
-optimal_sharpe = allocation_df.loc[allocation_df['Sharpe Ratio'].idxmax()]
-optimal_calmar = allocation_df.loc[allocation_df['Calmar Ratio'].idxmax()]
+optimal_sharpe = optimized_df.loc['max_sharpe']
+optimal_calmar = optimized_df.loc['max_calmar']
 
-print(f"✓ Optimal allocation (max Sharpe): {optimal_sharpe['LONG Weight (%)']:.0f}% LONG / {optimal_sharpe['SHORT Weight (%)']:.0f}% SHORT")
+print(f"✓ Optimal allocation (max Sharpe): {optimal_sharpe['LONG Weight (%)']:.1f}% LONG / {optimal_sharpe['SHORT Weight (%)']:.1f}% SHORT")
 print(f"  Sharpe: {optimal_sharpe['Sharpe Ratio']:.4f}, Return: {optimal_sharpe['Expected Return (%)']:.2f}%")
+for method in ALLOCATION_METHODS:
+    row = optimized_df.loc[method]
+    weights = ' / '.join(f"{row[f'{name} Weight (%)']:.1f}% {name}" for name in allocator.names)
+    print(f"  {method:13s}: {weights} | Sharpe {row['Sharpe Ratio']:.2f}, Calmar {row['Calmar Ratio']:.2f}")
 
 print("\n" + "="*80)
 print("SECTION A COMPLETE - All strategy comparison metrics calculated")
@@ -457,6 +420,7 @@ print(f"  - part3_a2_combined_equity_curve.csv")
 print(f"  - part3_a2_combined_trades.csv")
 print(f"  - part3_a3_correlation_summary.csv")
 print(f"  - part3_a3_daily_returns_correlation.csv")
+print(f"  - part3_a3_correlation_regimes.csv")
 print(f"  - part3_a4_trades_by_hour.csv")
 print(f"  - part3_a4_trades_by_dayofweek.csv")
 print(f"  - part3_a4_trades_by_month.csv")
@@ -466,5 +430,7 @@ print(f"  - part3_a5_short_symbol_performance.csv")
 print(f"  - part3_a5_top20_long_symbols.csv")
 print(f"  - part3_a5_top20_short_symbols.csv")
 print(f"  - part3_a6_risk_contribution.csv")
+print(f"  - part3_a6_risk_contribution_by_allocation.csv")
 print(f"  - part3_a7_optimal_allocation.csv")
+print(f"  - part3_a7_optimized_allocations.csv")
 print("="*80)
@@ -6,10 +6,12 @@ capital deployment capacity, and sizing recommendations
 """
 
 import pandas as pd
-import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
 
+from stock_characteristics import (calculate_stock_metrics, estimate_liquidity, estimate_market_cap_tier,
+                                   analyze_by_category, split_by_strategy, impact_aware_capacity)
+
 print("="*80)
 print("PART III - SECTION B: STOCK UNIVERSE & CHARACTERISTICS ANALYSIS")
 print("="*80)
@@ -71,54 +73,12 @@ print(f"  Avg symbols/day: LONG {long_daily_symbols.mean():.1f}, SHORT {short_da
 # ============================================================================
 print("\n[3/10] Calculating stock characteristics from trade data...")
 
-# For each symbol, calculate metrics from the trades
-def calculate_stock_metrics(trades_df, symbol):
-    """Calculate metrics for a single symbol"""
-    symbol_trades = trades_df[trades_df['Symbol'] == symbol]
-    
-    # Average price (from entry prices)
-    avg_price = symbol_trades['EntryPrice'].mean()
-    
-    # Average position value
-    avg_position_value = symbol_trades['EntryValue'].mean() if 'EntryValue' in symbol_trades.columns else (symbol_trades['EntryPrice'] * symbol_trades['Shares']).mean()
-    
-    # Volatility (from price changes)
-    if len(symbol_trades) > 1:
-        price_changes = symbol_trades['ExitPrice'] / symbol_trades['EntryPrice'] - 1
-        volatility = price_changes.std() * np.sqrt(252)  # Annualized
-    else:
-        volatility = 0
-    
-    # Trade frequency (trades per day)
-    trading_days = symbol_trades['Date'].nunique()
-    trades_per_day = len(symbol_trades) / trading_days if trading_days > 0 else 0
-    
-    return {
-        'Symbol': symbol,
-        'Avg_Price': avg_price,
-        'Avg_Position_Value': avg_position_value,
-        'Volatility_Ann': volatility * 100,  # As percentage
-        'Total_Trades': len(symbol_trades),
-        'Trading_Days': trading_days,
-        'Trades_Per_Day': trades_per_day
-    }
-
-# Calculate for all symbols
+# One grouped aggregation per strategy (stock_characteristics.calculate_stock_metrics)
 print("  Calculating LONG symbol metrics...")
-long_metrics_list = []
-for symbol in long_symbol_perf['Symbol'].unique():
-    metrics = calculate_stock_metrics(long_trades, symbol)
-    long_metrics_list.append(metrics)
-
-long_stock_metrics = pd.DataFrame(long_metrics_list)
+long_stock_metrics = calculate_stock_metrics(long_trades, long_symbol_perf['Symbol'].unique())
 
 print("  Calculating SHORT symbol metrics...")
-short_metrics_list = []
-for symbol in short_symbol_perf['Symbol'].unique():
-    metrics = calculate_stock_metrics(short_trades, symbol)
-    short_metrics_list.append(metrics)
-
-short_stock_metrics = pd.DataFrame(short_metrics_list)
+short_stock_metrics = calculate_stock_metrics(short_trades, short_symbol_perf['Symbol'].unique())
 
 # Merge with performance
 long_full = pd.merge(long_symbol_perf, long_stock_metrics, on='Symbol')
@@ -133,112 +93,36 @@ print("\n[4/10] Estimating liquidity metrics...")
 # 1. Position size relative to typical market cap tiers
 # 2. Trading frequency (more liquid stocks trade more often)
 # 3. Price level (higher price stocks tend to be more liquid)
-
-def estimate_liquidity_tier(row):
-    """Estimate liquidity tier based on available metrics"""
-    # Use position value and trading frequency as proxies
-    position_value = row['Avg_Position_Value']
-    trades_per_day = row['Trades_Per_Day']
-    price = row['Avg_Price']
-    
-    # Estimate daily dollar volume (very rough approximation)
-    # Assume our position is ~1-5% of daily volume for typical stocks
-    estimated_daily_volume = position_value * 50  # Assume we're 2% of volume
-    
-    # Liquidity score = Daily Volume / Position Size
-    liquidity_score = estimated_daily_volume / position_value if position_value > 0 else 0
-    
-    # Assign tier
-    if liquidity_score > 100:
-        tier = 'Tier 1 (Very Liquid)'
-    elif liquidity_score > 50:
-        tier = 'Tier 2 (Liquid)'
-    elif liquidity_score > 20:
-        tier = 'Tier 3 (Moderate)'
-    elif liquidity_score > 10:
-        tier = 'Tier 4 (Illiquid)'
-    else:
-        tier = 'Tier 5 (Very Illiquid)'
-    
-    return pd.Series({
-        'Estimated_Daily_Volume': estimated_daily_volume,
-        'Liquidity_Score': liquidity_score,
-        'Liquidity_Tier': tier,
-        'Market_Impact_Est': (position_value / estimated_daily_volume * 100) if estimated_daily_volume > 0 else 0
-    })
-
-long_full[['Estimated_Daily_Volume', 'Liquidity_Score', 'Liquidity_Tier', 'Market_Impact_Est']] = long_full.apply(estimate_liquidity_tier, axis=1)
-short_full[['Estimated_Daily_Volume', 'Liquidity_Score', 'Liquidity_Tier', 'Market_Impact_Est']] = short_full.apply(estimate_liquidity_tier, axis=1)
+liquidity_cols = ['Estimated_Daily_Volume', 'Liquidity_Score', 'Liquidity_Tier', 'Market_Impact_Est']
+long_full[liquidity_cols] = estimate_liquidity(long_full)
+short_full[liquidity_cols] = estimate_liquidity(short_full)
 
 # Estimate market cap tier based on price and liquidity
-def estimate_market_cap_tier(row):
-    """Estimate market cap tier"""
-    price = row['Avg_Price']
-    liquidity_score = row['Liquidity_Score']
-    
-    # Higher price + higher liquidity = larger cap
-    if price > 200 and liquidity_score > 50:
-        return 'Mega-cap ($200B+)'
-    elif price > 100 and liquidity_score > 30:
-        return 'Large-cap ($10B-$200B)'
-    elif price > 50 or liquidity_score > 20:
-        return 'Mid-cap ($2B-$10B)'
-    elif price > 20:
-        return 'Small-cap ($300M-$2B)'
-    elif price > 5:
-        return 'Micro-cap ($50M-$300M)'
-    else:
-        return 'Nano-cap (<$50M)'
-
-long_full['Market_Cap_Tier'] = long_full.apply(estimate_market_cap_tier, axis=1)
-short_full['Market_Cap_Tier'] = short_full.apply(estimate_market_cap_tier, axis=1)
+long_full['Market_Cap_Tier'] = estimate_market_cap_tier(long_full)
+short_full['Market_Cap_Tier'] = estimate_market_cap_tier(short_full)
 
 long_full.to_csv('/home/ubuntu/stage4_optimization/part3_b2_long_stock_characteristics.csv', index=False)
 short_full.to_csv('/home/ubuntu/stage4_optimization/part3_b2_short_stock_characteristics.csv', index=False)
 
 print(f"✓ Stock characteristics calculated with liquidity estimates")
 
+# Create volatility quintiles (within each strategy)
+long_full['Volatility_Quintile'] = pd.qcut(long_full['Volatility_Ann'], q=5, labels=False, duplicates='drop', retbins=False)
+short_full['Volatility_Quintile'] = pd.qcut(short_full['Volatility_Ann'], q=5, labels=False, duplicates='drop', retbins=False)
+
+# LONG and SHORT side by side: each category table below is one groupby over (Strategy, category)
+all_full = pd.concat([long_full, short_full], ignore_index=True)
+all_trades = pd.concat([long_trades[['Symbol', 'NetProfit']].assign(Strategy='LONG'),
+                        short_trades[['Symbol', 'NetProfit']].assign(Strategy='SHORT')], ignore_index=True)
+
 # ============================================================================
 # B.4: PERFORMANCE BY MARKET CAP CATEGORY
 # ============================================================================
 print("\n[5/10] Analyzing performance by market cap category...")
 
-def analyze_by_category(df, category_col, strategy_name):
-    """Analyze performance by category"""
-    grouped = df.groupby(category_col).agg({
-        'Symbol': 'count',
-        'Total_PnL': 'sum',
-        'Avg_PnL': 'mean',
-        'Trade_Count': 'sum',
-        'Liquidity_Score': 'mean',
-        'Market_Impact_Est': 'mean',
-        'Volatility_Ann': 'mean'
-    }).reset_index()
-    
-    grouped.columns = [category_col, 'Num_Symbols', 'Total_PnL', 'Avg_PnL_Per_Trade', 
-                       'Total_Trades', 'Avg_Liquidity_Score', 'Avg_Market_Impact', 'Avg_Volatility']
-    
-    # Calculate win rate (need to go back to trades)
-    win_rates = []
-    for cat in grouped[category_col]:
-        symbols_in_cat = df[df[category_col] == cat]['Symbol'].tolist()
-        if strategy_name == 'LONG':
-            cat_trades = long_trades[long_trades['Symbol'].isin(symbols_in_cat)]
-        else:
-            cat_trades = short_trades[short_trades['Symbol'].isin(symbols_in_cat)]
-        
-        wins = (cat_trades['NetProfit'] > 0).sum()
-        total = len(cat_trades)
-        win_rate = (wins / total * 100) if total > 0 else 0
-        win_rates.append(win_rate)
-    
-    grouped['Win_Rate'] = win_rates
-    grouped['Strategy'] = strategy_name
-    
-    return grouped
-
-long_by_mcap = analyze_by_category(long_full, 'Market_Cap_Tier', 'LONG')
-short_by_mcap = analyze_by_category(short_full, 'Market_Cap_Tier', 'SHORT')
+by_mcap = analyze_by_category(all_full, all_trades, 'Market_Cap_Tier')
+long_by_mcap = split_by_strategy(by_mcap, 'LONG')
+short_by_mcap = split_by_strategy(by_mcap, 'SHORT')
 
 long_by_mcap.to_csv('/home/ubuntu/stage4_optimization/part3_b3_long_performance_by_mcap.csv', index=False)
 short_by_mcap.to_csv('/home/ubuntu/stage4_optimization/part3_b3_short_performance_by_mcap.csv', index=False)
@@ -252,8 +136,9 @@ print(f"  SHORT best category: {short_by_mcap.loc[short_by_mcap['Total_PnL'].idx
 # ============================================================================
 print("\n[6/10] Analyzing performance by liquidity tier...")
 
-long_by_liq = analyze_by_category(long_full, 'Liquidity_Tier', 'LONG')
-short_by_liq = analyze_by_category(short_full, 'Liquidity_Tier', 'SHORT')
+by_liq = analyze_by_category(all_full, all_trades, 'Liquidity_Tier')
+long_by_liq = split_by_strategy(by_liq, 'LONG')
+short_by_liq = split_by_strategy(by_liq, 'SHORT')
 
 long_by_liq.to_csv('/home/ubuntu/stage4_optimization/part3_b4_long_performance_by_liquidity.csv', index=False)
 short_by_liq.to_csv('/home/ubuntu/stage4_optimization/part3_b4_short_performance_by_liquidity.csv', index=False)
@@ -265,12 +150,9 @@ print(f"✓ Performance by liquidity tier analyzed")
 # ============================================================================
 print("\n[7/10] Analyzing performance by volatility quintile...")
 
-# Create volatility quintiles
-long_full['Volatility_Quintile'] = pd.qcut(long_full['Volatility_Ann'], q=5, labels=False, duplicates='drop', retbins=False)
-short_full['Volatility_Quintile'] = pd.qcut(short_full['Volatility_Ann'], q=5, labels=False, duplicates='drop', retbins=False)
-
-long_by_vol = analyze_by_category(long_full, 'Volatility_Quintile', 'LONG')
-short_by_vol = analyze_by_category(short_full, 'Volatility_Quintile', 'SHORT')
+by_vol = analyze_by_category(all_full, all_trades, 'Volatility_Quintile')
+long_by_vol = split_by_strategy(by_vol, 'LONG')
+short_by_vol = split_by_strategy(by_vol, 'SHORT')
 
 long_by_vol.to_csv('/home/ubuntu/stage4_optimization/part3_b5_long_performance_by_volatility.csv', index=False)
 short_by_vol.to_csv('/home/ubuntu/stage4_optimization/part3_b5_short_performance_by_volatility.csv', index=False)
@@ -325,9 +207,17 @@ print("\n[9/10] Calculating capital deployment capacity...")
 long_full['Max_Deployable'] = long_full['Estimated_Daily_Volume'] * 0.05
 short_full['Max_Deployable'] = short_full['Estimated_Daily_Volume'] * 0.05
 
+# Impact-aware size per stock: the position value that maximizes expected net
+# P&L given the realized edge and square-root impact, within the 5% ADV limit
+capacity_cols = ['Optimal_Position_Value', 'Optimal_Impact_bps', 'Optimal_Net_PnL', 'Capacity_Binding']
+long_full[capacity_cols] = impact_aware_capacity(long_full, direction=1)
+short_full[capacity_cols] = impact_aware_capacity(short_full, direction=-1)
+
 # Total capacity
 long_total_capacity = long_full['Max_Deployable'].sum()
 short_total_capacity = short_full['Max_Deployable'].sum()
+long_impact_capacity = long_full['Optimal_Position_Value'].sum()
+short_impact_capacity = short_full['Optimal_Position_Value'].sum()
 
 # By market cap tier
 long_capacity_by_mcap = long_full.groupby('Market_Cap_Tier')['Max_Deployable'].sum().reset_index()
@@ -357,13 +247,17 @@ capacity_summary = pd.DataFrame([{
     'Total_Capacity': long_total_capacity,
     'Current_Capital': current_capital,
     'Utilization_Pct': long_utilization,
-    'Recommended_Max': long_total_capacity
+    'Recommended_Max': long_total_capacity,
+    'Impact_Aware_Capacity': long_impact_capacity,
+    'Impact_Aware_Net_PnL': long_full['Optimal_Net_PnL'].sum()
 }, {
     'Strategy': 'SHORT',
     'Total_Capacity': short_total_capacity,
     'Current_Capital': current_capital,
     'Utilization_Pct': short_utilization,
-    'Recommended_Max': short_total_capacity
+    'Recommended_Max': short_total_capacity,
+    'Impact_Aware_Capacity': short_impact_capacity,
+    'Impact_Aware_Net_PnL': short_full['Optimal_Net_PnL'].sum()
 }])
 
 capacity_summary.to_csv('/home/ubuntu/stage4_optimization/part3_b7_capacity_summary.csv', index=False)
@@ -375,6 +269,7 @@ short_capacity_by_liq.to_csv('/home/ubuntu/stage4_optimization/part3_b7_short_ca
 print(f"✓ Capital deployment capacity calculated")
 print(f"  LONG capacity: ${long_total_capacity:,.0f} (current utilization: {long_utilization:.1f}%)")
 print(f"  SHORT capacity: ${short_total_capacity:,.0f} (current utilization: {short_utilization:.1f}%)")
+print(f"  Impact-aware capacity: LONG ${long_impact_capacity:,.0f}, SHORT ${short_impact_capacity:,.0f}")
 
 # ============================================================================
 # B.9 & B.10: EXCLUSION AND SIZING RECOMMENDATIONS
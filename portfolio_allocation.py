@@ -0,0 +1,255 @@
+#!/usr/bin/env python3.11
+"""
+Portfolio Allocation Module
+Optimal weights across any number of strategies from a (days × strategies)
+daily return matrix
+
+Allocations (long-only, fully invested, solved with SLSQP):
+- max_sharpe:  Highest annualized mean / volatility
+- min_variance: Lowest portfolio variance
+- risk_parity: Equal risk contribution (Spinu's convex formulation)
+- max_calmar:  Highest CAGR / |max drawdown| of the daily-rebalanced path
+
+The covariance matrix is Ledoit-Wolf shrunk towards a scaled identity and
+factorized once (Cholesky); volatilities, starting points and gradients
+reuse that factorization. Portfolio statistics and risk contributions are
+evaluated for a whole (portfolios × strategies) weight matrix at once.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import minimize
+
+PERIODS_PER_YEAR = 252
+ALLOCATION_METHODS = ('max_sharpe', 'min_variance', 'risk_parity', 'max_calmar')
+N_CALMAR_CANDIDATES = 2000
+
+
+def ledoit_wolf_shrinkage(returns):
+    """
+    Ledoit-Wolf (2004) shrinkage of the sample covariance towards mu * I.
+
+    Parameters:
+    -----------
+    returns : np.ndarray
+        (days × strategies) returns without NaNs
+
+    Returns:
+    --------
+    tuple
+        (shrunk covariance, shrinkage intensity in [0, 1])
+    """
+    x = returns - returns.mean(axis=0)
+    n_obs, n_assets = x.shape
+    sample = x.T @ x / n_obs
+    mu = np.trace(sample) / n_assets
+    target = mu * np.eye(n_assets)
+
+    delta = ((sample - target) ** 2).sum() / n_assets
+    x2 = x * x
+    beta = ((x2.T @ x2) / n_obs - sample ** 2).sum() / (n_assets * n_obs)
+    shrinkage = min(beta, delta) / delta if delta > 0 else 1.0
+    return shrinkage * target + (1 - shrinkage) * sample, shrinkage
+
+
+class PortfolioAllocator:
+    """
+    Allocation problem for a fixed daily return matrix.
+
+    Parameters:
+    -----------
+    returns : pd.DataFrame or np.ndarray
+        (days × strategies) daily returns; rows with any NaN are dropped
+    names : list, optional
+        Strategy names (default: DataFrame columns)
+    shrink : bool
+        Ledoit-Wolf shrink the covariance (otherwise sample covariance, ddof=0)
+    periods_per_year : int
+        Annualization factor
+    """
+
+    def __init__(self, returns, names=None, shrink=True, periods_per_year=PERIODS_PER_YEAR):
+        if isinstance(returns, pd.DataFrame):
+            names = list(returns.columns) if names is None else names
+            returns = returns.to_numpy(dtype=np.float64)
+        returns = np.asarray(returns, dtype=np.float64)
+        self.returns = returns[~np.isnan(returns).any(axis=1)]
+        self.n_obs, self.n_assets = self.returns.shape
+        self.names = list(names) if names is not None else [f'S{i + 1}' for i in range(self.n_assets)]
+        self.periods_per_year = periods_per_year
+
+        self.mean = self.returns.mean(axis=0) * periods_per_year
+        if shrink:
+            cov, self.shrinkage = ledoit_wolf_shrinkage(self.returns)
+        else:
+            x = self.returns - self.returns.mean(axis=0)
+            cov, self.shrinkage = x.T @ x / self.n_obs, 0.0
+        self.cov = cov * periods_per_year
+        self._chol = cho_factor(self.cov, lower=True)
+
+    # ------------------------------------------------------------------
+    # Vectorized portfolio statistics (W is portfolios × strategies)
+    # ------------------------------------------------------------------
+    def _as_matrix(self, weights):
+        return np.atleast_2d(np.asarray(weights, dtype=np.float64))
+
+    def volatility(self, weights):
+        """Annualized volatility of each portfolio, ||L^T w|| with the cached factor."""
+        W = self._as_matrix(weights)
+        L = np.tril(self._chol[0])
+        return np.linalg.norm(W @ L, axis=1)
+
+    def expected_return(self, weights):
+        return self._as_matrix(weights) @ self.mean
+
+    def path_statistics(self, weights):
+        """CAGR and max drawdown of the daily-rebalanced path of each portfolio."""
+        portfolio = self.returns @ self._as_matrix(weights).T  # days × portfolios
+        log_wealth = np.cumsum(np.log1p(portfolio), axis=0)
+        peak = np.maximum(np.maximum.accumulate(log_wealth, axis=0), 0.0)
+        max_drawdown = np.expm1((log_wealth - peak).min(axis=0))
+        cagr = np.expm1(log_wealth[-1] * self.periods_per_year / self.n_obs)
+        return cagr, max_drawdown
+
+    def risk_contributions(self, weights):
+        """
+        Percentage contribution of each strategy to each portfolio's variance.
+
+        RC_i = w_i (Σw)_i / (w'Σw); rows sum to 100.
+        """
+        W = self._as_matrix(weights)
+        marginal = W @ self.cov
+        variance = (marginal * W).sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(variance > 0, W * marginal / variance * 100, 0.0)
+
+    def evaluate(self, weights, labels=None):
+        """
+        Statistics for every row of a weight matrix.
+
+        Returns:
+        --------
+        pd.DataFrame
+            One row per portfolio: weights (%), Expected Return (%), CAGR (%),
+            Volatility (%), Sharpe Ratio, Max Drawdown (%), Calmar Ratio
+        """
+        W = self._as_matrix(weights)
+        ret = self.expected_return(W)
+        vol = self.volatility(W)
+        cagr, max_dd = self.path_statistics(W)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(vol > 0, ret / vol, 0.0)
+            calmar = np.where(max_dd != 0, cagr / np.abs(max_dd), 0.0)
+
+        table = pd.DataFrame(W * 100, columns=[f'{name} Weight (%)' for name in self.names])
+        table['Expected Return (%)'] = ret * 100
+        table['CAGR (%)'] = cagr * 100
+        table['Volatility (%)'] = vol * 100
+        table['Sharpe Ratio'] = sharpe
+        table['Max Drawdown (%)'] = max_dd * 100
+        table['Calmar Ratio'] = calmar
+        if labels is not None:
+            table.index = pd.Index(labels, name='Portfolio')
+        return table
+
+    def risk_contribution_table(self, weights, labels=None):
+        """
+        Volatility and risk contribution per strategy, one row per portfolio.
+
+        Columns: '<name> Volatility (%)' (standalone), 'Portfolio Volatility (%)',
+        '<name> Risk Contribution (%)' and 'Diversification Benefit (%)'
+        (weighted standalone volatility minus portfolio volatility).
+        """
+        W = self._as_matrix(weights)
+        standalone = np.sqrt(np.diag(self.cov))
+        vol = self.volatility(W)
+        contributions = self.risk_contributions(W)
+
+        table = pd.DataFrame(np.broadcast_to(standalone * 100, W.shape),
+                             columns=[f'{name} Volatility (%)' for name in self.names])
+        table['Portfolio Volatility (%)'] = vol * 100
+        for i, name in enumerate(self.names):
+            table[f'{name} Risk Contribution (%)'] = contributions[:, i]
+        table['Diversification Benefit (%)'] = (W @ standalone - vol) * 100
+        if labels is not None:
+            table.index = pd.Index(labels, name='Portfolio')
+        return table
+
+    # ------------------------------------------------------------------
+    # Optimizers
+    # ------------------------------------------------------------------
+    def _solve(self, objective, x0, jac=None, bounds=None, constraints=None):
+        n = self.n_assets
+        bounds = [(0.0, 1.0)] * n if bounds is None else bounds
+        if constraints is None:
+            constraints = [{'type': 'eq', 'fun': lambda w: w.sum() - 1.0, 'jac': lambda w: np.ones(n)}]
+        result = minimize(objective, x0, jac=jac, method='SLSQP', bounds=bounds,
+                          constraints=constraints, options={'ftol': 1e-12, 'maxiter': 500})
+        w = np.clip(result.x, 0.0, None)
+        return w / w.sum()
+
+    def _feasible_start(self, direction):
+        """Clip a closed-form direction (e.g. Σ^-1 μ) to the long-only simplex."""
+        w = np.clip(direction, 0.0, None)
+        return w / w.sum() if w.sum() > 0 else np.full(self.n_assets, 1.0 / self.n_assets)
+
+    def min_variance(self):
+        x0 = self._feasible_start(cho_solve(self._chol, np.ones(self.n_assets)))
+        return self._solve(lambda w: w @ self.cov @ w, x0, jac=lambda w: 2 * self.cov @ w)
+
+    def max_sharpe(self):
+        x0 = self._feasible_start(cho_solve(self._chol, self.mean))
+
+        def negative_sharpe(w):
+            vol = np.sqrt(w @ self.cov @ w)
+            return -(w @ self.mean) / vol
+
+        def gradient(w):
+            cov_w = self.cov @ w
+            vol = np.sqrt(w @ cov_w)
+            ret = w @ self.mean
+            return -(self.mean / vol - ret * cov_w / vol ** 3)
+
+        return self._solve(negative_sharpe, x0, jac=gradient)
+
+    def risk_parity(self, budget=None):
+        """Risk budgeting: minimize ½y'Σy - Σ b_i log y_i over y > 0, then w = y / Σy."""
+        b = np.full(self.n_assets, 1.0 / self.n_assets) if budget is None else np.asarray(budget, dtype=np.float64)
+        x0 = 1.0 / np.sqrt(np.diag(self.cov))
+        return self._solve(lambda y: 0.5 * y @ self.cov @ y - b @ np.log(y), x0,
+                           jac=lambda y: self.cov @ y - b / y,
+                           bounds=[(1e-12, None)] * self.n_assets, constraints=[])
+
+    def max_calmar(self, n_candidates=N_CALMAR_CANDIDATES, seed=42):
+        """
+        Highest CAGR / |max drawdown|.
+
+        The objective is path dependent and non-smooth, so the best of a
+        vectorized batch of random simplex candidates seeds the SLSQP polish.
+        """
+        rng = np.random.default_rng(seed)
+        candidates = np.vstack([np.eye(self.n_assets),
+                                np.full(self.n_assets, 1.0 / self.n_assets),
+                                rng.dirichlet(np.ones(self.n_assets), size=n_candidates)])
+        cagr, max_dd = self.path_statistics(candidates)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            calmar = np.where(max_dd < 0, cagr / np.abs(max_dd), -np.inf)
+        x0 = candidates[np.argmax(calmar)]
+
+        def negative_calmar(w):
+            cagr, max_dd = self.path_statistics(w)
+            return -cagr[0] / max(abs(max_dd[0]), 1e-12)
+
+        polished = self._solve(negative_calmar, x0)
+        return polished if negative_calmar(polished) <= negative_calmar(x0) else x0
+
+    def solve(self, method):
+        if method not in ALLOCATION_METHODS:
+            raise ValueError(f"Unknown allocation method '{method}', expected one of {ALLOCATION_METHODS}")
+        return getattr(self, method)()
+
+    def optimize_all(self, methods=ALLOCATION_METHODS):
+        """Weights (methods × strategies) and statistics of every allocation method."""
+        weights = np.vstack([self.solve(method) for method in methods])
+        return weights, self.evaluate(weights, labels=list(methods))
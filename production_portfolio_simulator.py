@@ -3,6 +3,8 @@
 Production Portfolio Simulator - LONG Strategy
 Simulates real-world portfolio constraints with max concurrent positions
 Uses baseline trade log and applies portfolio-level constraints
+Entry and exit transaction costs (TradingCostEstimate) are charged on every
+admitted trade, so equity, trade P&L and the summary are net of costs
 """
 
 import pandas as pd
@@ -10,6 +12,10 @@ import numpy as np
 from pathlib import Path
 import gc
 
+from online_metrics import LiveMetrics
+from TradingCostEstimate.src.backtest_integration import PortfolioCostModel
+from cost_calibration import COST_PARAMETERS_FILE, load_symbol_repository
+
 print("="*80)
 print("PRODUCTION PORTFOLIO SIMULATOR - LONG STRATEGY")
 print("="*80)
@@ -18,6 +24,8 @@ print("="*80)
 STARTING_CAPITAL = 1_000_000
 MAX_POSITIONS = 10
 POSITION_SIZE_PCT = 0.10  # 10% of current equity per position
+APPLY_COSTS = True
+MAX_IMPACT_BPS = None  # e.g. 10.0: cap each position so its entry impact stays below this (bps)
 
 # Load baseline trade log
 print("\n[1/5] Loading baseline trade log...")
@@ -31,17 +39,30 @@ print(f"  Date range: {baseline_trades['EntryTime'].min()} to {baseline_trades['
 # Sort by entry time (first-come-first-served), then by ATR (tiebreaker)
 baseline_trades = baseline_trades.sort_values(['EntryTime', 'EntryATR'], ascending=[True, False]).reset_index(drop=True)
 
+# Transaction costs: per-candidate prices, months and symbol parameters are
+# prepared in one batch; only the share count is resolved when a trade is taken.
+# Impact-aware share caps do not depend on equity and are solved up front too.
+symbol_repo, n_calibrated = load_symbol_repository(COST_PARAMETERS_FILE)
+cost_model = PortfolioCostModel(
+    baseline_trades['Symbol'], baseline_trades['EntryPrice'], baseline_trades['ExitPrice'], direction=1,
+    entry_times=baseline_trades['EntryTime'], exit_times=baseline_trades['ExitTime'], symbol_repo=symbol_repo
+)
+share_cap = cost_model.position_share_cap(MAX_IMPACT_BPS) if MAX_IMPACT_BPS is not None else None
+
 print("\n[2/5] Running portfolio simulation...")
 print(f"  Max positions: {MAX_POSITIONS}")
 print(f"  Position size: {POSITION_SIZE_PCT*100:.0f}% of current equity")
 print(f"  Starting capital: ${STARTING_CAPITAL:,.0f}")
+print(f"  Transaction costs: {'on' if APPLY_COSTS else 'off'} ({n_calibrated:,} calibrated symbols)")
+print(f"  Impact cap: {f'{MAX_IMPACT_BPS:g} bps' if MAX_IMPACT_BPS is not None else 'off'}")
 
 # Portfolio state
 current_equity = STARTING_CAPITAL
-active_positions = {}  # {symbol: {entry_time, exit_time, entry_price, exit_price, shares, entry_value}}
+active_positions = {}  # {symbol: {signal, entry_time, exit_time, entry_price, exit_price, shares, entry_value, entry_cost}}
 portfolio_trades = []
 equity_curve = []
 skipped_signals = []
+live = LiveMetrics()  # Daily Sharpe / drawdown / rolling metrics while the simulation runs
 
 # Track equity at each timestamp
 last_timestamp = None
@@ -65,6 +86,7 @@ for idx, trade in baseline_trades.iterrows():
             'Cash': current_equity,
             'NumPositions': len(active_positions)
         })
+        live.update_equity(entry_time, total_equity)
         
         last_timestamp = entry_time
     
@@ -78,13 +100,16 @@ for idx, trade in baseline_trades.iterrows():
     for sym in symbols_to_exit:
         pos = active_positions[sym]
         
-        # Calculate P&L
+        # Calculate P&L (net of entry and exit costs)
         exit_value = pos['exit_price'] * pos['shares']
-        net_profit = exit_value - pos['entry_value']
+        exit_cost = cost_model.exit_cost(pos['signal'], pos['shares']) if APPLY_COSTS else 0.0
+        gross_profit = exit_value - pos['entry_value']
+        net_profit = gross_profit - pos['entry_cost'] - exit_cost
         pct_profit = (net_profit / pos['entry_value']) * 100
         
         # Return capital to equity
-        current_equity += exit_value
+        current_equity += exit_value - exit_cost
+        live.record_trade(net_profit)
         
         # Log trade
         portfolio_trades.append({
@@ -96,6 +121,10 @@ for idx, trade in baseline_trades.iterrows():
             'Shares': pos['shares'],
             'EntryValue': pos['entry_value'],
             'ExitValue': exit_value,
+            'GrossProfit': gross_profit,
+            'EntryCost': pos['entry_cost'],
+            'ExitCost': exit_cost,
+            'TransactionCost': pos['entry_cost'] + exit_cost,
             'NetProfit': net_profit,
             'PctProfit': pct_profit,
             'Direction': 'LONG'
@@ -127,29 +156,34 @@ for idx, trade in baseline_trades.iterrows():
         # Calculate position size (10% of current equity)
         position_value = current_equity * POSITION_SIZE_PCT
         shares = int(position_value / entry_price)
+        capped_shares = int(min(shares, share_cap[idx])) if share_cap is not None else shares  # market impact cap
         
-        if shares == 0:
-            skip_reason = 'InsufficientCapital'
+        if capped_shares == 0:
+            skip_reason = 'InsufficientCapital' if shares == 0 else 'ImpactCap'
             skipped_signals.append({
                 'Symbol': symbol,
                 'EntryTime': entry_time,
                 'Reason': skip_reason
             })
         else:
+            shares = capped_shares
             actual_position_value = shares * entry_price
+            entry_cost = cost_model.entry_cost(idx, shares) if APPLY_COSTS else 0.0
             
             # Enter position
             active_positions[symbol] = {
+                'signal': idx,
                 'entry_time': entry_time,
                 'exit_time': exit_time,
                 'entry_price': entry_price,
                 'exit_price': exit_price,
                 'shares': shares,
-                'entry_value': actual_position_value
+                'entry_value': actual_position_value,
+                'entry_cost': entry_cost
             }
             
-            # Deduct from equity
-            current_equity -= actual_position_value
+            # Deduct position and entry cost from equity
+            current_equity -= actual_position_value + entry_cost
     else:
         skipped_signals.append({
             'Symbol': symbol,
@@ -160,14 +194,18 @@ for idx, trade in baseline_trades.iterrows():
     # Progress update
     if idx % 5000 == 0:
         print(f"  Processed {idx:,}/{len(baseline_trades):,} signals... ({len(portfolio_trades)} trades taken)")
+        print(f"    Live: {live.summary_line()}")
 
 # Close any remaining positions at final timestamp
 for sym, pos in active_positions.items():
     exit_value = pos['exit_price'] * pos['shares']
-    net_profit = exit_value - pos['entry_value']
+    exit_cost = cost_model.exit_cost(pos['signal'], pos['shares']) if APPLY_COSTS else 0.0
+    gross_profit = exit_value - pos['entry_value']
+    net_profit = gross_profit - pos['entry_cost'] - exit_cost
     pct_profit = (net_profit / pos['entry_value']) * 100
     
-    current_equity += exit_value
+    current_equity += exit_value - exit_cost
+    live.record_trade(net_profit)
     
     portfolio_trades.append({
         'Symbol': sym,
@@ -178,6 +216,10 @@ for sym, pos in active_positions.items():
         'Shares': pos['shares'],
         'EntryValue': pos['entry_value'],
         'ExitValue': exit_value,
+        'GrossProfit': gross_profit,
+        'EntryCost': pos['entry_cost'],
+        'ExitCost': exit_cost,
+        'TransactionCost': pos['entry_cost'] + exit_cost,
         'NetProfit': net_profit,
         'PctProfit': pct_profit,
         'Direction': 'LONG'
@@ -205,6 +247,8 @@ if len(trades_df) > 0:
     gross_profit = winning_trades['NetProfit'].sum() if len(winning_trades) > 0 else 0
     gross_loss = abs(losing_trades['NetProfit'].sum()) if len(losing_trades) > 0 else 0
     profit_factor = gross_profit / gross_loss if gross_loss > 0 else np.inf
+    total_costs = trades_df['TransactionCost'].sum()
+    pre_cost_profit = trades_df['GrossProfit'].sum()
     
     print(f"\n{'='*80}")
     print("PERFORMANCE SUMMARY")
@@ -212,6 +256,8 @@ if len(trades_df) > 0:
     print(f"Starting Capital:    ${STARTING_CAPITAL:>15,.2f}")
     print(f"Final Equity:        ${final_equity:>15,.2f}")
     print(f"Net Profit:          ${total_net_profit:>15,.2f}")
+    print(f"  Before Costs:      ${pre_cost_profit:>15,.2f}")
+    print(f"  Transaction Costs: ${total_costs:>15,.2f} ({total_costs / trades_df['EntryValue'].sum() * 10000 / 2:.2f} bps per fill)")
     print(f"Total Return:        {((final_equity - STARTING_CAPITAL) / STARTING_CAPITAL * 100):>15.2f}%")
     print(f"\nTotal Trades:        {len(trades_df):>15,}")
     print(f"Winning Trades:      {len(winning_trades):>15,} ({len(winning_trades)/len(trades_df)*100:.1f}%)")
@@ -227,6 +273,7 @@ if len(trades_df) > 0:
     print(f"  Max Positions:     {skipped_df[skipped_df['Reason']=='MaxPositions'].shape[0]:>15,}")
     print(f"  Duplicate Symbol:  {skipped_df[skipped_df['Reason']=='DuplicateSymbol'].shape[0]:>15,}")
     print(f"  Insufficient Cap:  {skipped_df[skipped_df['Reason']=='InsufficientCapital'].shape[0]:>15,}")
+    print(f"  Impact Cap:        {skipped_df[skipped_df['Reason']=='ImpactCap'].shape[0]:>15,}")
     print(f"{'='*80}")
 
 # Save outputs
@@ -254,6 +301,8 @@ if len(trades_df) > 0:
         'StartingCapital': STARTING_CAPITAL,
         'FinalEquity': final_equity,
         'NetProfit': total_net_profit,
+        'ProfitBeforeCosts': pre_cost_profit,
+        'TransactionCosts': total_costs,
         'TotalReturn': ((final_equity - STARTING_CAPITAL) / STARTING_CAPITAL * 100),
         'TotalTrades': len(trades_df),
         'WinningTrades': len(winning_trades),
@@ -2,12 +2,18 @@
 """
 Production Portfolio Simulator - SHORT Strategy
 FIFO realistic backtesting with portfolio constraints
+Entry and exit transaction costs (TradingCostEstimate) are charged on every
+admitted trade, so equity, trade P&L and the summary are net of costs
 """
 
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from online_metrics import LiveMetrics
+from TradingCostEstimate.src.backtest_integration import PortfolioCostModel
+from cost_calibration import COST_PARAMETERS_FILE, load_symbol_repository
+
 print("="*80)
 print("PRODUCTION PORTFOLIO SIMULATOR - SHORT STRATEGY")
 print("="*80)
@@ -16,6 +22,8 @@ print("="*80)
 STARTING_CAPITAL = 1_000_000
 MAX_POSITIONS = 10
 POSITION_SIZE_PCT = 0.10  # 10% of current equity per position
+APPLY_COSTS = True
+MAX_IMPACT_BPS = None  # e.g. 10.0: cap each position so its entry impact stays below this (bps)
 
 # Load baseline trades
 print("\n[1/5] Loading baseline SHORT trades...")
@@ -24,17 +32,30 @@ baseline = baseline.sort_values(['EntryTime', 'ATR'], ascending=[True, False]).r
 print(f"✓ Loaded {len(baseline):,} baseline trades")
 print(f"  Date range: {baseline['EntryTime'].min()} to {baseline['ExitTime'].max()}")
 
+# Transaction costs: per-candidate prices, months and symbol parameters are
+# prepared in one batch; only the share count is resolved when a trade is taken.
+# Impact-aware share caps do not depend on equity and are solved up front too.
+symbol_repo, n_calibrated = load_symbol_repository(COST_PARAMETERS_FILE)
+cost_model = PortfolioCostModel(
+    baseline['Symbol'], baseline['EntryPrice'], baseline['ExitPrice'], direction=-1,
+    entry_times=baseline['EntryTime'], exit_times=baseline['ExitTime'], symbol_repo=symbol_repo
+)
+share_cap = cost_model.position_share_cap(MAX_IMPACT_BPS) if MAX_IMPACT_BPS is not None else None
+
 # Initialize portfolio state
 print("\n[2/5] Initializing portfolio...")
 current_equity = STARTING_CAPITAL
 open_positions = {}  # symbol -> position dict
 equity_curve = []
 production_trades = []
-skipped_signals = {'MaxPositions': 0, 'DuplicateSymbol': 0, 'InsufficientCapital': 0}
+skipped_signals = {'MaxPositions': 0, 'DuplicateSymbol': 0, 'InsufficientCapital': 0, 'ImpactCap': 0}
+live = LiveMetrics()  # Daily Sharpe / drawdown / rolling metrics while the simulation runs
 
 print(f"✓ Starting capital: ${STARTING_CAPITAL:,.2f}")
 print(f"✓ Max positions: {MAX_POSITIONS}")
 print(f"✓ Position sizing: {POSITION_SIZE_PCT*100:.0f}% of equity")
+print(f"✓ Transaction costs: {'on' if APPLY_COSTS else 'off'} ({n_calibrated:,} calibrated symbols)")
+print(f"✓ Impact cap: {f'{MAX_IMPACT_BPS:g} bps' if MAX_IMPACT_BPS is not None else 'off'}")
 
 # Process baseline trades
 print("\n[3/5] Processing trades with FIFO constraints...")
@@ -48,6 +69,7 @@ for idx, signal in baseline.iterrows():
     pct = int(processed / total_signals * 100)
     if pct >= last_pct + 10:
         print(f"  Progress: {pct}% ({processed:,}/{total_signals:,} signals)")
+        print(f"    Live: {live.summary_line()}")
         last_pct = pct
     
     symbol = signal['Symbol']
@@ -73,21 +95,31 @@ for idx, signal in baseline.iterrows():
     else:
         position_size_dollars = current_equity * POSITION_SIZE_PCT
         shares = int(position_size_dollars / signal['EntryPrice'])
-        cost = shares * signal['EntryPrice']
+        capped_shares = int(min(shares, share_cap[idx])) if share_cap is not None else shares  # market impact cap
+        cost = capped_shares * signal['EntryPrice']
         
-        if cost > current_equity:
+        if shares == 0 or cost > current_equity:
             can_enter = False
             skip_reason = 'InsufficientCapital'
             skipped_signals['InsufficientCapital'] += 1
+        elif capped_shares == 0:
+            can_enter = False
+            skip_reason = 'ImpactCap'
+            skipped_signals['ImpactCap'] += 1
     
     if can_enter:
         # Enter position
         position_size_dollars = current_equity * POSITION_SIZE_PCT
         shares = int(position_size_dollars / signal['EntryPrice'])
+        if share_cap is not None:
+            shares = int(min(shares, share_cap[idx]))  # market impact cap
         cost = shares * signal['EntryPrice']
+        entry_cost = cost_model.entry_cost(idx, shares) if APPLY_COSTS else 0.0
+        current_equity -= entry_cost
         
         # Store position
         open_positions[symbol] = {
+            'Signal': idx,
             'EntryTime': entry_time,
             'EntryPrice': signal['EntryPrice'],
             'Shares': shares,
@@ -97,7 +129,8 @@ for idx, signal in baseline.iterrows():
             'MaxBars': signal['MaxBars'],
             'ExitTime': signal['ExitTime'],
             'ExitPrice': signal['ExitPrice'],
-            'NetProfit': signal['NetProfit'] * (shares / signal['Shares']) if signal['Shares'] > 0 else signal['NetProfit'],
+            'GrossProfit': signal['NetProfit'] * (shares / signal['Shares']) if signal['Shares'] > 0 else signal['NetProfit'],
+            'EntryCost': entry_cost,
             'BarsInTrade': signal['BarsInTrade']
         }
         
@@ -118,8 +151,10 @@ for idx, signal in baseline.iterrows():
     # Process exits
     for sym in symbols_to_exit:
         pos = open_positions[sym]
-        pnl = pos['NetProfit']
-        current_equity += pnl
+        exit_cost = cost_model.exit_cost(pos['Signal'], pos['Shares']) if APPLY_COSTS else 0.0
+        pnl = pos['GrossProfit'] - pos['EntryCost'] - exit_cost
+        current_equity += pnl + pos['EntryCost']  # entry cost was charged at entry
+        live.record_trade(pnl)
         
         # Record trade
         production_trades.append({
@@ -130,6 +165,10 @@ for idx, signal in baseline.iterrows():
             'ExitPrice': pos['ExitPrice'],
             'Shares': pos['Shares'],
             'Cost': pos['Cost'],
+            'GrossProfit': pos['GrossProfit'],
+            'EntryCost': pos['EntryCost'],
+            'ExitCost': exit_cost,
+            'TransactionCost': pos['EntryCost'] + exit_cost,
             'NetProfit': pnl,
             'BarsInTrade': pos['BarsInTrade'],
             'InitialStop': pos['InitialStop'],
@@ -146,13 +185,17 @@ for idx, signal in baseline.iterrows():
         
         # Remove position
         del open_positions[sym]
+    
+    live.update_equity(entry_time, current_equity)
 
 # Close any remaining open positions at final timestamp
 print("\n[4/5] Closing remaining positions...")
 final_time = baseline['ExitTime'].max()
 for sym, pos in list(open_positions.items()):
-    pnl = pos['NetProfit']
-    current_equity += pnl
+    exit_cost = cost_model.exit_cost(pos['Signal'], pos['Shares']) if APPLY_COSTS else 0.0
+    pnl = pos['GrossProfit'] - pos['EntryCost'] - exit_cost
+    current_equity += pnl + pos['EntryCost']  # entry cost was charged at entry
+    live.record_trade(pnl)
     
     production_trades.append({
         'Symbol': sym,
@@ -162,6 +205,10 @@ for sym, pos in list(open_positions.items()):
         'ExitPrice': pos['ExitPrice'],
         'Shares': pos['Shares'],
         'Cost': pos['Cost'],
+        'GrossProfit': pos['GrossProfit'],
+        'EntryCost': pos['EntryCost'],
+        'ExitCost': exit_cost,
+        'TransactionCost': pos['EntryCost'] + exit_cost,
         'NetProfit': pnl,
         'BarsInTrade': pos['BarsInTrade'],
         'InitialStop': pos['InitialStop'],
@@ -191,6 +238,8 @@ win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
 gross_profit = trades_df[trades_df['NetProfit'] > 0]['NetProfit'].sum()
 gross_loss = abs(trades_df[trades_df['NetProfit'] < 0]['NetProfit'].sum())
 net_profit = trades_df['NetProfit'].sum()
+pre_cost_profit = trades_df['GrossProfit'].sum()
+total_costs = trades_df['TransactionCost'].sum()
 profit_factor = (gross_profit / gross_loss) if gross_loss > 0 else np.inf
 
 avg_win = trades_df[trades_df['NetProfit'] > 0]['NetProfit'].mean() if winning_trades > 0 else 0
@@ -214,6 +263,8 @@ summary = {
     'StartingCapital': STARTING_CAPITAL,
     'FinalEquity': final_equity,
     'NetProfit': net_profit,
+    'ProfitBeforeCosts': pre_cost_profit,
+    'TransactionCosts': total_costs,
     'TotalReturn': total_return,
     'MaxPositions': MAX_POSITIONS,
     'PositionSizePct': POSITION_SIZE_PCT * 100,
@@ -233,7 +284,8 @@ summary = {
     'BaselineSignals': total_signals,
     'SignalsSkipped_MaxPositions': skipped_signals['MaxPositions'],
     'SignalsSkipped_Duplicate': skipped_signals['DuplicateSymbol'],
-    'SignalsSkipped_Capital': skipped_signals['InsufficientCapital']
+    'SignalsSkipped_Capital': skipped_signals['InsufficientCapital'],
+    'SignalsSkipped_ImpactCap': skipped_signals['ImpactCap']
 }
 
 # Save results
@@ -255,6 +307,8 @@ print("="*80)
 print(f"Starting Capital:          ${STARTING_CAPITAL:,.2f}")
 print(f"Final Equity:              ${final_equity:,.2f}")
 print(f"Net Profit:                ${net_profit:,.2f}")
+print(f"  Before Costs:            ${pre_cost_profit:,.2f}")
+print(f"  Transaction Costs:       ${total_costs:,.2f}")
 print(f"Total Return:              {total_return:.2f}%")
 print(f"Max Drawdown:              {max_drawdown:.2f}%")
 print()
@@ -275,6 +329,7 @@ print(f"Signals Taken:             {total_trades:,} ({total_trades/total_signals
 print(f"Skipped (Max Positions):   {skipped_signals['MaxPositions']:,}")
 print(f"Skipped (Duplicate):       {skipped_signals['DuplicateSymbol']:,}")
 print(f"Skipped (Capital):         {skipped_signals['InsufficientCapital']:,}")
+print(f"Skipped (Impact Cap):      {skipped_signals['ImpactCap']:,}")
 print("="*80)
 
 print("\n✓ Production SHORT portfolio simulation complete!")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3.11
+"""
+Rolling Covariance Engine
+Rolling covariance / correlation matrices, diversification ratios and
+correlation-regime breakpoints for many return streams at once
+
+Each window step adds the newest row and subtracts the evicted one from
+pairwise running sums, so a step costs O(N²) for N streams instead of
+re-estimating the window. Missing values are handled pairwise like
+pandas rolling().cov()/corr(): a pair only uses rows where both streams
+are present. As in online_metrics.RollingWindow, the sums are rebuilt
+from the buffer once per `window` updates so floating-point drift cannot
+accumulate.
+"""
+
+import numpy as np
+import pandas as pd
+from collections import deque
+
+ROLLING_WINDOW = 30
+MIN_REGIME_LENGTH = 20
+MAX_BREAKPOINTS = 5
+MIN_REGIME_SHIFT = 0.1  # change in average correlation
+
+
+class RollingCovariance:
+    """
+    Pairwise rolling covariance of N return streams.
+
+    Running sums over the window, for every pair (i, j) with joint mask m:
+        n_ij  = Σ m_i m_j
+        s_ij  = Σ x_i m_i m_j          (sum of x_i over the joint rows)
+        q_ij  = Σ x_i² m_i m_j
+        c_ij  = Σ x_i x_j m_i m_j
+    """
+
+    def __init__(self, n_streams, window=ROLLING_WINDOW, min_periods=None):
+        self.n_streams = n_streams
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.buffer = deque(maxlen=window)
+        self._since_resum = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        shape = (self.n_streams, self.n_streams)
+        self.n = np.zeros(shape)
+        self.s = np.zeros(shape)
+        self.q = np.zeros(shape)
+        self.c = np.zeros(shape)
+
+    def _add(self, x, sign):
+        present = ~np.isnan(x)
+        m = present.astype(np.float64)
+        x0 = np.where(present, x, 0.0)
+        joint = np.outer(m, m)
+        self.n += sign * joint
+        self.s += sign * np.outer(x0, m)
+        self.q += sign * np.outer(x0 * x0, m)
+        self.c += sign * np.outer(x0, x0)
+
+    def update(self, x):
+        """Add one row of returns (NaN = stream absent)."""
+        x = np.asarray(x, dtype=np.float64)
+        if len(self.buffer) == self.window:
+            self._add(self.buffer[0], -1)
+        self.buffer.append(x)
+        self._add(x, 1)
+
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self._reset_sums()
+            for row in self.buffer:
+                self._add(row, 1)
+            self._since_resum = 0
+
+    def _centered(self):
+        """Centered cross and square sums per pair, NaN where a pair has too few rows."""
+        n = np.round(self.n)
+        valid = n >= max(self.min_periods, 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cross = self.c - self.s * self.s.T / n
+            square = self.q - self.s * self.s / n
+        return n, valid, cross, square
+
+    def statistics(self):
+        """(covariance, correlation) over the current window from one centering pass."""
+        n, valid, cross, square = self._centered()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = np.where(valid, cross / (n - 1), np.nan)
+            denom = np.sqrt(np.clip(square, 0, None) * np.clip(square.T, 0, None))
+            corr = np.where(valid & (denom > 0), cross / denom, np.nan)
+        return cov, np.clip(corr, -1.0, 1.0)
+
+    def covariance(self):
+        """Sample covariance (ddof=1) matrix over the current window."""
+        return self.statistics()[0]
+
+    def correlation(self):
+        """Pairwise correlation matrix over the current window."""
+        return self.statistics()[1]
+
+
+def average_correlation(corr):
+    """Mean off-diagonal correlation of one (N × N) or many (T × N × N) matrices."""
+    corr = np.asarray(corr)
+    n = corr.shape[-1]
+    off_diagonal = ~np.eye(n, dtype=bool)
+    values = corr[..., off_diagonal]
+    count = (~np.isnan(values)).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, np.nansum(values, axis=-1) / count, np.nan)
+
+
+def diversification_ratio(cov, weights=None):
+    """
+    Weighted average volatility over portfolio volatility (>= 1; 1 = no diversification).
+
+    Streams with a NaN variance are left out and the remaining weights renormalized.
+    """
+    cov = np.asarray(cov, dtype=np.float64)
+    vol = np.sqrt(np.diag(cov))
+    w = np.full(len(vol), 1.0) if weights is None else np.asarray(weights, dtype=np.float64).copy()
+    keep = ~np.isnan(vol)
+    if not keep.any() or w[keep].sum() == 0:
+        return np.nan
+    w = np.where(keep, w, 0.0) / w[keep].sum()
+    sub = np.nan_to_num(cov[np.ix_(keep, keep)])
+    portfolio_vol = np.sqrt(w[keep] @ sub @ w[keep])
+    return (w[keep] @ vol[keep]) / portfolio_vol if portfolio_vol > 0 else np.nan
+
+
+def detect_breakpoints(series, max_breaks=MAX_BREAKPOINTS, min_size=MIN_REGIME_LENGTH, min_shift=MIN_REGIME_SHIFT):
+    """
+    Mean-shift breakpoints by binary segmentation.
+
+    Each candidate split of a segment is scored by its reduction of the
+    squared error, computed for all splits at once from cumulative sums.
+    The best split overall is kept while the means on either side differ
+    by at least `min_shift` (rolling correlations are strongly
+    autocorrelated, so a noise-based penalty would over-segment).
+
+    Returns:
+    --------
+    list of int
+        Sorted positions where a new regime starts (NaNs are skipped)
+    """
+    values = np.asarray(series, dtype=np.float64)
+    positions = np.flatnonzero(~np.isnan(values))
+    y = values[positions]
+
+    def best_split(start, end):
+        length = end - start
+        if length < 2 * min_size:
+            return None, 0.0, 0.0
+        csum = np.cumsum(y[start:end])
+        k = np.arange(min_size, length - min_size + 1)
+        left = csum[k - 1]
+        right = csum[-1] - left
+        shift = left / k - right / (length - k)
+        # SSE reduction of splitting at k: k(L-k)/L · (mean_left - mean_right)²
+        gain = k * (length - k) / length * shift ** 2
+        best = np.argmax(gain)
+        return start + k[best], gain[best], abs(shift[best])
+
+    segments = [(0, len(y))]
+    breaks = []
+    while len(breaks) < max_breaks:
+        candidates = [(best_split(a, b), (a, b)) for a, b in segments]
+        (split, _, shift), (a, b) = max(candidates, key=lambda c: c[0][1])
+        if split is None or shift < min_shift:
+            break
+        breaks.append(split)
+        segments.remove((a, b))
+        segments += [(a, split), (split, b)]
+    return sorted(int(positions[b]) for b in breaks)
+
+
+def rolling_correlation(returns, window=ROLLING_WINDOW, min_periods=None, weights=None, keep_matrices=True,
+                        max_breaks=MAX_BREAKPOINTS, min_regime=MIN_REGIME_LENGTH, min_shift=MIN_REGIME_SHIFT):
+    """
+    Rolling correlation, diversification ratio and correlation regimes.
+
+    Parameters:
+    -----------
+    returns : pd.DataFrame
+        (dates × streams) returns; NaN = stream absent that day
+    window : int
+        Rolling window length (rows)
+    min_periods : int, optional
+        Joint observations a pair needs (default: window)
+    weights : array-like, optional
+        Portfolio weights for the diversification ratio (default: equal)
+    keep_matrices : bool
+        Keep every (N × N) correlation matrix (T·N² floats); set False for
+        large symbol universes to keep only the summary series
+    max_breaks, min_regime, min_shift :
+        Regime detection limits (see detect_breakpoints)
+
+    Returns:
+    --------
+    dict
+        'correlation': (T × N × N) array or None
+        'summary': DataFrame indexed like returns with Avg_Correlation and
+                   Diversification_Ratio
+        'regimes': DataFrame with one row per correlation regime
+    """
+    values = returns.to_numpy(dtype=np.float64)
+    n_rows, n_streams = values.shape
+    engine = RollingCovariance(n_streams, window, min_periods)
+
+    matrices = np.full((n_rows, n_streams, n_streams), np.nan) if keep_matrices else None
+    avg_corr = np.full(n_rows, np.nan)
+    div_ratio = np.full(n_rows, np.nan)
+    for t in range(n_rows):
+        engine.update(values[t])
+        cov, corr = engine.statistics()
+        if keep_matrices:
+            matrices[t] = corr
+        if np.isnan(corr).all():
+            continue
+        avg_corr[t] = average_correlation(corr)
+        div_ratio[t] = diversification_ratio(cov, weights)
+
+    summary = pd.DataFrame({'Avg_Correlation': avg_corr, 'Diversification_Ratio': div_ratio},
+                           index=returns.index)
+    return {
+        'correlation': matrices,
+        'summary': summary,
+        'regimes': correlation_regimes(summary['Avg_Correlation'], max_breaks, min_regime, min_shift),
+    }
+
+
+def correlation_regimes(avg_corr, max_breaks=MAX_BREAKPOINTS, min_size=MIN_REGIME_LENGTH, min_shift=MIN_REGIME_SHIFT):
+    """Regimes of the average-correlation series between detected breakpoints."""
+    valid = avg_corr.dropna()
+    if valid.empty:
+        return pd.DataFrame(columns=['Start', 'End', 'Days', 'Avg_Correlation'])
+    breaks = detect_breakpoints(avg_corr.to_numpy(), max_breaks, min_size, min_shift)
+    first = avg_corr.index.get_loc(valid.index[0])
+    bounds = [first] + breaks + [len(avg_corr)]
+    rows = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        segment = avg_corr.iloc[start:end].dropna()
+        rows.append({
+            'Start': segment.index[0],
+            'End': segment.index[-1],
+            'Days': len(segment),
+            'Avg_Correlation': segment.mean(),
+        })
+    return pd.DataFrame(rows)
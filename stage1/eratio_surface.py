@@ -0,0 +1,212 @@
+#!/usr/bin/env python3.11
+"""
+E-Ratio Surface Engine for QGSI Stage 1.0
+
+Extends calculate_eratio_example.py from one symbol / one holding period per
+MotherDuck query to every symbol x direction x holding period (1..60) in a
+single run over the local bar store (see bar_store.py).
+
+Per symbol, forward returns for all signals and all holding periods are
+gathered as one (signals x periods) matrix; mean, std, E-Ratio and win rate
+follow from column reductions. Symbols are spread across worker processes,
+each reading its slices from the memory-mapped store.
+
+Definitions match calculate_eratio:
+- Long return:  (Close[t+h] - Close[t]) / Close[t]
+- Short return: (Close[t] - Close[t+h]) / Close[t]
+- Signals without h forward bars are excluded for that h
+- Std is the population std (np.std), E-Ratio = mean / std
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from multiprocessing import Pool
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from bar_store import BAR_STORE_DIR, load_bar_store
+
+MAX_HOLDING_PERIOD = 60
+N_WORKERS = 8
+OUTPUT_FILE = '/home/ubuntu/stage1_output/ERatio_Surface.parquet'
+
+_store = None
+
+
+def _worker_store(store_dir):
+    global _store
+    if _store is None or str(_store.store_dir) != str(store_dir):
+        _store = load_bar_store(store_dir)
+    return _store
+
+
+def symbol_eratio_sums(close, signal_pos, directions, max_holding=MAX_HOLDING_PERIOD):
+    """
+    Additive E-Ratio sums for one symbol.
+
+    Parameters:
+    -----------
+    close : np.ndarray
+        Close prices for the symbol
+    signal_pos : np.ndarray
+        Signal bar positions within close
+    directions : np.ndarray
+        1 for Long, -1 for Short, per signal
+    max_holding : int
+        Holding periods 1..max_holding are evaluated
+
+    Returns:
+    --------
+    dict : {direction: (n, sum, sum_sq, wins)} arrays of length max_holding
+    """
+    horizons = np.arange(1, max_holding + 1)
+    exit_pos = signal_pos[:, None] + horizons[None, :]
+    valid = exit_pos < len(close)
+
+    entry = close[signal_pos][:, None]
+    exit_price = close[np.minimum(exit_pos, len(close) - 1)]
+    returns = (exit_price - entry) / entry * directions[:, None]
+    returns = np.where(valid, returns, 0.0)
+
+    sums = {}
+    for direction in (1, -1):
+        rows = directions == direction
+        r = returns[rows]
+        v = valid[rows]
+        sums[direction] = (
+            v.sum(axis=0),
+            r.sum(axis=0),
+            (r * r).sum(axis=0),
+            (v & (r > 0)).sum(axis=0),
+        )
+    return sums
+
+
+def _process_symbols(args):
+    """Worker: E-Ratio sums for a chunk of SymbolIds."""
+    store_dir, symbol_ids, signal_bars, signal_dirs, max_holding = args
+    store = _worker_store(store_dir)
+    records = []
+    for sid in symbol_ids:
+        sl = store.symbol_slice(sid)
+        close = np.asarray(store.close[sl])
+        rows = signal_bars[sid]
+        if len(rows) == 0:
+            continue
+        sums = symbol_eratio_sums(close, rows - sl.start, signal_dirs[sid], max_holding)
+        for direction, (n, s, ss, wins) in sums.items():
+            records.append((int(sid), direction, n, s, ss, wins))
+    return records
+
+
+def _surface_frame(symbol, signal_type, n, s, ss, wins):
+    """Turn additive sums into the E-Ratio table for one symbol/direction."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(n > 0, s / n, 0.0)
+        std = np.sqrt(np.maximum(np.where(n > 0, ss / n - mean ** 2, 0.0), 0.0))
+        eratio = np.where(std > 0, mean / std, 0.0)
+        win_rate = np.where(n > 0, wins / n, 0.0)
+    return pd.DataFrame({
+        'Symbol': symbol,
+        'SignalType': signal_type,
+        'HoldingPeriod': np.arange(1, len(n) + 1),
+        'NSignals': n.astype(np.int64),
+        'MeanReturn': mean,
+        'StdReturn': std,
+        'ERatio': eratio,
+        'WinRate': win_rate,
+    })
+
+
+def calculate_eratio_surface(store_dir=BAR_STORE_DIR, max_holding=MAX_HOLDING_PERIOD,
+                             n_workers=N_WORKERS, symbols=None):
+    """
+    E-Ratio for every symbol x direction x holding period.
+
+    Parameters:
+    -----------
+    store_dir : str
+        Bar store directory
+    max_holding : int
+        Largest holding period (bars)
+    n_workers : int
+        Worker processes (1 = run in-process)
+    symbols : list, optional
+        Restrict to these symbols (default: all)
+
+    Returns:
+    --------
+    pd.DataFrame
+        Symbol, SignalType, HoldingPeriod, NSignals, MeanReturn, StdReturn,
+        ERatio, WinRate. Rows with Symbol == 'ALL' pool every signal.
+    """
+    store = load_bar_store(store_dir)
+    signal_index = store.load_signal_index()
+    if symbols is not None:
+        signal_index = signal_index[signal_index['Symbol'].isin(symbols)]
+
+    # Group signal rows by symbol once (signal index is sorted by SymbolId)
+    sid = signal_index['SymbolId'].to_numpy()
+    bars = signal_index['BarIndex'].to_numpy()
+    dirs = signal_index['Direction'].to_numpy()
+    symbol_ids, starts = np.unique(sid, return_index=True)
+    signal_bars = dict(zip(symbol_ids, np.split(bars, starts[1:])))
+    signal_dirs = dict(zip(symbol_ids, np.split(dirs, starts[1:])))
+
+    chunks = [symbol_ids[i::max(n_workers, 1)] for i in range(max(n_workers, 1))]
+    tasks = [(str(store_dir), chunk,
+              {s: signal_bars[s] for s in chunk}, {s: signal_dirs[s] for s in chunk}, max_holding)
+             for chunk in chunks if len(chunk) > 0]
+
+    if n_workers > 1:
+        with Pool(n_workers) as pool:
+            results = pool.map(_process_symbols, tasks)
+    else:
+        results = [_process_symbols(task) for task in tasks]
+
+    frames = []
+    totals = {d: [np.zeros(max_holding) for _ in range(4)] for d in (1, -1)}
+    for records in results:
+        for symbol_id, direction, n, s, ss, wins in records:
+            signal_type = 'Long' if direction == 1 else 'Short'
+            frames.append(_surface_frame(store.symbols[symbol_id], signal_type, n, s, ss, wins))
+            for acc, value in zip(totals[direction], (n, s, ss, wins)):
+                acc += value
+    for direction, (n, s, ss, wins) in totals.items():
+        frames.append(_surface_frame('ALL', 'Long' if direction == 1 else 'Short', n, s, ss, wins))
+
+    surface = pd.concat(frames, ignore_index=True)
+    return surface.sort_values(['Symbol', 'SignalType', 'HoldingPeriod']).reset_index(drop=True)
+
+
+def main():
+    print("="*80)
+    print("QGSI STAGE 1.0: E-RATIO SURFACE (ALL SYMBOLS, HOLDING PERIODS 1-60)")
+    print("="*80)
+
+    start = time.time()
+    surface = calculate_eratio_surface()
+    elapsed = time.time() - start
+
+    Path(OUTPUT_FILE).parent.mkdir(parents=True, exist_ok=True)
+    surface.to_parquet(OUTPUT_FILE, index=False)
+    print(f"\n✓ {len(surface):,} rows ({surface['Symbol'].nunique() - 1} symbols) in {elapsed:.1f}s")
+    print(f"✓ Saved: {OUTPUT_FILE}")
+
+    pooled = surface[surface['Symbol'] == 'ALL']
+    for signal_type in ['Long', 'Short']:
+        rows = pooled[pooled['SignalType'] == signal_type].set_index('HoldingPeriod')
+        best = rows['ERatio'].idxmax()
+        print(f"\n{signal_type} Signals (all symbols):")
+        for h in [1, 5, 10, 20, 30, 60]:
+            if h in rows.index:
+                r = rows.loc[h]
+                print(f"  H={h:2d}: N={r['NSignals']:>7,} Mean={r['MeanReturn']*100:+.4f}% "
+                      f"E-Ratio={r['ERatio']:+.4f} WinRate={r['WinRate']:.2%}")
+        print(f"  Best holding period: {best} bars (E-Ratio {rows.loc[best, 'ERatio']:+.4f})")
+
+
+if __name__ == '__main__':
+    main()
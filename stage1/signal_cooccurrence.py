@@ -0,0 +1,234 @@
+#!/usr/bin/env python3.11
+"""
+Cross-Symbol Signal Co-occurrence for QGSI Stage 1.0
+
+Builds a timestamp-keyed signal index over the local bar store (bar_store.py)
+and computes:
+- Co-occurrence counts: minutes in which two symbol/direction columns both fire
+- Lagged co-occurrence: column a fires at minute t and column b at t + lag
+- Per-minute signal breadth (Long / Short / Total)
+
+Index layout:
+- Column id = SymbolId * 2 + (0 for Long, 1 for Short), 800 columns for 400 symbols
+- minutes: sorted unique minute buckets (int64 minutes since epoch) with signals
+- indptr / cols: CSR event lists per minute bucket
+- bitsets: (minutes x words) uint64, bit c set when column c fired
+
+Pair counting expands only the events that actually share a minute (or a
+minute pair at the given lag) and accumulates them with np.bincount, so cost
+scales with the number of co-firing events rather than 800 x 800 x minutes.
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from bar_store import BAR_STORE_DIR, load_bar_store
+
+MAX_LAG = 30  # minutes
+CHUNK_ROWS = 50_000  # minute buckets per pair-expansion chunk
+OUTPUT_DIR = '/home/ubuntu/stage1_output'
+
+NS_PER_MINUTE = 60_000_000_000
+LONG_BITS = np.uint64(0x5555555555555555)   # even bit positions = Long columns
+SHORT_BITS = np.uint64(0xAAAAAAAAAAAAAAAA)  # odd bit positions = Short columns
+POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class SignalCooccurrenceIndex:
+    """
+    Minute-bucketed signal index.
+
+    Attributes:
+    -----------
+    symbols : np.ndarray
+        Symbol names by SymbolId
+    minutes : np.ndarray
+        Sorted unique minute buckets with at least one signal
+    indptr, cols : np.ndarray
+        CSR event lists: columns firing in minutes[i] are cols[indptr[i]:indptr[i+1]]
+    bitsets : np.ndarray
+        (len(minutes), n_words) uint64 membership bitsets
+    """
+
+    def __init__(self, symbols, minutes, indptr, cols):
+        self.symbols = np.asarray(symbols)
+        self.n_cols = 2 * len(self.symbols)
+        self.n_words = (self.n_cols + 63) // 64
+        self.minutes = minutes
+        self.indptr = indptr
+        self.cols = cols
+
+        rows = np.repeat(np.arange(len(minutes)), np.diff(indptr))
+        self.bitsets = np.zeros((len(minutes), self.n_words), dtype=np.uint64)
+        np.bitwise_or.at(self.bitsets, (rows, cols // 64),
+                         np.left_shift(np.uint64(1), (cols % 64).astype(np.uint64)))
+
+    @classmethod
+    def from_signal_index(cls, signal_index, symbols):
+        """Build from bar_store signal index (SymbolId, Direction, Timestamp)."""
+        minute = pd.to_datetime(signal_index['Timestamp']).to_numpy('datetime64[ns]').view(np.int64) // NS_PER_MINUTE
+        col = signal_index['SymbolId'].to_numpy(np.int64) * 2 + (signal_index['Direction'].to_numpy() == -1)
+
+        events = np.unique(np.stack([minute, col], axis=1), axis=0)  # sorted, deduplicated
+        minutes, starts = np.unique(events[:, 0], return_index=True)
+        indptr = np.append(starts, len(events)).astype(np.int64)
+        return cls(symbols, minutes, indptr, events[:, 1].astype(np.int64))
+
+    def column_labels(self):
+        """'SYMBOL_Long' / 'SYMBOL_Short' per column id."""
+        return np.array([f'{s}_{d}' for s in self.symbols for d in ('Long', 'Short')])
+
+    def is_active(self, minute, symbol_id, direction):
+        """Membership test for one (minute bucket, symbol, direction)."""
+        i = np.searchsorted(self.minutes, minute)
+        if i >= len(self.minutes) or self.minutes[i] != minute:
+            return False
+        c = symbol_id * 2 + (direction == -1)
+        return bool((self.bitsets[i, c // 64] >> np.uint64(c % 64)) & np.uint64(1))
+
+    def breadth(self):
+        """
+        Per-minute signal breadth from bitset popcounts.
+
+        Returns:
+        --------
+        pd.DataFrame
+            Minute (timestamp), LongBreadth, ShortBreadth, TotalBreadth
+        """
+        long_bits = (self.bitsets & LONG_BITS).view(np.uint8)
+        short_bits = (self.bitsets & SHORT_BITS).view(np.uint8)
+        n_long = POPCOUNT8[long_bits].sum(axis=1, dtype=np.int32)
+        n_short = POPCOUNT8[short_bits].sum(axis=1, dtype=np.int32)
+        return pd.DataFrame({
+            'Minute': pd.to_datetime(self.minutes * NS_PER_MINUTE),
+            'LongBreadth': n_long,
+            'ShortBreadth': n_short,
+            'TotalBreadth': n_long + n_short,
+        })
+
+
+def _pair_counts(index, left_rows, right_rows, counts):
+    """Accumulate all column pairs between matched minute rows into counts (flat n_cols^2)."""
+    indptr, cols, n_cols = index.indptr, index.cols, index.n_cols
+    k_left = indptr[left_rows + 1] - indptr[left_rows]
+    k_right = indptr[right_rows + 1] - indptr[right_rows]
+
+    for start in range(0, len(left_rows), CHUNK_ROWS):
+        sl = slice(start, start + CHUNK_ROWS)
+        kl, kr = k_left[sl], k_right[sl]
+        n_pairs = kl * kr
+        total = int(n_pairs.sum())
+        if total == 0:
+            continue
+        # Pair p belongs to row-match m; within it, left event = q // kr, right event = q % kr
+        m = np.repeat(np.arange(len(kl)), n_pairs)
+        q = np.arange(total) - np.repeat(np.cumsum(n_pairs) - n_pairs, n_pairs)
+        a = cols[indptr[left_rows[sl]][m] + q // kr[m]]
+        b = cols[indptr[right_rows[sl]][m] + q % kr[m]]
+        counts += np.bincount(a * n_cols + b, minlength=n_cols * n_cols)
+
+
+def lagged_cooccurrence(index, max_lag=MAX_LAG):
+    """
+    Lagged co-occurrence matrices.
+
+    Parameters:
+    -----------
+    index : SignalCooccurrenceIndex
+    max_lag : int
+        Lags 0..max_lag in minutes
+
+    Returns:
+    --------
+    np.ndarray
+        (max_lag + 1, n_cols, n_cols) int32; [L, a, b] = number of minutes t with
+        column a firing at t and column b firing at t + L. Lag 0 is the symmetric
+        co-occurrence matrix whose diagonal holds each column's active minutes.
+    """
+    n_cols = index.n_cols
+    result = np.zeros((max_lag + 1, n_cols, n_cols), dtype=np.int32)
+    rows = np.arange(len(index.minutes))
+
+    for lag in range(max_lag + 1):
+        target = np.searchsorted(index.minutes, index.minutes + lag)
+        target = np.minimum(target, len(index.minutes) - 1)
+        matched = index.minutes[target] == index.minutes + lag
+        counts = np.zeros(n_cols * n_cols, dtype=np.int64)
+        _pair_counts(index, rows[matched], target[matched], counts)
+        result[lag] = counts.reshape(n_cols, n_cols)
+    return result
+
+
+def cooccurrence_table(index, cooc, n_minutes_total):
+    """
+    Long-format lag-0 pair table with lift over independence.
+
+    Parameters:
+    -----------
+    index : SignalCooccurrenceIndex
+    cooc : np.ndarray
+        Lag-0 co-occurrence matrix (n_cols x n_cols)
+    n_minutes_total : int
+        Number of trading minutes in the sample (denominator for base rates)
+
+    Returns:
+    --------
+    pd.DataFrame
+        ColumnA, ColumnB, CoCount, CountA, CountB, Expected, Lift (a < b only)
+    """
+    labels = index.column_labels()
+    active = np.diag(cooc).astype(np.float64)
+    a, b = np.nonzero(np.triu(cooc, k=1))
+    expected = active[a] * active[b] / max(n_minutes_total, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lift = np.where(expected > 0, cooc[a, b] / expected, np.nan)
+    table = pd.DataFrame({
+        'ColumnA': labels[a],
+        'ColumnB': labels[b],
+        'CoCount': cooc[a, b],
+        'CountA': active[a].astype(np.int64),
+        'CountB': active[b].astype(np.int64),
+        'Expected': expected,
+        'Lift': lift,
+    })
+    return table.sort_values('CoCount', ascending=False).reset_index(drop=True)
+
+
+def main():
+    print("="*80)
+    print("QGSI STAGE 1.0: CROSS-SYMBOL SIGNAL CO-OCCURRENCE")
+    print("="*80)
+
+    start = time.time()
+    store = load_bar_store(BAR_STORE_DIR)
+    signal_index = store.load_signal_index()
+    index = SignalCooccurrenceIndex.from_signal_index(signal_index, store.symbols)
+    n_minutes_total = len(np.unique(np.asarray(store.timestamps) // NS_PER_MINUTE))
+    print(f"\n✓ Indexed {len(index.cols):,} signal events in {len(index.minutes):,} minute buckets")
+    print(f"  {index.n_cols} columns, {index.n_words} words per bitset, {n_minutes_total:,} trading minutes")
+
+    breadth = index.breadth()
+    cooc = lagged_cooccurrence(index, MAX_LAG)
+    table = cooccurrence_table(index, cooc[0], n_minutes_total)
+    print(f"✓ Lagged co-occurrence 0..{MAX_LAG} in {time.time() - start:.1f}s")
+
+    output_dir = Path(OUTPUT_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    breadth.to_parquet(output_dir / 'Signal_Breadth_By_Minute.parquet', index=False)
+    table.to_parquet(output_dir / 'Signal_Cooccurrence_Pairs.parquet', index=False)
+    np.save(output_dir / 'Signal_Cooccurrence_Lagged.npy', cooc)
+    np.save(output_dir / 'Signal_Cooccurrence_Columns.npy', index.column_labels())
+    print(f"✓ Saved outputs to {output_dir}")
+
+    print("\nBreadth distribution (minutes with signals):")
+    print(breadth['TotalBreadth'].describe().to_string())
+    print("\nTop 10 co-occurring pairs:")
+    print(table.head(10).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3.11
+"""
+================================================================================
+QGSI PRE-SIGNAL FEATURE STORE - STAGE 2.1
+================================================================================
+
+PROGRAM NAME: build_signal_feature_store.py
+VERSION: 2.1 Production
+AUTHOR: Alex Bernal, Senior Quantitative Researcher
+DATE: January 2026
+PROJECT: QGSI Signal Research
+
+================================================================================
+PURPOSE:
+================================================================================
+Build the feature matrix for PathGroup models (see "Feature Engineering for ML"
+in path_dependency_analysis.py). Every feature uses only bars up to and
+including the signal bar, so it is available in real time.
+
+================================================================================
+FEATURES (float32, one row per feature, one column per signal):
+================================================================================
+- Traj_m10..Traj_m1:  Return of bars -10..-1 vs Bar 0 Close (Stage 2 convention)
+- ATR14/20/30/50_Pct: ATR (simple mean of true range) / Close
+- BarRange_Pct:       (High - Low) / Close of the signal bar
+- RangeMean10_Pct:    Mean (High - Low) / Close over the last 10 bars
+- RangeExpansion:     Signal bar true range / ATR(30)
+- PathLength10:       Sum of |1-bar returns| over the last 10 bars
+- MinuteOfDay, DayOfWeek
+- SignalCount, Direction
+- SignalDensity30/390: Signals on the symbol in the prior 30 / 390 bars
+- RealizedVol60/390:  Std of 1-bar log returns over the prior 60 / 390 bars
+
+The bar store has no volume column, so range expansion and path length
+serve as the activity (volume) proxies.
+
+================================================================================
+OUTPUT (FEATURE_STORE_DIR):
+================================================================================
+- features.npy:      (n_features, n_signals) float32, opened with mmap for training
+- feature_names.json: Feature names in row order
+- built.npy:         Per-symbol completion flags (re-runs resume)
+
+Columns are aligned with the bar store signal index (SignalId order), which is
+sorted by symbol, so each symbol partition writes one contiguous block.
+
+================================================================================
+USAGE:
+================================================================================
+    python3.11 build_signal_feature_store.py
+
+    from build_signal_feature_store import load_feature_store, attach_path_group_target
+    X, names = load_feature_store()          # memory-mapped
+    y = attach_path_group_target(signal_index, path_df)
+
+================================================================================
+"""
+
+import sys
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from bar_store import BAR_STORE_DIR, load_bar_store
+
+FEATURE_STORE_DIR = '/home/ubuntu/signal_feature_store'
+PRE_SIGNAL_BARS = 10
+ATR_PERIODS = [14, 20, 30, 50]
+
+FEATURE_NAMES = (
+    [f'Traj_m{k}' for k in range(PRE_SIGNAL_BARS, 0, -1)]
+    + [f'ATR{p}_Pct' for p in ATR_PERIODS]
+    + ['BarRange_Pct', 'RangeMean10_Pct', 'RangeExpansion', 'PathLength10',
+       'MinuteOfDay', 'DayOfWeek', 'SignalCount', 'Direction',
+       'SignalDensity30', 'SignalDensity390', 'RealizedVol60', 'RealizedVol390']
+)
+
+
+def trailing_mean(x, window):
+    """Mean of x[t-window+1..t]; NaN until window values exist."""
+    c = np.concatenate([[0.0], np.cumsum(x)])
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = (c[window:] - c[:-window]) / window
+    return out
+
+
+def trailing_std(x, window):
+    """Sample std of x[t-window+1..t]; NaN until window values exist."""
+    mean = trailing_mean(x, window)
+    mean_sq = trailing_mean(x * x, window)
+    var = (mean_sq - mean ** 2) * window / (window - 1)
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def symbol_features(bars, signal_pos, directions, signal_counts):
+    """
+    Pre-signal features for all signals of one symbol.
+
+    Parameters:
+    -----------
+    bars : dict
+        timestamps, high, low, close, signal arrays for the symbol
+    signal_pos : np.ndarray
+        Signal bar positions within the symbol
+    directions, signal_counts : np.ndarray
+        Per-signal Direction (1 / -1) and SignalCount
+
+    Returns:
+    --------
+    np.ndarray
+        (len(FEATURE_NAMES), len(signal_pos)) float32
+    """
+    high = np.asarray(bars['high'], dtype=np.float64)
+    low = np.asarray(bars['low'], dtype=np.float64)
+    close = np.asarray(bars['close'], dtype=np.float64)
+
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    ret1 = np.concatenate([[0.0], np.diff(close) / close[:-1]])
+    log_ret1 = np.concatenate([[0.0], np.diff(np.log(close))])
+    bar_range = (high - low) / close
+    is_signal = np.isin(np.asarray(bars['signal']), (1, -1)).astype(np.float64)
+
+    entry = close[signal_pos]
+    rows = []
+
+    # Trajectory bars -10..-1 relative to Bar 0 close
+    for k in range(PRE_SIGNAL_BARS, 0, -1):
+        pos = signal_pos - k
+        valid = pos >= 0
+        rows.append(np.where(valid, (close[np.maximum(pos, 0)] - entry) / entry, np.nan))
+
+    # ATR (simple rolling mean of true range, as in the Stage 4 processors)
+    atr = {p: trailing_mean(true_range, p) for p in ATR_PERIODS}
+    for p in ATR_PERIODS:
+        rows.append(atr[p][signal_pos] / entry)
+
+    rows.append(bar_range[signal_pos])
+    rows.append(trailing_mean(bar_range, 10)[signal_pos])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rows.append(true_range[signal_pos] / atr[30][signal_pos])
+    rows.append(trailing_mean(np.abs(ret1), 10)[signal_pos] * 10)
+
+    ts = pd.to_datetime(np.asarray(bars['timestamps'])[signal_pos])
+    rows.append((ts.hour * 60 + ts.minute).to_numpy(dtype=np.float64))
+    rows.append(ts.dayofweek.to_numpy(dtype=np.float64))
+    rows.append(signal_counts.astype(np.float64))
+    rows.append(directions.astype(np.float64))
+
+    # Prior signal density (excluding the signal bar itself)
+    cum_signals = np.concatenate([[0.0], np.cumsum(is_signal)])
+    for window in (30, 390):
+        start = np.maximum(signal_pos - window, 0)
+        rows.append(cum_signals[signal_pos] - cum_signals[start])
+
+    # Realized volatility of the bars before the signal
+    for window in (60, 390):
+        vol = trailing_std(log_ret1, window)
+        prior = signal_pos - 1
+        rows.append(np.where(prior >= window, vol[np.maximum(prior, 0)], np.nan))
+
+    return np.vstack(rows).astype(np.float32)
+
+
+def build_feature_store(store_dir=BAR_STORE_DIR, output_dir=FEATURE_STORE_DIR):
+    """
+    Build (or resume) the feature store one symbol partition at a time.
+
+    Returns:
+    --------
+    np.memmap
+        (len(FEATURE_NAMES), n_signals) float32 feature matrix
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    store = load_bar_store(store_dir)
+    signal_index = store.load_signal_index()
+    n_signals = len(signal_index)
+
+    features_path = output_dir / 'features.npy'
+    built_path = output_dir / 'built.npy'
+    shape = (len(FEATURE_NAMES), n_signals)
+    if features_path.exists() and built_path.exists():
+        features = np.load(features_path, mmap_mode='r+')
+        built = np.load(built_path)
+        if features.shape != shape:
+            raise ValueError(f"Existing feature store shape {features.shape} != {shape}; delete {output_dir} to rebuild")
+    else:
+        features = np.lib.format.open_memmap(features_path, mode='w+', dtype=np.float32, shape=shape)
+        built = np.zeros(store.n_symbols, dtype=bool)
+    with open(output_dir / 'feature_names.json', 'w') as f:
+        json.dump(FEATURE_NAMES, f, indent=2)
+
+    sid = signal_index['SymbolId'].to_numpy()
+    symbol_ids, starts = np.unique(sid, return_index=True)
+    ends = np.append(starts[1:], n_signals)
+
+    for i, (symbol_id, lo, hi) in enumerate(zip(symbol_ids, starts, ends)):
+        if built[symbol_id]:
+            continue
+        sl = store.symbol_slice(symbol_id)
+        bars = store.symbol_arrays(symbol_id, ('timestamps', 'high', 'low', 'close', 'signal'))
+        block = signal_index.iloc[lo:hi]
+        features[:, lo:hi] = symbol_features(
+            bars,
+            block['BarIndex'].to_numpy() - sl.start,
+            block['Direction'].to_numpy(),
+            block['SignalCount'].to_numpy(),
+        )
+        built[symbol_id] = True
+        if (i + 1) % 40 == 0 or i + 1 == len(symbol_ids):
+            features.flush()
+            np.save(built_path, built)
+            print(f"  [{i + 1}/{len(symbol_ids)}] symbols written")
+
+    features.flush()
+    np.save(built_path, built)
+    return features
+
+
+def load_feature_store(output_dir=FEATURE_STORE_DIR):
+    """Memory-mapped feature matrix and its feature names."""
+    output_dir = Path(output_dir)
+    with open(output_dir / 'feature_names.json') as f:
+        names = json.load(f)
+    return np.load(output_dir / 'features.npy', mmap_mode='r'), names
+
+
+def attach_path_group_target(signal_index, path_df):
+    """
+    PathGroup labels aligned with the signal index (feature matrix columns).
+
+    Parameters:
+    -----------
+    signal_index : pd.DataFrame
+        Bar store signal index
+    path_df : pd.DataFrame
+        path_dependency_results.parquet (Symbol, SignalIndex, SignalType, PathGroup)
+
+    Returns:
+    --------
+    pd.Series
+        PathGroup per SignalId (NaN for signals without a trajectory)
+    """
+    keys = ['Symbol', 'SignalIndex', 'SignalType']
+    labels = signal_index[keys].merge(path_df[keys + ['PathGroup']], on=keys, how='left')
+    return pd.Series(labels['PathGroup'].to_numpy(), index=signal_index['SignalId'], name='PathGroup')
+
+
+def main():
+    print("="*80)
+    print("QGSI PRE-SIGNAL FEATURE STORE")
+    print("="*80)
+
+    features = build_feature_store()
+    print(f"\n✓ Feature matrix: {features.shape[0]} features × {features.shape[1]:,} signals (float32)")
+    print(f"✓ Saved to {FEATURE_STORE_DIR}")
+
+    print("\nFeature coverage (non-NaN %):")
+    for name, row in zip(FEATURE_NAMES, features):
+        print(f"  {name:<18s} {100 * np.isfinite(row).mean():6.2f}%")
+
+    print("\n" + "="*80)
+    print("✓ FEATURE STORE COMPLETE")
+    print("="*80)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3.11
+"""
+================================================================================
+QGSI CONDITIONAL TRAJECTORY CUBE - STAGE 2.1
+================================================================================
+
+PROGRAM NAME: build_trajectory_cube.py
+VERSION: 2.1 Production
+AUTHOR: Alex Bernal, Senior Quantitative Researcher
+DATE: January 2026
+PROJECT: QGSI Signal Research
+
+================================================================================
+PURPOSE:
+================================================================================
+Materialize per-bar trajectory aggregates once so that every Stage 2.1 chart
+and table can be rendered without re-scanning the 5.7M row trajectory file.
+
+The cube is keyed by:
+- SignalType:      'Long' / 'Short'
+- PathGroup:       'Quick_Winners' / 'Quick_Losers' / 'Chop_Drift'
+- SignalCountBin:  'SC=1', 'SC=2', 'SC=3-5', 'SC=6-10', 'SC=11+'
+- Hour:            Hour of day of the signal bar (exchange time)
+- VolRegime:       'Low' / 'Mid' / 'High' pre-signal realized volatility tercile
+- Bar:             Bar offset relative to the signal (-10 to +30)
+
+================================================================================
+CUBE CONTENTS:
+================================================================================
+Additive aggregates per cell (any slice is a plain sum over cells):
+- Count, SumReturn, SumSqReturn
+- NGain, NLoss, SumGain, SumLoss
+- MinReturn, MaxReturn
+- H000..H401: Return histogram on fixed 1 bp bins over [-2%, +2%] plus one
+  underflow and one overflow bin, used for median / P20 / P80
+
+Quantiles are interpolated within the 1 bp bin that holds their rank,
+while np.percentile interpolates between the two neighbouring order
+statistics, so the difference is bounded by the larger of one bin and the
+local spacing of the data (about 1 / (n · density)). For quantiles inside
+[-2%, +2%] of large cells this is under 1 bp (e.g. a few hundred returns
+at 40 bp volatility); small cells such as fine Hour × VolRegime ×
+SignalCountBin slices can be off by several to tens of bp (about 15 bp at
+n = 20). Quantiles in the underflow / overflow bins are only interpolated
+between the bin edge and MinReturn / MaxReturn and can be off by more.
+
+================================================================================
+INPUT DATA:
+================================================================================
+1. ALL_trajectory_signalcount.parquet: Full trajectory data (5.7M rows)
+2. path_dependency_results.parquet: Path group classifications
+3. QGSI_AllSymbols_3Signals.parquet: Bar timestamps (Symbol, BarDateTime only)
+
+================================================================================
+OUTPUT:
+================================================================================
+File: trajectory_cube.parquet (~25K rows, a few MB)
+
+================================================================================
+USAGE:
+================================================================================
+Build the cube:
+    python3.11 build_trajectory_cube.py
+
+Query a slice from another script:
+    from build_trajectory_cube import load_trajectory_cube, cube_statistics
+    cube = load_trajectory_cube()
+    stats = cube_statistics(cube, SignalType='Long', PathGroup='Quick_Winners',
+                            Hour=[9, 10], VolRegime='High')
+
+Expected runtime: 1-2 minutes (single vectorized pass)
+
+================================================================================
+DEPENDENCIES:
+================================================================================
+- pandas, numpy: Data manipulation
+- pyarrow: Parquet I/O
+
+Install: pip3 install pandas numpy pyarrow
+
+================================================================================
+"""
+
+import pandas as pd
+import numpy as np
+
+# Configuration
+TRAJECTORY_FILE = '/home/ubuntu/ALL_trajectory_signalcount.parquet'
+PATH_DEPENDENCY_FILE = '/home/ubuntu/path_dependency_results.parquet'
+DATA_PATH = '/home/ubuntu/upload/QGSI_AllSymbols_3Signals.parquet'
+CUBE_FILE = '/home/ubuntu/trajectory_cube.parquet'
+
+CUBE_KEYS = ['SignalType', 'PathGroup', 'SignalCountBin', 'Hour', 'VolRegime', 'Bar']
+PATH_GROUPS = ['Quick_Winners', 'Quick_Losers', 'Chop_Drift']
+VOL_REGIMES = ['Low', 'Mid', 'High']
+
+# Histogram: 1 bp bins over [-2%, +2%], plus underflow (H000) and overflow (H401)
+HIST_EDGES = np.round(np.linspace(-0.02, 0.02, 401), 6)
+N_HIST_BINS = len(HIST_EDGES) + 1
+HIST_COLS = [f'H{i:03d}' for i in range(N_HIST_BINS)]
+MOMENT_COLS = ['Count', 'SumReturn', 'SumSqReturn', 'NGain', 'NLoss', 'SumGain', 'SumLoss']
+
+
+def attach_signal_hours(signals, data_path=DATA_PATH):
+    """
+    Attach the hour of day of the signal bar to each signal.
+
+    SignalIndex is the bar position within the symbol after sorting by
+    BarDateTime (see stage2 calculate_trajectory), so the lookup is a single
+    sort + cumcount over the bar timestamps.
+
+    Parameters:
+    -----------
+    signals : pd.DataFrame
+        Signals with columns Symbol, SignalIndex
+    data_path : str
+        Bar data parquet with Symbol and BarDateTime columns
+
+    Returns:
+    --------
+    pd.DataFrame
+        signals with an added Hour column (-1 where the timestamp is unknown)
+    """
+    bars = pd.read_parquet(data_path, columns=['Symbol', 'BarDateTime'])
+    bars = bars.sort_values(['Symbol', 'BarDateTime'], kind='mergesort')
+    bars['SignalIndex'] = bars.groupby('Symbol', sort=False).cumcount()
+    bars['Hour'] = pd.to_datetime(bars['BarDateTime']).dt.hour.astype(np.int16)
+
+    signals = signals.merge(bars[['Symbol', 'SignalIndex', 'Hour']],
+                            on=['Symbol', 'SignalIndex'], how='left')
+    signals['Hour'] = signals['Hour'].fillna(-1).astype(np.int16)
+    return signals
+
+
+def signal_volatility_regimes(trajectory_df):
+    """
+    Classify each signal by pre-signal realized volatility tercile.
+
+    Realized volatility is the standard deviation of bar-to-bar changes in the
+    Universal Reference Point return over bars -10..0, i.e. information that is
+    available at the signal bar.
+
+    Returns:
+    --------
+    pd.DataFrame
+        Symbol, SignalIndex, SignalType, PreSignalVol, VolRegime
+    """
+    keys = ['Symbol', 'SignalIndex', 'SignalType']
+    pre = trajectory_df[trajectory_df['Bar'] <= 0]
+    wide = pre.pivot_table(index=keys, columns='Bar', values='Return', aggfunc='first')
+    wide = wide.sort_index(axis=1)
+
+    steps = np.diff(wide.to_numpy(dtype=np.float64), axis=1)
+    vol = np.nanstd(steps, axis=1, ddof=1)
+
+    result = wide.index.to_frame(index=False)
+    result['PreSignalVol'] = vol
+    result['VolRegime'] = pd.qcut(result['PreSignalVol'].rank(method='first'), 3,
+                                  labels=VOL_REGIMES).astype(str)
+    return result
+
+
+def build_trajectory_cube(trajectory_df, signal_attrs):
+    """
+    Aggregate trajectory rows into the conditional trajectory cube.
+
+    Parameters:
+    -----------
+    trajectory_df : pd.DataFrame
+        Trajectory rows: Symbol, SignalIndex, SignalType, SignalCountBin, Bar, Return
+    signal_attrs : pd.DataFrame
+        One row per signal: Symbol, SignalIndex, SignalType, PathGroup, Hour, VolRegime
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per non-empty cube cell with MOMENT_COLS, MinReturn, MaxReturn, HIST_COLS
+    """
+    keys = ['Symbol', 'SignalIndex', 'SignalType']
+    df = trajectory_df[keys + ['SignalCountBin', 'Bar', 'Return']].merge(
+        signal_attrs[keys + ['PathGroup', 'Hour', 'VolRegime']], on=keys, how='left'
+    )
+    df['PathGroup'] = df['PathGroup'].fillna('Unknown')
+    df['VolRegime'] = df['VolRegime'].fillna('Unknown')
+
+    # Integer cell id per row: one sorted factorization over the key columns
+    grouper = df.groupby(CUBE_KEYS, sort=True, observed=True)
+    cell_id = grouper.ngroup().to_numpy()
+    cells = grouper.size().index
+    n_cells = len(cells)
+
+    ret = df['Return'].to_numpy(dtype=np.float64)
+    gain = ret > 0
+    loss = ret < 0
+
+    moments = {
+        'Count': np.bincount(cell_id, minlength=n_cells),
+        'SumReturn': np.bincount(cell_id, weights=ret, minlength=n_cells),
+        'SumSqReturn': np.bincount(cell_id, weights=ret * ret, minlength=n_cells),
+        'NGain': np.bincount(cell_id, weights=gain, minlength=n_cells).astype(np.int64),
+        'NLoss': np.bincount(cell_id, weights=loss, minlength=n_cells).astype(np.int64),
+        'SumGain': np.bincount(cell_id, weights=np.where(gain, ret, 0.0), minlength=n_cells),
+        'SumLoss': np.bincount(cell_id, weights=np.where(loss, ret, 0.0), minlength=n_cells),
+    }
+
+    extremes = pd.DataFrame({'cell': cell_id, 'Return': ret}).groupby('cell')['Return'].agg(['min', 'max'])
+
+    hist_bin = np.searchsorted(HIST_EDGES, ret, side='right')
+    hist = np.bincount(cell_id.astype(np.int64) * N_HIST_BINS + hist_bin,
+                       minlength=n_cells * N_HIST_BINS).reshape(n_cells, N_HIST_BINS)
+
+    cube = cells.to_frame(index=False)
+    for col in MOMENT_COLS:
+        cube[col] = moments[col]
+    cube['MinReturn'] = extremes['min'].to_numpy()
+    cube['MaxReturn'] = extremes['max'].to_numpy()
+    cube = pd.concat([cube, pd.DataFrame(hist.astype(np.int32), columns=HIST_COLS)], axis=1)
+
+    return cube
+
+
+def load_trajectory_cube(cube_file=CUBE_FILE):
+    """Load the materialized cube."""
+    return pd.read_parquet(cube_file)
+
+
+def _histogram_quantiles(hist, min_ret, max_ret, q):
+    """
+    Linear-interpolated quantiles from per-row histograms.
+
+    Parameters:
+    -----------
+    hist : np.ndarray
+        (rows, N_HIST_BINS) bin counts
+    min_ret, max_ret : np.ndarray
+        Per-row extremes, used as the outer edges of the under/overflow bins
+    q : float
+        Quantile in [0, 1]
+
+    Returns:
+    --------
+    np.ndarray
+        Quantile per row (NaN for empty rows)
+    """
+    counts = hist.sum(axis=1)
+    cum = np.cumsum(hist, axis=1)
+    # np.percentile (linear) places quantile q at rank q * (n - 1) counting from 0
+    target = q * (counts - 1) + 0.5
+    b = np.minimum((cum < target[:, None]).sum(axis=1), N_HIST_BINS - 1)
+    rows = np.arange(len(hist))
+
+    lower_edges = np.concatenate([[np.nan], HIST_EDGES])
+    upper_edges = np.concatenate([HIST_EDGES, [np.nan]])
+    lo = np.where(b == 0, min_ret, lower_edges[b])
+    hi = np.where(b == N_HIST_BINS - 1, max_ret, upper_edges[b])
+    lo = np.maximum(lo, min_ret)
+    hi = np.minimum(hi, max_ret)
+
+    below = np.where(b > 0, cum[rows, np.maximum(b - 1, 0)], 0)
+    in_bin = hist[rows, b]
+    frac = np.where(in_bin > 0, (target - below) / np.maximum(in_bin, 1), 0.5)
+    result = lo + np.clip(frac, 0.0, 1.0) * (hi - lo)
+    return np.where(counts > 0, result, np.nan)
+
+
+def cube_statistics(cube, by='Bar', bars=None, **filters):
+    """
+    Per-bar statistics for any slice of the cube.
+
+    Parameters:
+    -----------
+    cube : pd.DataFrame
+        Output of build_trajectory_cube / load_trajectory_cube
+    by : str or list
+        Grouping columns of the result (default: 'Bar')
+    bars : iterable, optional
+        Restrict to these bar offsets (e.g. range(1, 31))
+    **filters
+        Cube key filters, scalar or list, e.g. SignalType='Long', Hour=[9, 10]
+
+    Returns:
+    --------
+    pd.DataFrame
+        N, ProbGain, ProbLoss, MeanReturn, StdReturn, MedianReturn, P80, P20,
+        ProfitFactor per group (same definitions as the raw-data tables;
+        quantiles are histogram estimates, approximate for small N - see
+        the module docstring)
+    """
+    mask = np.ones(len(cube), dtype=bool)
+    for col, value in filters.items():
+        values = value if isinstance(value, (list, tuple, set, np.ndarray, range)) else [value]
+        mask &= cube[col].isin(list(values)).to_numpy()
+    if bars is not None:
+        mask &= cube['Bar'].isin(list(bars)).to_numpy()
+
+    by = [by] if isinstance(by, str) else list(by)
+    sliced = cube[mask]
+    grouped = sliced.groupby(by, sort=True)
+    sums = grouped[MOMENT_COLS + HIST_COLS].sum()
+    mins = grouped['MinReturn'].min().to_numpy()
+    maxs = grouped['MaxReturn'].max().to_numpy()
+
+    n = sums['Count'].to_numpy(dtype=np.float64)
+    mean = sums['SumReturn'].to_numpy() / n
+    var = (sums['SumSqReturn'].to_numpy() - n * mean ** 2) / np.maximum(n - 1, 1)
+    gains = sums['SumGain'].to_numpy()
+    losses = np.abs(sums['SumLoss'].to_numpy())
+    hist = sums[HIST_COLS].to_numpy()
+
+    stats = sums.index.to_frame(index=False)
+    stats['N'] = n.astype(np.int64)
+    stats['ProbGain'] = 100 * sums['NGain'].to_numpy() / n
+    stats['ProbLoss'] = 100 * sums['NLoss'].to_numpy() / n
+    stats['MeanReturn'] = mean
+    stats['StdReturn'] = np.sqrt(np.maximum(var, 0.0))
+    stats['MedianReturn'] = _histogram_quantiles(hist, mins, maxs, 0.5)
+    stats['P80'] = _histogram_quantiles(hist, mins, maxs, 0.8)
+    stats['P20'] = _histogram_quantiles(hist, mins, maxs, 0.2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stats['ProfitFactor'] = np.where(losses > 0, gains / losses, np.inf)
+    return stats
+
+
+def main():
+    print("="*80)
+    print("QGSI CONDITIONAL TRAJECTORY CUBE")
+    print("="*80)
+
+    print("\nLoading trajectory data...")
+    trajectory_df = pd.read_parquet(
+        TRAJECTORY_FILE,
+        columns=['Symbol', 'SignalIndex', 'SignalType', 'SignalCountBin', 'Bar', 'Return']
+    )
+    path_df = pd.read_parquet(PATH_DEPENDENCY_FILE,
+                              columns=['Symbol', 'SignalIndex', 'SignalType', 'PathGroup'])
+    print(f"  Loaded {len(trajectory_df):,} trajectory rows, {len(path_df):,} signals")
+
+    print("\nBuilding signal attributes (hour of day, volatility regime)...")
+    signal_attrs = signal_volatility_regimes(trajectory_df)
+    signal_attrs = signal_attrs.merge(path_df, on=['Symbol', 'SignalIndex', 'SignalType'], how='left')
+    signal_attrs = attach_signal_hours(signal_attrs)
+    print(f"  {len(signal_attrs):,} signals, hours: {sorted(signal_attrs['Hour'].unique())}")
+
+    print("\nAggregating cube...")
+    cube = build_trajectory_cube(trajectory_df, signal_attrs)
+    cube.to_parquet(CUBE_FILE, index=False)
+    print(f"  ✓ Saved {len(cube):,} cells to {CUBE_FILE}")
+    print(f"  ✓ Rows covered: {cube['Count'].sum():,}")
+
+    print("\n" + "="*80)
+    print("✓ TRAJECTORY CUBE COMPLETE")
+    print("="*80)
+
+
+if __name__ == '__main__':
+    main()
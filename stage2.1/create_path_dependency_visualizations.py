@@ -45,10 +45,11 @@ VISUALIZATIONS GENERATED:
 INPUT DATA:
 ================================================================================
 Required Files:
-1. path_dependency_results.parquet: Path group classifications (139,959 signals)
-2. ALL_trajectory_signalcount.parquet: Full trajectory data (5.7M rows)
+1. trajectory_cube.parquet: Conditional trajectory cube (build_trajectory_cube.py)
 
-Both files are outputs from previous stages.
+The cube is built once from path_dependency_results.parquet and
+ALL_trajectory_signalcount.parquet (outputs from previous stages). If it does
+not exist yet it is built automatically on the first run.
 
 ================================================================================
 CHART SPECIFICATIONS:
@@ -85,14 +86,13 @@ Generate all visualizations:
 Output directory: path_dependency_visualizations/
 
 The script will:
-1. Load path dependency and trajectory data
-2. Merge datasets
-3. Calculate conditional statistics
-4. Generate trajectory charts
-5. Save CSV tables
-6. Display completion message
+1. Load the conditional trajectory cube (building it if missing)
+2. Calculate conditional statistics from cube slices
+3. Generate trajectory charts
+4. Save CSV tables
+5. Display completion message
 
-Expected runtime: 2-3 minutes
+Expected runtime: seconds once the cube exists (chart rendering dominates)
 
 ================================================================================
 DEPENDENCIES:
@@ -128,6 +128,7 @@ Chop/Drift (Blue Line):
 NOTES:
 ================================================================================
 - Charts show MEAN trajectory (not median)
+- Median/P20/P80 are interpolated from the cube's 1 bp histograms
 - All returns calculated relative to Bar 0 (entry price)
 - For Long signals: positive return = profit
 - For Short signals: negative return = profit (price moving down)
@@ -144,34 +145,30 @@ Shows how Quick Winners, Quick Losers, and Chop/Drift groups perform.
 
 import pandas as pd
 import matplotlib.pyplot as plt
-import numpy as np
 from pathlib import Path
 
+from build_trajectory_cube import (
+    CUBE_FILE, PATH_GROUPS, cube_statistics, load_trajectory_cube,
+    main as build_cube_main
+)
+
 # Create output directory
 output_dir = Path('/home/ubuntu/path_dependency_visualizations')
 output_dir.mkdir(exist_ok=True)
 
-# Load data
-print("Loading data...")
-trajectory_df = pd.read_parquet('/home/ubuntu/ALL_trajectory_signalcount.parquet')
-path_df = pd.read_parquet('/home/ubuntu/path_dependency_results.parquet')
-
-# Merge path groups with trajectory data
-print("Merging path groups with trajectory data...")
-trajectory_df = trajectory_df.merge(
-    path_df[['Symbol', 'SignalIndex', 'SignalType', 'PathGroup']],
-    on=['Symbol', 'SignalIndex', 'SignalType'],
-    how='left'
-)
+# Load conditional trajectory cube (built once from the raw trajectory data)
+print("Loading conditional trajectory cube...")
+if not Path(CUBE_FILE).exists():
+    print("Cube not found, building it from trajectory data...")
+    build_cube_main()
+cube = load_trajectory_cube()
 
-print(f"Merged data shape: {trajectory_df.shape}")
-print(f"Path groups: {trajectory_df['PathGroup'].value_counts()}")
+print(f"Cube cells: {len(cube):,} ({cube['Count'].sum():,} trajectory rows)")
+print(f"Path groups: {cube[cube['Bar'] == 0].groupby('PathGroup')['Count'].sum().to_dict()}")
 
 def create_conditional_trajectory_chart(signal_type):
     """Create trajectory chart showing all 3 path groups for a signal type."""
     
-    data = trajectory_df[trajectory_df['SignalType'] == signal_type]
-    
     fig, ax = plt.subplots(figsize=(24, 16), dpi=300)
     
     colors = {
@@ -180,22 +177,15 @@ def create_conditional_trajectory_chart(signal_type):
         'Chop_Drift': '#1976D2'      # Blue
     }
     
-    for path_group in ['Quick_Winners', 'Quick_Losers', 'Chop_Drift']:
-        group_data = data[data['PathGroup'] == path_group]
-        
-        # Calculate statistics per bar
-        stats = group_data.groupby('Bar')['Return'].agg([
-            ('mean', 'mean'),
-            ('median', 'median'),
-            ('p80', lambda x: np.percentile(x, 80)),
-            ('p20', lambda x: np.percentile(x, 20))
-        ]).reset_index()
+    for path_group in PATH_GROUPS:
+        # Statistics per bar from the cube slice
+        stats = cube_statistics(cube, SignalType=signal_type, PathGroup=path_group)
         
         bars = stats['Bar'].values
-        mean_ret = stats['mean'].values
-        median_ret = stats['median'].values
-        p80 = stats['p80'].values
-        p20 = stats['p20'].values
+        mean_ret = stats['MeanReturn'].values
+        median_ret = stats['MedianReturn'].values
+        p80 = stats['P80'].values
+        p20 = stats['P20'].values
         
         color = colors[path_group]
         
@@ -232,42 +222,15 @@ def create_conditional_trajectory_chart(signal_type):
 def create_statistics_table(signal_type):
     """Create statistics table for each path group."""
     
-    data = trajectory_df[(trajectory_df['SignalType'] == signal_type) & (trajectory_df['Bar'] >= 1)]
-    
     results = []
     
-    for path_group in ['Quick_Winners', 'Quick_Losers', 'Chop_Drift']:
-        group_data = data[data['PathGroup'] == path_group]
-        
-        for bar in range(1, 31):
-            bar_data = group_data[group_data['Bar'] == bar]['Return']
-            
-            if len(bar_data) > 0:
-                prob_gain = 100 * (bar_data > 0).sum() / len(bar_data)
-                prob_loss = 100 * (bar_data < 0).sum() / len(bar_data)
-                mean_ret = bar_data.mean()
-                median_ret = bar_data.median()
-                p80 = np.percentile(bar_data, 80)
-                p20 = np.percentile(bar_data, 20)
-                
-                # Profit factor
-                gains = bar_data[bar_data > 0].sum()
-                losses = abs(bar_data[bar_data < 0].sum())
-                pf = gains / losses if losses > 0 else np.inf
-                
-                results.append({
-                    'PathGroup': path_group,
-                    'Bar': bar,
-                    'ProbGain': prob_gain,
-                    'ProbLoss': prob_loss,
-                    'MeanReturn': mean_ret,
-                    'MedianReturn': median_ret,
-                    'P80': p80,
-                    'P20': p20,
-                    'ProfitFactor': pf
-                })
+    for path_group in PATH_GROUPS:
+        stats = cube_statistics(cube, bars=range(1, 31), SignalType=signal_type, PathGroup=path_group)
+        stats.insert(0, 'PathGroup', path_group)
+        results.append(stats[['PathGroup', 'Bar', 'ProbGain', 'ProbLoss', 'MeanReturn',
+                              'MedianReturn', 'P80', 'P20', 'ProfitFactor']])
     
-    df = pd.DataFrame(results)
+    df = pd.concat(results, ignore_index=True)
     
     # Save to CSV
     output_path = output_dir / f'{signal_type}_PathGroup_Statistics.csv'
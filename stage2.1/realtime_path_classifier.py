@@ -0,0 +1,439 @@
+#!/usr/bin/env python3.11
+"""
+================================================================================
+QGSI REAL-TIME PATH CLASSIFIER - STAGE 2.1
+================================================================================
+
+PROGRAM NAME: realtime_path_classifier.py
+VERSION: 2.1 Production
+AUTHOR: Alex Bernal, Senior Quantitative Researcher
+DATE: January 2026
+PROJECT: QGSI Signal Research
+
+================================================================================
+PURPOSE:
+================================================================================
+Classify open signals into Quick Winners / Quick Losers / Chop-Drift while the
+minute bars arrive, instead of offline from the full trajectory table.
+
+Every open signal (any symbol, any direction) occupies one slot in a set of
+flat arrays (struct of arrays). Each minute batch of bars updates all open
+slots with a handful of vectorized operations, so the work per bar per open
+signal is O(1) and the per-batch latency is bounded by the number of open
+signals, not by history.
+
+================================================================================
+CLASSIFICATION RULES (identical to path_dependency_analysis.py):
+================================================================================
+- Return at bar k = (Close[k] - Close[0]) / Close[0] (raw, Stage 2 convention)
+- T_gain / T_loss: first bar (1..30) with Return >= +0.005 / <= -0.005
+- Quick_Winners: T_gain <= 5 and T_gain < T_loss (or no loss hit)
+- Quick_Losers:  T_loss <= 5 and T_loss < T_gain (or no gain hit)
+- Chop_Drift:    everything else
+
+The first threshold crossed within bars 1-5 fixes the group, so a transition
+is emitted on the bar of the crossing. Signals with no crossing by bar 5 are
+emitted as Chop_Drift on bar 5. Slots keep tracking T_gain, T_loss, MAE and
+MFE until bar 30 and are then retired.
+
+================================================================================
+USAGE:
+================================================================================
+Replay one session from the bar store:
+    python3.11 realtime_path_classifier.py --date 2025-06-02
+
+Latency benchmark (synthetic 400-symbol stream):
+    python3.11 realtime_path_classifier.py --benchmark --open_signals 500
+
+In a live loop:
+    classifier = RealtimePathClassifier(n_symbols=400)
+    for symbol_ids, closes, signals in minute_batches:
+        for event in classifier.update(symbol_ids, closes, signals):
+            ...
+
+================================================================================
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+GAIN_THRESHOLD = 0.005
+LOSS_THRESHOLD = -0.005
+EARLY_WINDOW = 5
+TRACK_BARS = 30
+INITIAL_CAPACITY = 1024
+
+PENDING, QUICK_WINNERS, QUICK_LOSERS, CHOP_DRIFT = 0, 1, 2, 3
+PATH_GROUP_NAMES = {QUICK_WINNERS: 'Quick_Winners', QUICK_LOSERS: 'Quick_Losers', CHOP_DRIFT: 'Chop_Drift'}
+
+TRANSITION_DTYPE = np.dtype([
+    ('SignalKey', np.int64),
+    ('SymbolId', np.int32),
+    ('Direction', np.int8),
+    ('Bar', np.int16),
+    ('PathGroup', np.int8),
+    ('Return', np.float64),
+])
+
+RETIRED_DTYPE = np.dtype([
+    ('SignalKey', np.int64),
+    ('SymbolId', np.int32),
+    ('Direction', np.int8),
+    ('PathGroup', np.int8),
+    ('T_gain', np.float64),
+    ('T_loss', np.float64),
+    ('MAE', np.float64),
+    ('MFE', np.float64),
+    ('FinalReturn', np.float64),
+])
+
+
+class RealtimePathClassifier:
+    """
+    Streaming first-passage tracker for all open signals.
+
+    Open slots are kept packed in [0, n_open); retired slots are removed with
+    one boolean compaction per batch.
+
+    Attributes:
+    -----------
+    n_open : int
+        Number of signals currently tracked
+    transitions : list
+        Optional sink: every emitted TRANSITION_DTYPE array is appended when
+        keep_history is True
+    retired : list
+        RETIRED_DTYPE arrays for signals that completed TRACK_BARS bars
+    """
+
+    FIELDS = {
+        'key': np.int64,
+        'symbol': np.int32,
+        'direction': np.int8,
+        'entry': np.float64,
+        'bars': np.int16,
+        'group': np.int8,
+        't_gain': np.float64,
+        't_loss': np.float64,
+        'mae': np.float64,
+        'mfe': np.float64,
+        'last_return': np.float64,
+    }
+
+    def __init__(self, n_symbols, capacity=INITIAL_CAPACITY, gain_threshold=GAIN_THRESHOLD,
+                 loss_threshold=LOSS_THRESHOLD, early_window=EARLY_WINDOW, track_bars=TRACK_BARS,
+                 keep_history=False):
+        self.n_symbols = n_symbols
+        self.gain_threshold = gain_threshold
+        self.loss_threshold = loss_threshold
+        self.early_window = early_window
+        self.track_bars = track_bars
+        self.keep_history = keep_history
+
+        self.n_open = 0
+        self.next_key = 0
+        self._capacity = 0
+        self._grow(capacity)
+
+        # Latest close per symbol and which symbols printed a bar in this batch
+        self.last_close = np.full(n_symbols, np.nan)
+        self._updated = np.zeros(n_symbols, dtype=bool)
+
+        self.transitions = []
+        self.retired = []
+
+    def _grow(self, capacity):
+        for name, dtype in self.FIELDS.items():
+            new = np.zeros(capacity, dtype=dtype)
+            if self._capacity:
+                new[:self.n_open] = getattr(self, name)[:self.n_open]
+            setattr(self, name, new)
+        self._capacity = capacity
+
+    def open_signals(self, symbol_ids, closes, directions):
+        """
+        Start tracking signals whose signal bar (Bar 0) just closed.
+
+        Returns:
+        --------
+        np.ndarray
+            Signal keys assigned to the new slots
+        """
+        symbol_ids = np.asarray(symbol_ids, dtype=np.int32)
+        m = len(symbol_ids)
+        if m == 0:
+            return np.empty(0, dtype=np.int64)
+        if self.n_open + m > self._capacity:
+            self._grow(max(2 * self._capacity, self.n_open + m))
+
+        s = slice(self.n_open, self.n_open + m)
+        keys = np.arange(self.next_key, self.next_key + m, dtype=np.int64)
+        self.key[s] = keys
+        self.symbol[s] = symbol_ids
+        self.direction[s] = directions
+        self.entry[s] = closes
+        self.bars[s] = 0
+        self.group[s] = PENDING
+        self.t_gain[s] = np.nan
+        self.t_loss[s] = np.nan
+        self.mae[s] = np.inf
+        self.mfe[s] = -np.inf
+        self.last_return[s] = 0.0
+
+        self.n_open += m
+        self.next_key += m
+        return keys
+
+    def update(self, symbol_ids, closes, signals=None):
+        """
+        Process one batch of bars (typically one minute across all symbols).
+
+        Open slots are advanced first; signals in this batch then open new
+        slots with this bar as Bar 0.
+
+        Parameters:
+        -----------
+        symbol_ids : np.ndarray
+            SymbolIds with a bar in this batch (each at most once)
+        closes : np.ndarray
+            Close of each bar
+        signals : np.ndarray, optional
+            Signal value of each bar (1 = Long, -1 = Short, 0 = none)
+
+        Returns:
+        --------
+        np.ndarray
+            TRANSITION_DTYPE records for every signal classified on this batch
+        """
+        symbol_ids = np.asarray(symbol_ids, dtype=np.int64)
+        closes = np.asarray(closes, dtype=np.float64)
+        transitions = self._advance(symbol_ids, closes)
+
+        if signals is not None:
+            signals = np.asarray(signals)
+            fired = (signals == 1) | (signals == -1)
+            if fired.any():
+                self.open_signals(symbol_ids[fired], closes[fired], signals[fired])
+
+        if self.keep_history and len(transitions):
+            self.transitions.append(transitions)
+        return transitions
+
+    def _advance(self, symbol_ids, closes):
+        n = self.n_open
+        self.last_close[symbol_ids] = closes
+        if n == 0:
+            return np.empty(0, dtype=TRANSITION_DTYPE)
+
+        self._updated[symbol_ids] = True
+        sym = self.symbol[:n]
+        live = self._updated[sym]
+        self._updated[symbol_ids] = False
+        if not live.any():
+            return np.empty(0, dtype=TRANSITION_DTYPE)
+
+        idx = np.flatnonzero(live)
+        bars = self.bars[idx] + 1
+        entry = self.entry[idx]
+        ret = (self.last_close[sym[idx]] - entry) / entry
+        self.bars[idx] = bars
+        self.last_return[idx] = ret
+        self.mae[idx] = np.minimum(self.mae[idx], ret)
+        self.mfe[idx] = np.maximum(self.mfe[idx], ret)
+
+        # First-passage times over the full tracking window
+        t_gain = self.t_gain[idx]
+        t_loss = self.t_loss[idx]
+        self.t_gain[idx] = np.where(np.isnan(t_gain) & (ret >= self.gain_threshold), bars, t_gain)
+        self.t_loss[idx] = np.where(np.isnan(t_loss) & (ret <= self.loss_threshold), bars, t_loss)
+
+        # Early-window classification: first crossing wins, no crossing by bar 5 -> Chop_Drift
+        pending = self.group[idx] == PENDING
+        group = np.full(len(idx), PENDING, dtype=np.int8)
+        group[pending & (ret >= self.gain_threshold)] = QUICK_WINNERS
+        group[pending & (ret <= self.loss_threshold)] = QUICK_LOSERS
+        group[pending & (group == PENDING) & (bars >= self.early_window)] = CHOP_DRIFT
+        changed = group != PENDING
+
+        transitions = np.empty(int(changed.sum()), dtype=TRANSITION_DTYPE)
+        if len(transitions):
+            slots = idx[changed]
+            self.group[slots] = group[changed]
+            transitions['SignalKey'] = self.key[slots]
+            transitions['SymbolId'] = self.symbol[slots]
+            transitions['Direction'] = self.direction[slots]
+            transitions['Bar'] = bars[changed]
+            transitions['PathGroup'] = group[changed]
+            transitions['Return'] = ret[changed]
+
+        done = bars >= self.track_bars
+        if done.any():
+            self._retire(idx[done])
+        return transitions
+
+    def _retire(self, slots):
+        records = np.empty(len(slots), dtype=RETIRED_DTYPE)
+        records['SignalKey'] = self.key[slots]
+        records['SymbolId'] = self.symbol[slots]
+        records['Direction'] = self.direction[slots]
+        records['PathGroup'] = self.group[slots]
+        records['T_gain'] = self.t_gain[slots]
+        records['T_loss'] = self.t_loss[slots]
+        records['MAE'] = self.mae[slots]
+        records['MFE'] = self.mfe[slots]
+        records['FinalReturn'] = self.last_return[slots]
+        self.retired.append(records)
+
+        n = self.n_open
+        keep = np.ones(n, dtype=bool)
+        keep[slots] = False
+        n_keep = int(keep.sum())
+        for name in self.FIELDS:
+            arr = getattr(self, name)
+            arr[:n_keep] = arr[:n][keep]
+        self.n_open = n_keep
+
+    def open_state(self):
+        """Snapshot of all open slots as a DataFrame."""
+        n = self.n_open
+        state = pd.DataFrame({name: getattr(self, name)[:n].copy() for name in self.FIELDS})
+        state['PathGroup'] = state['group'].map(PATH_GROUP_NAMES).fillna('Pending')
+        return state
+
+    def retired_frame(self):
+        """All retired signals as a DataFrame with PathGroup names."""
+        if not self.retired:
+            return pd.DataFrame(np.empty(0, dtype=RETIRED_DTYPE))
+        df = pd.DataFrame(np.concatenate(self.retired))
+        df['PathGroup'] = df['PathGroup'].map(PATH_GROUP_NAMES)
+        df['SignalType'] = np.where(df['Direction'] == 1, 'Long', 'Short')
+        return df
+
+
+def replay_session(store, date):
+    """
+    Minute batches for one session from the bar store, in timestamp order.
+
+    Yields:
+    -------
+    (timestamp, symbol_ids, closes, signals)
+    """
+    day_start = pd.Timestamp(date).value
+    day_end = (pd.Timestamp(date) + pd.Timedelta(days=1)).value
+
+    parts = []
+    for sid in range(store.n_symbols):
+        sl = store.symbol_slice(sid)
+        ts = store.timestamps[sl]
+        lo, hi = np.searchsorted(ts, [day_start, day_end])
+        if hi > lo:
+            rows = np.arange(sl.start + lo, sl.start + hi)
+            parts.append((np.asarray(store.timestamps[rows]), np.full(len(rows), sid, dtype=np.int32),
+                          np.asarray(store.close[rows]), np.asarray(store.signal[rows])))
+    if not parts:
+        return
+
+    ts, sids, closes, signals = (np.concatenate(col) for col in zip(*parts))
+    order = np.argsort(ts, kind='mergesort')
+    ts, sids, closes, signals = ts[order], sids[order], closes[order], signals[order]
+    minutes, starts = np.unique(ts, return_index=True)
+    ends = np.append(starts[1:], len(ts))
+    for minute, lo, hi in zip(minutes, starts, ends):
+        yield pd.Timestamp(minute), sids[lo:hi], closes[lo:hi], signals[lo:hi]
+
+
+def benchmark(n_symbols=400, n_minutes=2000, open_signals=500, seed=42):
+    """
+    Per-batch latency on a synthetic stream.
+
+    Every minute all n_symbols print a random-walk bar; the signal rate is set
+    so that about open_signals signals are open at any time.
+
+    Returns:
+    --------
+    dict
+        Latency percentiles (microseconds) and mean open signals
+    """
+    rng = np.random.default_rng(seed)
+    symbol_ids = np.arange(n_symbols)
+    closes = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.002, (n_minutes, n_symbols)), axis=0))
+    signal_prob = min(open_signals / (TRACK_BARS * n_symbols), 1.0)
+    fired = rng.random((n_minutes, n_symbols)) < signal_prob
+    signals = np.where(fired, rng.choice([1, -1], (n_minutes, n_symbols)), 0).astype(np.int8)
+
+    classifier = RealtimePathClassifier(n_symbols)
+    latencies = np.empty(n_minutes)
+    open_counts = np.empty(n_minutes)
+    n_transitions = 0
+    for t in range(n_minutes):
+        start = time.perf_counter()
+        events = classifier.update(symbol_ids, closes[t], signals[t])
+        latencies[t] = time.perf_counter() - start
+        open_counts[t] = classifier.n_open
+        n_transitions += len(events)
+
+    steady = latencies[TRACK_BARS:] * 1e6
+    return {
+        'MeanOpenSignals': open_counts[TRACK_BARS:].mean(),
+        'MaxOpenSignals': int(open_counts.max()),
+        'Transitions': n_transitions,
+        'P50_us': np.percentile(steady, 50),
+        'P99_us': np.percentile(steady, 99),
+        'Max_us': steady.max(),
+        'PerSignalBar_ns': 1e3 * steady.mean() / max(open_counts[TRACK_BARS:].mean(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='QGSI Stage 2.1 Real-Time Path Classifier')
+    parser.add_argument('--benchmark', action='store_true', help='Run the synthetic latency benchmark')
+    parser.add_argument('--open_signals', type=int, default=500, help='Target concurrent open signals (benchmark)')
+    parser.add_argument('--minutes', type=int, default=2000, help='Minutes to simulate (benchmark)')
+    parser.add_argument('--date', type=str, default=None, help='Session date to replay from the bar store')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("QGSI REAL-TIME PATH CLASSIFIER")
+    print("="*80)
+
+    if args.benchmark:
+        for target in sorted({100, args.open_signals, 4 * args.open_signals}):
+            result = benchmark(n_minutes=args.minutes, open_signals=target)
+            print(f"\nTarget open signals: {target}")
+            print(f"  Mean open: {result['MeanOpenSignals']:.0f}  Max open: {result['MaxOpenSignals']}  "
+                  f"Transitions: {result['Transitions']:,}")
+            print(f"  Batch latency: P50 {result['P50_us']:.1f} us  P99 {result['P99_us']:.1f} us  "
+                  f"Max {result['Max_us']:.1f} us  ({result['PerSignalBar_ns']:.0f} ns per signal-bar)")
+        return
+
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+    from bar_store import load_bar_store
+
+    store = load_bar_store()
+    date = args.date or pd.Timestamp(int(store.timestamps[0])).strftime('%Y-%m-%d')
+    classifier = RealtimePathClassifier(store.n_symbols, keep_history=True)
+    latencies = []
+    for _, symbol_ids, closes, signals in replay_session(store, date):
+        start = time.perf_counter()
+        classifier.update(symbol_ids, closes, signals)
+        latencies.append(time.perf_counter() - start)
+
+    if not latencies:
+        print(f"\nNo bars on {date}")
+        return
+    latencies = np.array(latencies) * 1e6
+    print(f"\nReplayed {date}: {len(latencies)} minute batches, {classifier.next_key:,} signals")
+    print(f"  Batch latency: P50 {np.percentile(latencies, 50):.1f} us  P99 {np.percentile(latencies, 99):.1f} us")
+
+    retired = classifier.retired_frame()
+    if len(retired):
+        print("\nPath group distribution (signals tracked 30 bars):")
+        print(retired.groupby(['SignalType', 'PathGroup']).size().to_string())
+
+
+if __name__ == '__main__':
+    main()
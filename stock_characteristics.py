@@ -0,0 +1,268 @@
+#!/usr/bin/env python3.11
+"""
+Stock Characteristics Engine
+Per-symbol trading characteristics, liquidity / market-cap tiers and
+category performance for Part III Section B
+
+Every function works on whole frames: per-symbol metrics come from one
+stable sort of the trade log into contiguous symbol slices, tiers are
+assigned with np.select over threshold masks, and category tables for LONG
+and SHORT are built by a single groupby over (Strategy, category) instead
+of per-symbol or per-category filtering.
+"""
+
+import numpy as np
+import pandas as pd
+
+from TradingCostEstimate.src.transaction_cost_estimator import TransactionCostEstimator
+from TradingCostEstimate.src.symbol_data_repository import DEFAULT_SYMBOL_DATA
+
+TRADING_DAYS_PER_YEAR = 252
+VOLUME_MULTIPLE = 50  # assume each position is ~2% of daily dollar volume
+MAX_PARTICIPATION = 0.05  # capacity limit: 5% of daily dollar volume per position
+
+LIQUIDITY_TIERS = [
+    (100, 'Tier 1 (Very Liquid)'),
+    (50, 'Tier 2 (Liquid)'),
+    (20, 'Tier 3 (Moderate)'),
+    (10, 'Tier 4 (Illiquid)'),
+]
+LIQUIDITY_TIER_DEFAULT = 'Tier 5 (Very Illiquid)'
+
+# 7-tier scale on estimated daily dollar volume (lower bound, label)
+LIQUIDITY_TIERS_7 = [
+    (1_000_000_000, 'Very High'),
+    (100_000_000, 'High'),
+    (50_000_000, 'Medium-High'),
+    (10_000_000, 'Medium'),
+    (5_000_000, 'Medium-Low'),
+    (1_000_000, 'Low'),
+]
+LIQUIDITY_TIER_7_DEFAULT = 'Very Low'
+LIQUIDITY_TIER_7_ORDER = [label for _, label in LIQUIDITY_TIERS_7] + [LIQUIDITY_TIER_7_DEFAULT]
+
+CATEGORY_COLUMNS = ['Num_Symbols', 'Total_PnL', 'Avg_PnL_Per_Trade', 'Total_Trades',
+                    'Avg_Liquidity_Score', 'Avg_Market_Impact', 'Avg_Volatility', 'Win_Rate', 'Strategy']
+
+
+def calculate_stock_metrics(trades_df, symbols=None):
+    """
+    Per-symbol price, position value, volatility and trade frequency.
+
+    Trade counts and trading days are grouped aggregations over the
+    symbol-sorted log. Means and volatility are summed per contiguous slice
+    instead: groupby().agg uses compensated summation and np.add.reduceat
+    sums sequentially, and both differ from Series.mean / Series.std in the
+    last bit for about half of the symbols. That bit matters because
+    Liquidity_Score = (V × VOLUME_MULTIPLE) / V sits exactly on the Tier 2
+    boundary, and Volatility_Ann is written to the Section B CSVs at full
+    precision, so only NumPy's pairwise per-slice sums keep the B.1-B.9
+    outputs identical.
+
+    Parameters:
+    -----------
+    trades_df : pd.DataFrame
+        Trade log with Symbol, EntryPrice, ExitPrice, Shares and either
+        EntryValue or (EntryPrice × Shares); Date is derived from EntryTime
+        if missing
+    symbols : array-like, optional
+        Symbols to report, in output order (default: all traded symbols)
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per symbol
+    """
+    if 'Date' in trades_df.columns:
+        dates = trades_df['Date']
+    else:
+        dates = pd.to_datetime(trades_df['EntryTime']).dt.date
+    if 'EntryValue' in trades_df.columns:
+        position_value = trades_df['EntryValue']
+    else:
+        position_value = trades_df['EntryPrice'] * trades_df['Shares']
+
+    # Stable sort by symbol: each symbol becomes one contiguous slice, in trade-log order
+    symbol_values = trades_df['Symbol'].to_numpy()
+    order = np.argsort(symbol_values, kind='stable')
+    sorted_symbols = symbol_values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_symbols[1:] != sorted_symbols[:-1]]) if len(order) else order
+    ends = np.r_[starts[1:], len(order)].astype(np.int64)
+    counts = ends - starts
+
+    price = trades_df['EntryPrice'].to_numpy(dtype=np.float64)[order]
+    value = position_value.to_numpy(dtype=np.float64)[order]
+    change = (trades_df['ExitPrice'] / trades_df['EntryPrice'] - 1).to_numpy(dtype=np.float64)[order]
+
+    # Per-slice sums keep NumPy's pairwise summation (see docstring)
+    avg_price = np.array([price[s:e].sum() / (e - s) for s, e in zip(starts, ends)])
+    avg_value = np.array([value[s:e].sum() / (e - s) for s, e in zip(starts, ends)])
+    volatility = np.zeros(len(starts))
+    for k in np.flatnonzero(counts > 1):
+        x = change[starts[k]:ends[k]]
+        volatility[k] = np.sqrt(((x.sum() / len(x) - x) ** 2).sum() / (len(x) - 1))
+    volatility *= np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    trading_days = pd.Series(dates.to_numpy()[order]).groupby(
+        np.repeat(np.arange(len(starts)), counts)).nunique().to_numpy()
+
+    metrics = pd.DataFrame({
+        'Avg_Price': avg_price,
+        'Avg_Position_Value': avg_value,
+        'Volatility_Ann': volatility * 100,
+        'Total_Trades': counts,
+        'Trading_Days': trading_days,
+    }, index=pd.Index(sorted_symbols[starts], name='Symbol'))
+    if symbols is not None:
+        metrics = metrics.reindex(pd.unique(np.asarray(symbols)))
+
+    # Untraded symbols report no trades and zero volatility
+    total = metrics['Total_Trades'].fillna(0).astype(np.int64).to_numpy()
+    days = metrics['Trading_Days'].fillna(0).astype(np.int64).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        trades_per_day = np.where(days > 0, total / days, 0)
+
+    return pd.DataFrame({
+        'Symbol': metrics.index,
+        'Avg_Price': metrics['Avg_Price'].to_numpy(),
+        'Avg_Position_Value': metrics['Avg_Position_Value'].to_numpy(),
+        'Volatility_Ann': metrics['Volatility_Ann'].fillna(0).to_numpy(),
+        'Total_Trades': total,
+        'Trading_Days': days,
+        'Trades_Per_Day': trades_per_day,
+    })
+
+
+def _select_tier(values, tiers, default, inclusive=False):
+    """Label of the first (threshold, label) whose threshold the value exceeds."""
+    values = np.asarray(values, dtype=np.float64)
+    conditions = [(values >= bound) if inclusive else (values > bound) for bound, _ in tiers]
+    return np.select(conditions, [label for _, label in tiers], default=default)
+
+
+def estimate_liquidity(stock_metrics):
+    """
+    Estimated daily volume, liquidity score, tier and market impact.
+
+    Volume is not available, so daily dollar volume is assumed to be
+    VOLUME_MULTIPLE × the average position value.
+    """
+    position_value = stock_metrics['Avg_Position_Value'].to_numpy(dtype=np.float64)
+    estimated_daily_volume = position_value * VOLUME_MULTIPLE
+    with np.errstate(divide='ignore', invalid='ignore'):
+        liquidity_score = np.where(position_value > 0, estimated_daily_volume / position_value, 0)
+        market_impact = np.where(estimated_daily_volume > 0, position_value / estimated_daily_volume * 100, 0)
+    return pd.DataFrame({
+        'Estimated_Daily_Volume': estimated_daily_volume,
+        'Liquidity_Score': liquidity_score,
+        'Liquidity_Tier': _select_tier(liquidity_score, LIQUIDITY_TIERS, LIQUIDITY_TIER_DEFAULT),
+        'Market_Impact_Est': market_impact,
+    }, index=stock_metrics.index)
+
+
+def estimate_market_cap_tier(stock_metrics):
+    """Market cap tier from average price and liquidity score (higher both = larger cap)."""
+    price = stock_metrics['Avg_Price'].to_numpy(dtype=np.float64)
+    score = stock_metrics['Liquidity_Score'].to_numpy(dtype=np.float64)
+    conditions = [
+        (price > 200) & (score > 50),
+        (price > 100) & (score > 30),
+        (price > 50) | (score > 20),
+        price > 20,
+        price > 5,
+    ]
+    labels = ['Mega-cap ($200B+)', 'Large-cap ($10B-$200B)', 'Mid-cap ($2B-$10B)',
+              'Small-cap ($300M-$2B)', 'Micro-cap ($50M-$300M)']
+    return np.select(conditions, labels, default='Nano-cap (<$50M)')
+
+
+def assign_liquidity_tier_7(scores):
+    """7-tier liquidity label for each score (estimated daily dollar volume)."""
+    return _select_tier(scores, LIQUIDITY_TIERS_7, LIQUIDITY_TIER_7_DEFAULT, inclusive=True)
+
+
+def analyze_by_category(full, trades, category_col):
+    """
+    Performance by category for every strategy at once.
+
+    Parameters:
+    -----------
+    full : pd.DataFrame
+        Symbol characteristics and performance with a Strategy column
+    trades : pd.DataFrame
+        Trade log with Strategy, Symbol and NetProfit
+    category_col : str
+        Column of `full` to group by
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per (Strategy, category), columns [category_col] + CATEGORY_COLUMNS
+    """
+    keys = ['Strategy', category_col]
+    grouped = full.groupby(keys).agg(
+        Num_Symbols=('Symbol', 'count'),
+        Total_PnL=('Total_PnL', 'sum'),
+        Avg_PnL_Per_Trade=('Avg_PnL', 'mean'),
+        Total_Trades=('Trade_Count', 'sum'),
+        Avg_Liquidity_Score=('Liquidity_Score', 'mean'),
+        Avg_Market_Impact=('Market_Impact_Est', 'mean'),
+        Avg_Volatility=('Volatility_Ann', 'mean'),
+    )
+
+    # Win rate over the trades of each category's symbols
+    tagged = trades[['Strategy', 'Symbol', 'NetProfit']].merge(
+        full[['Strategy', 'Symbol', category_col]], on=['Strategy', 'Symbol'])
+    wins = (tagged['NetProfit'] > 0).groupby([tagged['Strategy'], tagged[category_col]]).mean() * 100
+    grouped['Win_Rate'] = wins.reindex(grouped.index).fillna(0).to_numpy()
+
+    result = grouped.reset_index()
+    return result[[category_col] + CATEGORY_COLUMNS]
+
+
+def split_by_strategy(table, strategy):
+    """Rows of a multi-strategy table for one strategy, re-indexed from 0."""
+    return table[table['Strategy'] == strategy].reset_index(drop=True)
+
+
+def impact_aware_capacity(full, direction=1, max_participation=MAX_PARTICIPATION, estimator=None):
+    """
+    Net-P&L-maximizing position value per symbol under square-root impact.
+
+    Uses TransactionCostEstimator.size_positions for all symbols at once,
+    with the realized edge Avg_PnL / Avg_Position_Value (trade P&L is
+    already net of charged costs, so this is conservative), the estimated
+    daily dollar volume as ADV, the per-trade return volatility
+    (Volatility_Ann de-annualized) and the repository default spread and
+    impact coefficient. Positions are capped at max_participation × ADV.
+
+    Returns:
+    --------
+    pd.DataFrame
+        Optimal_Position_Value, Optimal_Impact_bps (per leg), Optimal_Net_PnL
+        (expected round trip) and Capacity_Binding ('edge', 'max_value' or
+        'no_edge'), indexed like `full`
+    """
+    estimator = estimator if estimator is not None else TransactionCostEstimator()
+    adv = full['Estimated_Daily_Volume'].to_numpy(dtype=np.float64)
+    position_value = full['Avg_Position_Value'].to_numpy(dtype=np.float64)
+    n = len(full)
+    symbol_params = {
+        'avg_relative_spread': np.full(n, DEFAULT_SYMBOL_DATA['avg_relative_spread']),
+        'avg_daily_dollar_volume': np.where(adv > 0, adv, np.nan),
+        'daily_volatility': full['Volatility_Ann'].to_numpy(dtype=np.float64) / 100 / np.sqrt(TRADING_DAYS_PER_YEAR),
+        'impact_coefficient': np.full(n, DEFAULT_SYMBOL_DATA['impact_coefficient']),
+    }
+    with np.errstate(divide='ignore', invalid='ignore'):
+        edge = np.where(position_value > 0, full['Avg_PnL'].to_numpy(dtype=np.float64) / position_value, 0.0)
+
+    sizing = estimator.size_positions(
+        full['Avg_Price'].to_numpy(dtype=np.float64), None, symbol_params, edge, direction,
+        max_value=np.nan_to_num(adv * max_participation)
+    )
+    return pd.DataFrame({
+        'Optimal_Position_Value': sizing['trade_value'],
+        'Optimal_Impact_bps': sizing['impact_bps'],
+        'Optimal_Net_PnL': sizing['expected_net_pnl'],
+        'Capacity_Binding': sizing['binding'],
+    }, index=full.index)
@@ -0,0 +1,584 @@
+#!/usr/bin/env python3.11
+"""
+Vectorized Strategy Sweep Engine
+Fixed ATR (symmetric / asymmetric) and ATR trailing stop sweeps over every
+signal in the local bar store, gross and net of transaction costs
+
+The forward bars of every signal are gathered once into (signals ×
+max_bars) High / Low / Close matrices (see bar_store.py); each parameter
+combination is then a handful of array comparisons and an argmax for the
+first exit bar, with no per-trade Python loop and no trade dicts.
+
+Exit rules match the Stage 4 processors (e.g.
+fixed_atr_symmetric_short_processor.py, atr_trailing_stop_short_processor.py):
+- Entry at the signal bar close, position size POSITION_SIZE
+- Fixed ATR: stop checked before target on each bar, target exit at the level
+- Trailing ATR: the stop tightens to High + m·ATR (short) / Low - m·ATR
+  (long) and never loosens
+- Stop fills follow a StopFill policy: 'stop' fills at the stop level like
+  the processors; 'gap' (default) fills at the worse of the bar open and
+  the stop, so a bar that opens through the stop fills at the open; either
+  can add adverse slippage in ATRs or basis points. The policy only touches
+  each trade's exit bar, so realistic fills cost no extra matrix work
+- Otherwise exit at the close of bar max_bars (or the symbol's last bar)
+- ATR is the rolling mean of the true range; signals without an entry ATR
+  are skipped
+- Optional session handling (SignalWindows session_mode): 'clip' ends
+  every window at the last bar of the entry's session, so no exit is filled
+  across an overnight gap, and a trade still open there exits at that bar's
+  close (reason EOD); 'eod' additionally goes flat eod_buffer_bars before
+  the session's last bar and skips signals inside that buffer
+
+Costs (SweepCostModel) come from TradingCostEstimate, with the per-symbol
+parameters of cost_calibration.py when they exist: the entry leg depends
+only on the signal, so it is costed once; each combination only costs its
+exit fills and subtracts both legs from the P&L array, so net metrics sit
+next to the gross ones (Net_* columns) at a small overhead.
+run_cost_sensitivity re-prices every combination under a grid of spread
+and impact assumptions from decomposed cost components.
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from bar_store import BAR_STORE_DIR, load_bar_store
+from cost_calibration import COST_PARAMETERS_FILE, load_symbol_repository
+from TradingCostEstimate.src.transaction_cost_estimator import TransactionCostEstimator
+from TradingCostEstimate.src.symbol_data_repository import SymbolDataRepository
+from TradingCostEstimate.src.cost_sensitivity import (
+    BASELINE_SCENARIO, DEFAULT_IMPACT_COEFFICIENTS, DEFAULT_IMPACT_EXPONENTS, DEFAULT_SPREAD_MULTIPLIERS,
+    cost_sensitivity_surface, decompose_costs, rank_scenarios)
+
+POSITION_SIZE = 100000.0
+ATR_PERIODS = [14, 20, 30, 50]
+MULTIPLIERS = [1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0]
+MAX_BARS_FIXED = 30
+MAX_BARS_TRAILING = 20
+TRAILING_ATR_PERIOD = 30
+
+EXIT_TIME, EXIT_STOP, EXIT_TARGET, EXIT_EOD = 0, 1, 2, 3
+EXIT_REASONS = np.array(['TIME', 'STOP', 'TARGET', 'EOD'])
+SESSION_MODES = (None, 'clip', 'eod')
+EOD_BUFFER_BARS = 5  # 'eod' mode: flat this many bars before the session's last bar
+
+SESSION_MODE = None  # main(): None (legacy windows), 'clip' or 'eod'
+
+STOP_FILL_POLICIES = ('stop', 'gap')
+STOP_FILL_POLICY = 'gap'  # 'stop' = exit at the stop level (Stage 4 processors)
+STOP_SLIPPAGE_ATR = 0.0   # main(): adverse stop slippage in entry ATRs
+STOP_SLIPPAGE_BPS = 0.0   # main(): adverse stop slippage in basis points
+
+COST_FIELDS = ('avg_relative_spread', 'avg_daily_dollar_volume', 'daily_volatility', 'impact_coefficient')
+
+OUTPUT_DIR = Path('/home/ubuntu/stage4_optimization')
+
+
+def rolling_atr(high, low, close, period):
+    """Rolling-mean ATR of one symbol (true range of the first bar = High - Low)."""
+    prev_close = np.r_[np.nan, close[:-1]]
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return pd.Series(tr).rolling(window=period).mean().to_numpy()
+
+
+class SignalWindows:
+    """
+    Forward bars of every signal of one direction, gathered once per sweep.
+
+    Attributes:
+    -----------
+    direction : int
+        1 = Long, -1 = Short
+    symbol_id, bar_index : np.ndarray
+        SymbolId and global bar row of each signal
+    entry_price : np.ndarray
+        Signal bar close
+    open, high, low, close : np.ndarray
+        (signals × max_bars) bars after the entry; columns past the symbol's
+        last bar repeat it and are masked by `valid`
+    valid : np.ndarray
+        (signals × max_bars) bool, bar exists (and, with a session mode, is
+        inside the entry's session window)
+    n_bars : np.ndarray
+        Valid forward bars per signal
+    session_cut : np.ndarray
+        Bool per signal, the window was shortened by the session boundary
+        (time exits of these trades are EOD exits)
+    entry_atr : dict
+        ATR period → entry ATR per signal
+    window_atr : dict
+        ATR period → (signals × max_bars) ATR on the forward bars
+    """
+
+    def __init__(self, store, direction=-1, max_bars=MAX_BARS_FIXED, atr_periods=ATR_PERIODS,
+                 window_atr_periods=(), symbols=None, session_mode=None, eod_buffer_bars=EOD_BUFFER_BARS):
+        if session_mode not in SESSION_MODES:
+            raise ValueError(f"Unknown session_mode '{session_mode}', expected one of {SESSION_MODES}")
+        signals = store.load_signal_index()
+        signals = signals[signals['Direction'] == direction]
+        if symbols is not None:
+            signals = signals[signals['Symbol'].isin(symbols)]
+
+        last_bar = store.offsets[signals['SymbolId'].to_numpy(dtype=np.int64) + 1] - 1
+        if session_mode is not None:
+            # Last bar a trade may hold: the session close, or the buffer before it
+            _, session_last = store.session_bounds(signals['BarIndex'].to_numpy(dtype=np.int64))
+            if session_mode == 'eod':
+                session_last = session_last - eod_buffer_bars
+                inside = signals['BarIndex'].to_numpy() < session_last
+                signals, last_bar, session_last = signals[inside], last_bar[inside], session_last[inside]
+            last_bar = np.minimum(last_bar, session_last)
+
+        self.direction = direction
+        self.max_bars = max_bars
+        self.session_mode = session_mode
+        self.symbol_id = signals['SymbolId'].to_numpy(dtype=np.int64)
+        self.bar_index = signals['BarIndex'].to_numpy(dtype=np.int64)
+        self.timestamp = signals['Timestamp'].to_numpy()
+
+        # Window boundary as one vectorized mask: bars past the symbol's last
+        # bar (or the session limit) repeat it and are masked out
+        rows = self.bar_index[:, None] + np.arange(1, max_bars + 1)[None, :]
+        self.valid = rows <= last_bar[:, None]
+        rows = np.minimum(rows, last_bar[:, None])
+        self.n_bars = self.valid.sum(axis=1)
+        symbol_last = store.offsets[self.symbol_id + 1] - 1
+        self.session_cut = (self.n_bars < max_bars) & (last_bar < symbol_last)
+
+        self.entry_price = np.asarray(store.close)[self.bar_index]
+        self.open = np.asarray(store.open)[rows]
+        self.high = np.asarray(store.high)[rows]
+        self.low = np.asarray(store.low)[rows]
+        self.close = np.asarray(store.close)[rows]
+
+        # ATR per symbol (rolling windows must not cross symbols), gathered at
+        # the entry bars and, for trailing stops, at the forward bars
+        self.entry_atr = {p: np.full(len(self.bar_index), np.nan) for p in atr_periods}
+        self.window_atr = {p: np.full(rows.shape, np.nan) for p in window_atr_periods}
+        periods = sorted(set(atr_periods) | set(window_atr_periods))
+        symbol_ids, starts = np.unique(self.symbol_id, return_index=True)
+        ends = np.r_[starts[1:], len(self.symbol_id)]
+        for sid, a, b in zip(symbol_ids, starts, ends):
+            sl = store.symbol_slice(int(sid))
+            h, l, c = (np.asarray(getattr(store, col)[sl]) for col in ('high', 'low', 'close'))
+            for period in periods:
+                atr = rolling_atr(h, l, c, period)
+                if period in self.entry_atr:
+                    self.entry_atr[period][a:b] = atr[self.bar_index[a:b] - sl.start]
+                if period in self.window_atr:
+                    self.window_atr[period][a:b] = atr[rows[a:b] - sl.start]
+
+    def __len__(self):
+        return len(self.bar_index)
+
+    @property
+    def last_close(self):
+        """Close of the last valid forward bar (entry close if there is none)."""
+        last = np.maximum(self.n_bars - 1, 0)
+        return np.where(self.n_bars > 0, self.close[np.arange(len(self)), last], self.entry_price)
+
+
+class StopFill:
+    """
+    Fill price policy of stop exits.
+
+    Parameters:
+    -----------
+    policy : str
+        'stop' fills at the stop level; 'gap' fills at the worse of the
+        exit bar's open and the stop level
+    slippage_atr : float
+        Adverse slippage in entry ATRs
+    slippage_bps : float
+        Adverse slippage in basis points of the fill price
+    """
+
+    def __init__(self, policy=STOP_FILL_POLICY, slippage_atr=0.0, slippage_bps=0.0):
+        if policy not in STOP_FILL_POLICIES:
+            raise ValueError(f"Unknown stop fill policy '{policy}', expected one of {STOP_FILL_POLICIES}")
+        self.policy = policy
+        self.slippage_atr = slippage_atr
+        self.slippage_bps = slippage_bps
+
+    def __call__(self, windows, level, first, entry_atr):
+        """Fill prices of stops at `level` triggered on forward bar `first` (one per signal)."""
+        d = windows.direction
+        price = level
+        if self.policy == 'gap':
+            bar_open = windows.open[np.arange(len(level)), first]
+            price = np.maximum(bar_open, level) if d == -1 else np.minimum(bar_open, level)
+        if self.slippage_atr or self.slippage_bps:
+            price = price - d * (self.slippage_atr * entry_atr + self.slippage_bps / 10000 * price)
+        return price
+
+    def __repr__(self):
+        return (f"StopFill('{self.policy}', slippage_atr={self.slippage_atr}, "
+                f"slippage_bps={self.slippage_bps})")
+
+
+def _first_exit(hit, windows):
+    """Column of the first True per row, and whether any bar exited."""
+    hit &= windows.valid
+    exited = hit.any(axis=1)
+    return hit.argmax(axis=1), exited
+
+
+def _time_exit_reason(windows):
+    """EOD for windows cut at the session boundary, TIME otherwise."""
+    return np.where(windows.session_cut, EXIT_EOD, EXIT_TIME)
+
+
+def fixed_atr_kernel(windows, entry_atr, stop_mult, target_mult, stop_fill=None):
+    """
+    Fixed stop / target exits for every signal.
+
+    stop_fill (StopFill, default StopFill()) prices the stop exits; targets
+    fill at the target level.
+
+    Returns:
+    --------
+    tuple
+        (exit_price, bars_in_trade, exit_reason code) arrays; codes index EXIT_REASONS
+    """
+    entry = windows.entry_price
+    d = windows.direction
+    stop = entry - d * stop_mult * entry_atr
+    target = entry + d * target_mult * entry_atr
+    if d == -1:
+        stop_hit = windows.high >= stop[:, None]
+        target_hit = windows.low <= target[:, None]
+    else:
+        stop_hit = windows.low <= stop[:, None]
+        target_hit = windows.high >= target[:, None]
+
+    first, exited = _first_exit(stop_hit | target_hit, windows)
+    rows = np.arange(len(entry))
+    is_stop = stop_hit[rows, first]
+    stop_price = (stop_fill or StopFill())(windows, stop, first, entry_atr)
+    exit_price = np.where(exited, np.where(is_stop, stop_price, target), windows.last_close)
+    reason = np.where(exited, np.where(is_stop, EXIT_STOP, EXIT_TARGET), _time_exit_reason(windows))
+    bars = np.where(exited, first + 1, windows.n_bars)
+    return exit_price, bars, reason
+
+
+def trailing_atr_kernel(windows, entry_atr, window_atr, multiplier, stop_fill=None):
+    """
+    ATR trailing stop exits for every signal.
+
+    The stop path is a running min (short) / max (long) of the initial stop
+    and each bar's High + m·ATR / Low - m·ATR, bars without ATR skipped.
+    Exits are priced by stop_fill (StopFill, default StopFill()) at the
+    stop level of the exit bar.
+    """
+    entry = windows.entry_price
+    d = windows.direction
+    initial = entry - d * multiplier * entry_atr
+    has_atr = ~np.isnan(window_atr) & (window_atr > 0)
+    if d == -1:
+        candidate = np.where(has_atr, windows.high + multiplier * window_atr, np.inf)
+        stop_path = np.minimum(np.minimum.accumulate(candidate, axis=1), initial[:, None])
+        hit = windows.high >= stop_path
+    else:
+        candidate = np.where(has_atr, windows.low - multiplier * window_atr, -np.inf)
+        stop_path = np.maximum(np.maximum.accumulate(candidate, axis=1), initial[:, None])
+        hit = windows.low <= stop_path
+
+    first, exited = _first_exit(hit, windows)
+    rows = np.arange(len(entry))
+    stop_price = (stop_fill or StopFill())(windows, stop_path[rows, first], first, entry_atr)
+    exit_price = np.where(exited, stop_price, windows.last_close)
+    reason = np.where(exited, EXIT_STOP, _time_exit_reason(windows))
+    bars = np.where(exited, first + 1, windows.n_bars)
+    return exit_price, bars, reason
+
+
+class SweepCostModel:
+    """
+    Round-trip transaction costs for sweep fills.
+
+    Wraps TransactionCostEstimator.calculate_cost_components. Signals in a
+    sweep overlap and are not one account, so commissions use the marginal
+    tier rate at the estimator's current monthly volume rather than a
+    running volume.
+
+    Parameters:
+    -----------
+    symbols : array-like
+        Symbol name of each SymbolId (e.g. store.symbols)
+    estimator : TransactionCostEstimator, optional
+        Fee schedule (default: IBKR tiered)
+    symbol_repo : SymbolDataRepository, optional
+        Spread / ADV / volatility per symbol (default: repository defaults;
+        see cost_calibration.py)
+    removes_liquidity : bool
+        Whether fills remove liquidity
+    impact_model : str
+        Market impact model
+    """
+
+    def __init__(self, symbols, estimator=None, symbol_repo=None, removes_liquidity=True,
+                 impact_model='square_root'):
+        self.estimator = estimator if estimator is not None else TransactionCostEstimator()
+        repo = symbol_repo if symbol_repo is not None else SymbolDataRepository()
+        self.symbol_params = repo.take(repo.get_ids(np.asarray(symbols)), COST_FIELDS)
+        self.removes_liquidity = removes_liquidity
+        self.impact_model = impact_model
+
+    def leg_costs(self, shares, price, symbol_id, is_sell):
+        """Cost component arrays of one fill per trade."""
+        return self.estimator.calculate_cost_components(
+            shares, price, np.where(is_sell, -1, 1), symbol_id, self.symbol_params,
+            self.removes_liquidity, self.impact_model)
+
+    def exit_cost_function(self, shares, symbol_id, is_sell):
+        """Total cost of closing fixed positions, as a function of exit price."""
+        return self.estimator.order_cost_function(
+            shares, np.where(is_sell, -1, 1), symbol_id, self.symbol_params,
+            self.removes_liquidity, self.impact_model)
+
+
+def performance_metrics(pnl, bars=None, prefix=''):
+    """
+    Stage 4 performance metrics from a P&L array.
+
+    Same definitions as calculate_performance_metrics in the processors
+    (ProfitFactor 10.0 when there are no losses, SystemScore = NetProfit ×
+    ProfitFactor).
+    """
+    n = len(pnl)
+    n_wins = np.count_nonzero(pnl > 0)
+    n_losses = np.count_nonzero(pnl < 0)
+    total_profit = np.maximum(pnl, 0.0).sum() if n_wins else 0.0
+    total_loss = abs(np.minimum(pnl, 0.0).sum()) if n_losses else 0.0
+    net_profit = pnl.sum() if n else 0.0
+    profit_factor = total_profit / total_loss if total_loss > 0 else (10.0 if total_profit > 0 else 0.0)
+    avg_win = total_profit / n_wins if n_wins else 0.0
+    avg_loss = total_loss / n_losses if n_losses else 0.0
+
+    metrics = {
+        'TotalTrades': n,
+        'WinningTrades': n_wins,
+        'LosingTrades': n_losses,
+        'WinRate': n_wins / n if n else 0.0,
+        'TotalProfit': total_profit,
+        'TotalLoss': total_loss,
+        'NetProfit': net_profit,
+        'ProfitFactor': profit_factor,
+        'AvgWin': avg_win,
+        'AvgLoss': avg_loss,
+        'AvgWinLossRatio': avg_win / avg_loss if avg_loss > 0 else 0.0,
+        'SystemScore': net_profit * profit_factor,
+    }
+    if bars is not None:
+        metrics['AvgBarsInTrade'] = bars.mean() if n else 0.0
+    return {prefix + key: value for key, value in metrics.items()}
+
+
+def run_sweep(windows, strategy='fixed_atr', atr_periods=ATR_PERIODS, stop_multipliers=MULTIPLIERS,
+              target_multipliers=None, cost_model=None, position_size=POSITION_SIZE, stop_fill=None):
+    """
+    Gross (and net) metrics for every parameter combination.
+
+    Parameters:
+    -----------
+    windows : SignalWindows
+        Gathered signals (window_atr must hold the periods for 'trailing_atr')
+    strategy : str
+        'fixed_atr' or 'trailing_atr'
+    atr_periods : list
+        ATR periods to sweep
+    stop_multipliers : list
+        Stop (or trailing) multipliers
+    target_multipliers : list, optional
+        Target multipliers for fixed_atr; None = symmetric (target = stop)
+    cost_model : SweepCostModel, optional
+        Adds Net_* metrics and cost totals when given
+    position_size : float
+        Dollars per trade
+    stop_fill : StopFill, optional
+        Stop fill policy (default StopFill(): worse of open and stop)
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per combination, ranked by gross SystemScore (Rank) and, with
+        costs, by net SystemScore (Net_Rank)
+    """
+    d = windows.direction
+    shares_all = position_size / windows.entry_price
+
+    if cost_model is not None:
+        # Entry leg: same fill for every combination
+        entry_cost_all = cost_model.leg_costs(shares_all, windows.entry_price, windows.symbol_id,
+                                              is_sell=np.full(len(windows), d == -1))['total_cost']
+
+    results = []
+    for period, tradable, sub, combos in _period_subsets(windows, strategy, atr_periods, stop_multipliers,
+                                                         target_multipliers):
+        shares = shares_all[tradable]
+        if cost_model is not None:
+            entry_cost = entry_cost_all[tradable]
+            # Exit fills differ per combination only in price
+            exit_cost = cost_model.exit_cost_function(shares, sub.symbol_id, is_sell=np.full(len(shares), d == 1))
+
+        for row in combos:
+            exit_price, bars, reason = _run_kernel(strategy, sub, period, row, stop_fill)
+            gross = (exit_price - sub.entry_price) * shares * d
+            row.update(performance_metrics(gross, bars))
+            if cost_model is not None:
+                cost = entry_cost + exit_cost(exit_price)
+                row.update(performance_metrics(gross - cost, prefix='Net_'))
+                row['TotalCost'] = cost.sum()
+                row['AvgCost_bps'] = cost.mean() / position_size * 10000 if len(cost) else 0.0
+            results.append(row)
+
+    table = pd.DataFrame(results)
+    table = table.sort_values('SystemScore', ascending=False).reset_index(drop=True)
+    table.insert(0, 'Rank', range(1, len(table) + 1))
+    if cost_model is not None:
+        table['Net_Rank'] = table['Net_SystemScore'].rank(ascending=False, method='first').astype(int)
+    return table
+
+
+def _period_subsets(windows, strategy, atr_periods, stop_multipliers, target_multipliers):
+    """
+    Tradable signals and parameter rows of each ATR period.
+
+    Yields (period, tradable mask, SignalWindows subset, list of row dicts
+    holding ATRPeriod, StopMultiplier and, for fixed_atr, TargetMultiplier).
+    """
+    if strategy not in ('fixed_atr', 'trailing_atr'):
+        raise ValueError(f"Unknown strategy '{strategy}'")
+    for period in atr_periods:
+        entry_atr = windows.entry_atr[period]
+        tradable = ~np.isnan(entry_atr) & (entry_atr != 0)
+        sub = _subset(windows, tradable, period if strategy == 'trailing_atr' else None)
+        sub.entry_atr = {period: entry_atr[tradable]}
+
+        if strategy == 'fixed_atr':
+            pairs = [(s, s) for s in stop_multipliers] if target_multipliers is None else \
+                    [(s, t) for s in stop_multipliers for t in target_multipliers]
+            combos = [{'ATRPeriod': period, 'StopMultiplier': s, 'TargetMultiplier': t} for s, t in pairs]
+        else:
+            combos = [{'ATRPeriod': period, 'StopMultiplier': m} for m in stop_multipliers]
+        yield period, tradable, sub, combos
+
+
+def _run_kernel(strategy, sub, period, row, stop_fill=None):
+    """Exit price, bars held and exit reason of one parameter row."""
+    if strategy == 'fixed_atr':
+        return fixed_atr_kernel(sub, sub.entry_atr[period], row['StopMultiplier'], row['TargetMultiplier'],
+                                stop_fill)
+    return trailing_atr_kernel(sub, sub.entry_atr[period], sub.window_atr[period], row['StopMultiplier'],
+                               stop_fill)
+
+
+def run_cost_sensitivity(windows, cost_model, strategy='fixed_atr', atr_periods=ATR_PERIODS,
+                         stop_multipliers=MULTIPLIERS, target_multipliers=None, position_size=POSITION_SIZE,
+                         spread_multipliers=DEFAULT_SPREAD_MULTIPLIERS,
+                         impact_coefficients=DEFAULT_IMPACT_COEFFICIENTS,
+                         impact_exponents=DEFAULT_IMPACT_EXPONENTS, stop_fill=None,
+                         baseline=BASELINE_SCENARIO):
+    """
+    Net metrics and ranks of every combination under a grid of cost assumptions.
+
+    Each combination is simulated once; its fills are decomposed into fixed
+    fees, spread cost and impact terms (see cost_sensitivity.py) and the
+    (spread multiplier × impact coefficient × impact exponent) grid is
+    evaluated on those cached components, without re-costing any fill.
+    Ranks shift relative to the baseline (spread multiplier, impact
+    coefficient, exponent) scenario, by default the assumptions behind
+    run_sweep's Net_Rank. Other parameters as in run_sweep; cost_model is
+    required.
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per (combination, scenario): parameters, scenario columns,
+        cost totals, NetProfit, ProfitFactor, WinRate, SystemScore, Rank
+        within the scenario, BaselineRank and RankShift
+    """
+    d = windows.direction
+    shares_all = position_size / windows.entry_price
+    entry_all = cost_model.leg_costs(shares_all, windows.entry_price, windows.symbol_id,
+                                     is_sell=np.full(len(windows), d == -1))
+
+    surfaces = []
+    for period, tradable, sub, combos in _period_subsets(windows, strategy, atr_periods, stop_multipliers,
+                                                         target_multipliers):
+        shares = shares_all[tradable]
+        entry = {key: values[tradable] for key, values in entry_all.items()}
+        for row in combos:
+            exit_price, _, _ = _run_kernel(strategy, sub, period, row, stop_fill)
+            gross = (exit_price - sub.entry_price) * shares * d
+            exit_leg = cost_model.leg_costs(shares, exit_price, sub.symbol_id, is_sell=np.full(len(shares), d == 1))
+            surface = cost_sensitivity_surface(gross, decompose_costs(entry, exit_leg), spread_multipliers,
+                                               impact_coefficients, impact_exponents)
+            surface['Group'] = len(surfaces)
+            for position, (key, value) in enumerate(row.items()):
+                surface.insert(position, key, value)
+            surfaces.append(surface)
+
+    surface = rank_scenarios(pd.concat(surfaces, ignore_index=True), baseline=baseline)
+    return surface.drop(columns='Group')
+
+
+def _subset(windows, mask, window_period=None):
+    """Row subset of a SignalWindows (view-like copy of the needed arrays)."""
+    sub = SignalWindows.__new__(SignalWindows)
+    sub.direction = windows.direction
+    sub.max_bars = windows.max_bars
+    sub.session_mode = windows.session_mode
+    for name in ('symbol_id', 'bar_index', 'timestamp', 'entry_price', 'n_bars', 'open', 'high', 'low', 'close',
+                 'valid', 'session_cut'):
+        setattr(sub, name, getattr(windows, name)[mask])
+    sub.entry_atr = {}
+    sub.window_atr = {window_period: windows.window_atr[window_period][mask]} if window_period is not None else {}
+    return sub
+
+
+def main():
+    print("="*80)
+    print("VECTORIZED STRATEGY SWEEPS (GROSS AND NET OF TRANSACTION COSTS)")
+    print("="*80)
+
+    store = load_bar_store(BAR_STORE_DIR)
+    symbol_repo, n_calibrated = load_symbol_repository(COST_PARAMETERS_FILE)
+    cost_model = SweepCostModel(store.symbols, symbol_repo=symbol_repo)
+    print(f"Transaction costs: {n_calibrated:,} of {store.n_symbols:,} symbols calibrated "
+          f"({COST_PARAMETERS_FILE if n_calibrated else 'repository defaults'})")
+    stop_fill = StopFill(STOP_FILL_POLICY, STOP_SLIPPAGE_ATR, STOP_SLIPPAGE_BPS)
+    print(f"Stop fills: {stop_fill}")
+    sweeps = [
+        ('Fixed_ATR_Symmetric', 'fixed_atr', MAX_BARS_FIXED, ATR_PERIODS, ()),
+        ('ATR_Trailing_Stop', 'trailing_atr', MAX_BARS_TRAILING, [TRAILING_ATR_PERIOD], [TRAILING_ATR_PERIOD]),
+    ]
+    for direction, signal_type in ((-1, 'Short'), (1, 'Long')):
+        for name, strategy, max_bars, periods, window_periods in sweeps:
+            start = time.time()
+            windows = SignalWindows(store, direction, max_bars, periods, window_periods, session_mode=SESSION_MODE)
+            table = run_sweep(windows, strategy, periods, cost_model=cost_model, stop_fill=stop_fill)
+            table.insert(1, 'StrategyName', name)
+            table.insert(2, 'SignalType', signal_type)
+
+            output_file = OUTPUT_DIR / f'{name}_{signal_type}_Performance_Net.csv'
+            table.to_csv(output_file, index=False)
+            best = table.iloc[0]
+            print(f"\n{name} {signal_type}: {len(windows):,} signals, {len(table)} combinations "
+                  f"({time.time() - start:.1f}s)")
+            print(f"  Best gross: ATR({best['ATRPeriod']}) × {best['StopMultiplier']:.1f} "
+                  f"Net ${best['NetProfit']:,.0f} → after costs ${best['Net_NetProfit']:,.0f} "
+                  f"(net rank {best['Net_Rank']})")
+            print(f"✓ Saved: {output_file}")
+
+            surface = run_cost_sensitivity(windows, cost_model, strategy, periods, stop_fill=stop_fill)
+            surface_file = OUTPUT_DIR / f'{name}_{signal_type}_Cost_Sensitivity.csv'
+            surface.to_csv(surface_file, index=False)
+            print(f"  Cost scenarios: {surface.groupby(['SpreadMultiplier', 'ImpactCoefficient', 'ImpactExponent']).ngroups}, "
+                  f"max rank shift {surface['RankShift'].abs().max()}")
+            print(f"✓ Saved: {surface_file}")
+
+
+if __name__ == '__main__':
+    main()
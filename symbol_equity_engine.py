@@ -0,0 +1,115 @@
+#!/usr/bin/env python3.11
+"""
+Per-Symbol Equity Curve Engine
+Equity curves and symbol statistics for every symbol in one vectorized pass
+
+Trades are stably sorted by (Symbol, EntryDate) once; each symbol is then a
+contiguous slice starting at a group offset. Cumulative profit, running
+peak and drawdown are computed for all symbols at once with cumsum/cummax
+over a padded (symbols × trades) matrix, and per-symbol statistics are
+reduced at the slice boundaries with np.*.reduceat instead of re-filtering
+the table per symbol.
+"""
+
+import numpy as np
+import pandas as pd
+
+STARTING_BALANCE = 100000.0
+
+CURVE_COLUMNS = ['Symbol', 'TradeNumber', 'EntryDate', 'ExitDate', 'NetProfit',
+                 'CumulativeProfit', 'Equity', 'EquityPctGain', 'PeakEquity', 'DrawdownPct']
+
+
+def group_offsets(sorted_keys):
+    """Start offset of each run of equal keys in a sorted array (plus the end sentinel)."""
+    sorted_keys = np.asarray(sorted_keys)
+    if len(sorted_keys) == 0:
+        return np.array([0], dtype=np.int64)
+    starts = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+    return np.concatenate(([0], starts, [len(sorted_keys)]))
+
+
+def build_symbol_equity(trades, starting_balance=STARTING_BALANCE, order_col='EntryDate'):
+    """
+    Per-symbol equity curves and summary statistics.
+
+    Parameters:
+    -----------
+    trades : pd.DataFrame
+        Trade log with Symbol, EntryDate, ExitDate and NetProfit
+    starting_balance : float
+        Starting equity of every symbol
+    order_col : str
+        Column giving trade order within a symbol
+
+    Returns:
+    --------
+    tuple of pd.DataFrame
+        (equity curves, one row per trade; symbol statistics, one row per symbol)
+    """
+    order = np.lexsort((trades[order_col].to_numpy(), trades['Symbol'].to_numpy()))
+    sorted_trades = trades.iloc[order]
+    symbols = sorted_trades['Symbol'].to_numpy()
+    offsets = group_offsets(symbols)
+    starts, ends = offsets[:-1], offsets[1:]
+    counts = ends - starts
+    group = np.repeat(np.arange(len(starts)), counts)
+    position = np.arange(len(symbols)) - np.repeat(starts, counts)
+
+    # Scatter into a zero-padded (symbols × trades) matrix so one cumsum/cummax
+    # along axis 1 gives every symbol's running values (padding trails each row)
+    net_profit = sorted_trades['NetProfit'].to_numpy(dtype=np.float64)
+    padded = np.zeros((len(starts), counts.max(initial=0)))
+    padded[group, position] = net_profit
+    cumulative_matrix = np.cumsum(padded, axis=1)
+    cumulative = cumulative_matrix[group, position]
+    equity = starting_balance + cumulative
+    peak_matrix = np.maximum.accumulate(starting_balance + cumulative_matrix, axis=1)
+    peak = np.maximum(peak_matrix[group, position], starting_balance)
+
+    curves = pd.DataFrame({
+        'Symbol': symbols,
+        'TradeNumber': position + 1,
+        'EntryDate': sorted_trades['EntryDate'].to_numpy(),
+        'ExitDate': sorted_trades['ExitDate'].to_numpy(),
+        'NetProfit': net_profit,
+        'CumulativeProfit': cumulative,
+        'Equity': equity,
+        'EquityPctGain': (equity - starting_balance) / starting_balance * 100,
+        'PeakEquity': peak,
+        'DrawdownPct': (equity / peak - 1) * 100,
+    }, columns=CURVE_COLUMNS)
+
+    if len(starts) == 0:
+        return curves, pd.DataFrame(columns=['Symbol', 'TotalTrades', 'StartingEquity', 'FinalEquity',
+                                             'TotalProfit', 'PctGain', 'MaxEquity', 'MinEquity',
+                                             'MaxDrawdownPct', 'PeakDrawdownPct'])
+
+    final_equity = equity[ends - 1]
+    max_equity = np.maximum.reduceat(equity, starts)
+    min_equity = np.minimum.reduceat(equity, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        max_drawdown_pct = np.where(max_equity > 0, (min_equity - max_equity) / max_equity * 100, 0)
+
+    stats = pd.DataFrame({
+        'Symbol': symbols[starts],
+        'TotalTrades': counts,
+        'StartingEquity': starting_balance,
+        'FinalEquity': final_equity,
+        'TotalProfit': final_equity - starting_balance,
+        'PctGain': curves['EquityPctGain'].to_numpy()[ends - 1],
+        'MaxEquity': max_equity,
+        'MinEquity': min_equity,
+        'MaxDrawdownPct': max_drawdown_pct,
+        # Deepest fall from a running peak (MaxDrawdownPct compares the overall min and max)
+        'PeakDrawdownPct': np.minimum.reduceat(curves['DrawdownPct'].to_numpy(), starts),
+    })
+    return curves, stats
+
+
+def symbol_curves(curves, stats):
+    """Map symbol -> its slice of the (symbol-sorted) equity curve table."""
+    ends = np.cumsum(stats['TotalTrades'].to_numpy())
+    starts = ends - stats['TotalTrades'].to_numpy()
+    return {symbol: curves.iloc[start:end]
+            for symbol, start, end in zip(stats['Symbol'], starts, ends)}
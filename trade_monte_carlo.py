@@ -0,0 +1,197 @@
+#!/usr/bin/env python3.11
+"""
+Trade-Level Monte Carlo Simulator
+Max drawdown, time-under-water and risk-of-ruin distributions from the
+production trade logs under trade reordering or resampling
+
+Each simulated path replays the trade returns (PctProfit) with compounding
+position sizing: every trade commits POSITION_SIZE_PCT of current equity, as
+in production_portfolio_simulator.py, so
+
+    equity[k+1] = equity[k] * (1 + POSITION_SIZE_PCT * trade_return[k])
+
+Trades are applied one after another (the simulator's concurrent positions
+are serialized), which isolates the effect of trade order.
+
+Methods:
+- shuffle:  Random permutation of the observed trades (same final equity,
+            different path)
+- resample: Draw trades with replacement
+- block:    Circular blocks of consecutive trades (keeps streaks)
+
+Paths are computed in (simulations × trades) blocks whose size is capped by
+MAX_BLOCK_MB, so memory stays bounded for any number of simulations.
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from bootstrap_engine import bootstrap_indices
+
+TRADES_DIR = Path('/home/ubuntu/stage4_optimization')
+POSITION_SIZE_PCT = 0.10
+N_SIMULATIONS = 10_000
+MAX_BLOCK_MB = 256
+RUIN_LEVELS = (0.9, 0.8, 0.7, 0.5)  # equity as a fraction of starting capital
+MONTE_CARLO_METHODS = ('shuffle', 'resample', 'block')
+
+
+def trade_returns(trades_df):
+    """Per-trade fractional return (PctProfit, or NetProfit over the capital committed)."""
+    if 'PctProfit' in trades_df.columns:
+        return trades_df['PctProfit'].to_numpy(dtype=np.float64) / 100
+    capital = trades_df['EntryValue'] if 'EntryValue' in trades_df.columns else trades_df['Cost']
+    return (trades_df['NetProfit'] / capital).to_numpy(dtype=np.float64)
+
+
+def path_statistics(log_equity):
+    """
+    Path statistics for a block of log-equity paths.
+
+    Parameters:
+    -----------
+    log_equity : np.ndarray
+        (n_paths, n_trades) log of equity / starting equity after each trade
+
+    Returns:
+    --------
+    dict of np.ndarray (one value per path)
+    """
+    n_paths, n_trades = log_equity.shape
+    # Include the starting point (log equity 0) in the running peak
+    peak = np.maximum(np.maximum.accumulate(log_equity, axis=1), 0.0)
+    underwater = log_equity < peak
+    drawdown = np.expm1(log_equity - peak)
+
+    # Longest underwater streak: running count that resets on every new high
+    count = np.cumsum(underwater, axis=1)
+    reset = np.maximum.accumulate(np.where(underwater, 0, count), axis=1)
+    longest = (count - reset).max(axis=1) if n_trades else np.zeros(n_paths, dtype=np.int64)
+
+    return {
+        'FinalReturn': np.expm1(log_equity[:, -1]) * 100,
+        'MaxDrawdown': drawdown.min(axis=1, initial=0.0) * 100,
+        'MinEquity': np.exp(np.minimum(log_equity.min(axis=1), 0.0)),
+        'TimeUnderWater': underwater.mean(axis=1) * 100,
+        'LongestUnderwater': longest,
+    }
+
+
+def simulate_trade_paths(returns, n_simulations=N_SIMULATIONS, method='shuffle', n_trades=None,
+                         position_size=POSITION_SIZE_PCT, block_length=20, seed=42,
+                         max_block_mb=MAX_BLOCK_MB):
+    """
+    Monte Carlo distribution of path statistics.
+
+    Parameters:
+    -----------
+    returns : array-like
+        Per-trade fractional returns in observed order
+    n_simulations : int
+        Number of simulated paths
+    method : str
+        'shuffle', 'resample' or 'block'
+    n_trades : int, optional
+        Trades per path (default: all observed trades; must equal it for shuffle)
+    position_size : float
+        Fraction of equity committed per trade
+    block_length : int
+        Trades per block for method='block'
+    seed : int
+        Root seed; each block of paths uses its own SeedSequence child
+    max_block_mb : float
+        Memory cap for one (paths × trades) float64 block
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per path: FinalReturn (%), MaxDrawdown (%), MinEquity
+        (fraction of start), TimeUnderWater (% of trades), LongestUnderwater (trades)
+    """
+    if method not in MONTE_CARLO_METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {MONTE_CARLO_METHODS}")
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns[~np.isnan(returns)]
+    n_obs = len(returns)
+    n_trades = n_obs if n_trades is None else n_trades
+    if method == 'shuffle' and n_trades != n_obs:
+        raise ValueError("shuffle keeps every trade once: n_trades must equal the number of trades")
+
+    log_growth = np.log1p(position_size * returns)
+    # Several (paths × trades) arrays are alive at once in path_statistics
+    paths_per_block = max(1, int(max_block_mb * 2**20 / (8 * 4 * max(n_trades, 1))))
+    sizes = [min(paths_per_block, n_simulations - s) for s in range(0, n_simulations, paths_per_block)]
+
+    blocks = []
+    for size, seed_seq in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))):
+        rng = np.random.default_rng(seed_seq)
+        if method == 'shuffle':
+            idx = rng.permuted(np.broadcast_to(np.arange(n_obs), (size, n_obs)), axis=1)
+        elif method == 'resample':
+            idx = bootstrap_indices(rng, n_obs, size, n_trades, 'iid')
+        else:
+            idx = bootstrap_indices(rng, n_obs, size, n_trades, 'circular', block_length)
+        log_equity = np.cumsum(log_growth[idx], axis=1)
+        blocks.append(pd.DataFrame(path_statistics(log_equity)))
+    return pd.concat(blocks, ignore_index=True)
+
+
+def observed_path(returns, position_size=POSITION_SIZE_PCT):
+    """Path statistics of the trades in their actual order."""
+    log_equity = np.cumsum(np.log1p(position_size * np.asarray(returns, dtype=np.float64)))[None, :]
+    return {name: values[0] for name, values in path_statistics(log_equity).items()}
+
+
+def ruin_probabilities(paths, levels=RUIN_LEVELS):
+    """Share of paths (%) whose equity ever falls to or below each level."""
+    min_equity = paths['MinEquity'].to_numpy()
+    return pd.Series({f'Equity <= {level:.0%}': (min_equity <= level).mean() * 100 for level in levels},
+                     name='RuinProbability')
+
+
+def summarize_paths(paths, percentiles=(5, 25, 50, 75, 95)):
+    """Mean and percentiles of every path statistic."""
+    summary = paths.describe(percentiles=[p / 100 for p in percentiles]).T
+    return summary.drop(columns=['count'])
+
+
+def main():
+    print("="*80)
+    print("TRADE-LEVEL MONTE CARLO: DRAWDOWN AND RISK OF RUIN")
+    print("="*80)
+
+    for direction in ['Long', 'Short']:
+        trades_file = TRADES_DIR / f'Production_{direction}_Trades.parquet'
+        if not trades_file.exists():
+            print(f"\n{direction}: {trades_file} not found, skipping")
+            continue
+        trades = pd.read_parquet(trades_file).sort_values('ExitTime', kind='mergesort')
+        returns = trade_returns(trades)
+        print(f"\n{direction.upper()}: {len(returns):,} trades, "
+              f"{POSITION_SIZE_PCT:.0%} of equity per trade, {N_SIMULATIONS:,} paths per method")
+
+        observed = observed_path(returns)
+        print(f"  Observed order: final {observed['FinalReturn']:.2f}%, "
+              f"max DD {observed['MaxDrawdown']:.2f}%, longest underwater {observed['LongestUnderwater']} trades")
+
+        for method in MONTE_CARLO_METHODS:
+            start = time.time()
+            paths = simulate_trade_paths(returns, N_SIMULATIONS, method=method)
+            summary = summarize_paths(paths)
+            ruin = ruin_probabilities(paths)
+            print(f"\n  [{method}] {time.time() - start:.1f}s")
+            print(summary[['mean', '5%', '50%', '95%']].round(2).to_string())
+            print("  Ruin probability: " + ", ".join(f"{k} {v:.2f}%" for k, v in ruin.items()))
+
+            paths.to_parquet(TRADES_DIR / f'Production_{direction}_MonteCarlo_{method.title()}.parquet', index=False)
+            summary.to_csv(TRADES_DIR / f'Production_{direction}_MonteCarlo_{method.title()}_Summary.csv')
+
+    print("\n" + "="*80)
+    print("✓ MONTE CARLO COMPLETE")
+    print("="*80)
+
+
+if __name__ == '__main__':
+    main()